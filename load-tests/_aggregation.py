@@ -0,0 +1,508 @@
+import pandas as pd
+import numpy as np
+import json
+
+from _jtl import TIMING_COLUMNS, JtlCache, measured_mask, prepare_samples, read_jtl_range
+from _stats import (CI_PERCENTILES, CO_PERCENTILE_COLUMNS, PERCENTILE_COLUMNS, PERCENTILES, LatencyHistogram,
+                    SloObjective, detect_steady_state)
+
+class StepAggregator:
+    """Running per-step and per-label aggregates folded from JTL chunks.
+    
+    Latencies are kept in one LatencyHistogram per (step, label) and per
+    (step, time slice), so memory depends on the latency range, precision
+    and test duration, not on the number of samples. Per-second counters
+    per step give the measured throughput time series. Per (step, label,
+    latency bucket) the connect, server and transfer times are summed, so
+    every percentile can be split into those components, and failures are
+    counted per response code. With SLO objectives, their requests and bad
+    requests are counted per second for sliding-window burn rates. With
+    target rates, thread counts are summed per source file and second too
+    (each JMeter injector writes its own file), and the
+    coordinated-omission correction is applied to the final slice histograms
+    (see corrected_histogram), so it does not depend on how the samples
+    were chunked, split or merged. Aggregators can be
+    saved, loaded and merged, which lets results from several JMeter nodes or
+    repeated runs be combined without the JTLs.
+    """
+    
+    TOTAL_AGGREGATIONS = {
+        'Samples': 'sum',
+        'successes': 'sum',
+        'elapsed_sum': 'sum',
+        'max_ms': 'max',
+        'first_ts': 'min',
+        'last_ts': 'max',
+    }
+    SECOND_COLUMNS = ['Samples', 'errors', 'elapsed_sum', 'dropped']
+    # grpThreads summed over the samples that have a thread count, per (source, step, second)
+    THREAD_COLUMNS = ['threads_sum', 'threaded']
+    COMPONENT_COLUMNS = ['count', 'connect_sum', 'server_sum', 'transfer_sum', 'bytes_sum']
+    
+    def __init__(self, significant_digits=3, slice_seconds=10, target_rps=None, objectives=None, source=''):
+        self.significant_digits = significant_digits
+        self.slice_seconds = slice_seconds
+        self.target_rps = target_rps    # step -> target RPS, enables coordinated-omission correction
+        self.objectives = list(objectives or [])   # SloObjective instances
+        self.source = source            # Results file the chunks come from, keys the thread counts
+        self.totals = pd.DataFrame(
+            columns=list(self.TOTAL_AGGREGATIONS),
+            index=pd.MultiIndex.from_tuples([], names=['step', 'label']),
+            dtype='int64',
+        )
+        self.seconds = pd.DataFrame(
+            columns=self.SECOND_COLUMNS,
+            index=pd.MultiIndex.from_tuples([], names=['step', 'second']),
+            dtype='int64',
+        )
+        self.threads = pd.DataFrame(
+            columns=self.THREAD_COLUMNS,
+            index=pd.MultiIndex.from_tuples([], names=['source', 'step', 'second']),
+            dtype='int64',
+        )
+        self.components = pd.DataFrame(
+            columns=self.COMPONENT_COLUMNS,
+            index=pd.MultiIndex.from_tuples([], names=['step', 'label', 'bucket']),
+            dtype='int64',
+        )
+        self.errors = pd.DataFrame(
+            columns=['errors'],
+            index=pd.MultiIndex.from_tuples([], names=['step', 'label', 'responseCode']),
+            dtype='int64',
+        )
+        self.slo_seconds = pd.DataFrame(
+            columns=['requests', 'bad'],
+            index=pd.MultiIndex.from_tuples([], names=['objective', 'second']),
+            dtype='int64',
+        )
+        self.histograms = {}    # (step, label) -> LatencyHistogram
+        self.slices = {}        # (step, first second of slice) -> LatencyHistogram
+    
+    def add_chunk(self, chunk):
+        """Fold one prepared chunk into the running aggregates"""
+        grouped = chunk.groupby(['step', 'label'], sort=True, observed=True)
+        totals = grouped.agg(
+            Samples=('elapsed', 'size'),
+            successes=('success', 'sum'),
+            elapsed_sum=('elapsed', 'sum'),
+            max_ms=('elapsed', 'max'),
+            first_ts=('timeStamp', 'min'),
+            last_ts=('timeStamp', 'max'),
+        ).astype('int64')
+        totals.index = totals.index.set_levels(totals.index.levels[1].astype(str), level=1)
+        self.totals = self._merge_frames(self.totals, totals, self.TOTAL_AGGREGATIONS)
+        
+        steps = chunk['step'].to_numpy()
+        elapsed = chunk['elapsed'].to_numpy()
+        seconds = chunk['timeStamp'].to_numpy() // 1000
+        threads = (chunk['grpThreads'].to_numpy(dtype=np.int64) if 'grpThreads' in chunk.columns
+                   else np.zeros(len(chunk), dtype=np.int64))
+        # Dropped arrivals only count toward samples and errors, never toward latencies
+        measured = measured_mask(chunk)
+        per_second = pd.DataFrame({
+            'step': steps,
+            'second': seconds,
+            'Samples': 1,
+            'errors': ~chunk['success'].to_numpy(dtype=bool),
+            'elapsed_sum': elapsed.astype(np.int64),
+            'dropped': ~measured,
+        }).groupby(['step', 'second']).sum().astype('int64')
+        self.seconds = self._merge_frames(self.seconds, per_second, 'sum')
+        
+        threaded = threads > 0
+        if threaded.any():
+            thread_counts = pd.DataFrame({
+                'source': self.source,
+                'step': steps[threaded],
+                'second': seconds[threaded],
+                'threads_sum': threads[threaded],
+                'threaded': 1,
+            }).groupby(['source', 'step', 'second']).sum().astype('int64')
+            self.threads = self._merge_frames(self.threads, thread_counts, 'sum')
+        
+        if self.objectives:
+            self._add_slo_counts(chunk, seconds)
+        
+        failed = ~chunk['success'].to_numpy(dtype=bool)
+        if failed.any():
+            errors = chunk[failed].groupby(['step', 'label', 'responseCode'], observed=True).size().to_frame('errors')
+            errors.index = errors.index.set_levels([errors.index.levels[1].astype(str), errors.index.levels[2].astype(str)],
+                                                   level=[1, 2])
+            self.errors = self._merge_frames(self.errors, errors.astype('int64'), 'sum')
+        
+        buckets = LatencyHistogram(self.significant_digits).bucket_index(elapsed)
+        group_codes = grouped.ngroup().to_numpy()
+        # Factorized as one integer per (step, slice start): a MultiIndex of tuples is much slower
+        slice_codes, slice_ids = pd.factorize((steps.astype(np.int64) << 32) | (seconds - seconds % self.slice_seconds))
+        slice_keys = pd.MultiIndex.from_arrays([slice_ids >> 32, slice_ids & 0xFFFFFFFF])
+        if not measured.all():
+            chunk, buckets, elapsed = chunk[measured], buckets[measured], elapsed[measured]
+            group_codes, slice_codes = group_codes[measured], slice_codes[measured]
+        self._add_histograms(self.histograms, totals.index, group_codes, buckets, elapsed)
+        self._add_histograms(self.slices, slice_keys, slice_codes, buckets, elapsed)
+        if all(name in chunk.columns for name in TIMING_COLUMNS):
+            self._add_components(chunk, totals.index, group_codes, buckets, elapsed)
+    
+    def _add_slo_counts(self, chunk, seconds):
+        frames = []
+        for objective in self.objectives:
+            active, requests, bad = objective.counts(chunk, seconds)
+            frames.append(pd.DataFrame({'objective': objective.name, 'second': active, 'requests': requests, 'bad': bad}))
+        counts = pd.concat(frames).set_index(['objective', 'second']).astype('int64')
+        self.slo_seconds = self._merge_frames(self.slo_seconds, counts, 'sum')
+    
+    def _add_components(self, chunk, keys, codes, buckets, elapsed):
+        """Sum connect / server / transfer time per (step, label, latency bucket) in one grouped pass"""
+        elapsed = elapsed.astype(np.int64)
+        # JMeter's Latency (time to first byte) includes Connect, elapsed includes both
+        connect = np.clip(chunk['Connect'].to_numpy(dtype=np.int64), 0, elapsed)
+        first_byte = np.clip(chunk['Latency'].to_numpy(dtype=np.int64), connect, elapsed)
+        components = pd.DataFrame({
+            'group': codes,
+            'bucket': buckets,
+            'count': 1,
+            'connect_sum': connect,
+            'server_sum': first_byte - connect,
+            'transfer_sum': elapsed - first_byte,
+            'bytes_sum': chunk['bytes'].to_numpy(dtype=np.int64),
+        }).groupby(['group', 'bucket']).sum()
+        group_keys = keys[components.index.get_level_values('group')]
+        components.index = pd.MultiIndex.from_arrays(
+            [group_keys.get_level_values('step'), group_keys.get_level_values('label'),
+             components.index.get_level_values('bucket')],
+            names=['step', 'label', 'bucket'])
+        self.components = self._merge_frames(self.components, components.astype('int64'), 'sum')
+    
+    def _add_histograms(self, store, keys, codes, buckets, elapsed):
+        """One bincount over (group, latency bucket) pairs for all groups of a chunk"""
+        if not len(codes):
+            return
+        width = int(buckets.max()) + 1
+        counts = np.bincount(codes * width + buckets, minlength=len(keys) * width).reshape(len(keys), width)
+        # Groups without samples (e.g. only dropped arrivals) get no histogram
+        extremes = pd.Series(elapsed).groupby(codes).agg(['min', 'max'])
+        for code, minimum, maximum in zip(extremes.index, extremes['min'], extremes['max']):
+            self._histogram(store, tuple(keys[code])).add_counts(counts[code], minimum, maximum)
+    
+    def _histogram(self, store, key):
+        if key not in store:
+            store[key] = LatencyHistogram(self.significant_digits)
+        return store[key]
+    
+    @staticmethod
+    def _merge_frames(current, new, aggregations):
+        if current.empty:
+            return new
+        return pd.concat([current, new]).groupby(level=list(current.index.names)).agg(aggregations)
+    
+    def merge(self, other):
+        """Fold another aggregator (other node, shard or run) into this one"""
+        if not other.totals.empty:
+            self.totals = self._merge_frames(self.totals, other.totals, self.TOTAL_AGGREGATIONS)
+        if not other.seconds.empty:
+            self.seconds = self._merge_frames(self.seconds, other.seconds, 'sum')
+        if not other.threads.empty:
+            # Shards of one file add up; other files stay separate injectors
+            self.threads = self._merge_frames(self.threads, other.threads, 'sum')
+        if not other.components.empty:
+            self.components = self._merge_frames(self.components, other.components, 'sum')
+        if not other.errors.empty:
+            self.errors = self._merge_frames(self.errors, other.errors, 'sum')
+        if not other.slo_seconds.empty:
+            self.slo_seconds = self._merge_frames(self.slo_seconds, other.slo_seconds, 'sum')
+        known = {objective.name for objective in self.objectives}
+        self.objectives += [objective for objective in other.objectives if objective.name not in known]
+        for store, other_store in ((self.histograms, other.histograms), (self.slices, other.slices)):
+            for key, histogram in other_store.items():
+                self._histogram(store, key).merge(histogram)
+        return self
+    
+    def step_histograms(self):
+        """Histograms per step, merged over all labels"""
+        merged = {}
+        for (step_num, _), histogram in self.histograms.items():
+            self._histogram(merged, step_num).merge(histogram)
+        return merged
+    
+    def step_samples_per_second(self, step_num):
+        """Achieved requests per second of one step, with idle seconds filled in"""
+        samples = self.seconds.xs(step_num, level='step')['Samples']
+        return samples.reindex(range(samples.index.min(), samples.index.max() + 1), fill_value=0)
+    
+    def steady_state_windows(self):
+        """(first_second, last_second) of every step's steady state, snapped to slices"""
+        windows = {}
+        for step_num in self.seconds.index.unique(level='step'):
+            samples = self.step_samples_per_second(step_num)
+            first, last = detect_steady_state(samples)
+            # Only whole slices can be merged into the steady-state histogram
+            slice_first = -(-first // self.slice_seconds) * self.slice_seconds
+            slice_last = (last + 1) // self.slice_seconds * self.slice_seconds - 1
+            if slice_last - slice_first + 1 >= self.slice_seconds:
+                first, last = slice_first, slice_last
+            else:
+                first, last = samples.index[0], samples.index[-1]
+            windows[step_num] = (first, last)
+        return windows
+    
+    def step_metrics(self, steady_state=True, confidence=0.95, resamples=1000):
+        """Per-step metrics (counts, throughput, percentile ladder) from the aggregates.
+        
+        With `steady_state` only the detected steady-state window of each step
+        is used, otherwise the whole step. p95/p99 (measured and corrected)
+        and the error rate get bootstrap `confidence` intervals from
+        `resamples` resamples of the step's histogram and error count.
+        """
+        tail = (1 - confidence) / 2 * 100
+        steps = sorted(step_num for step_num in self.seconds.index.unique(level='step') if step_num > 0)
+        windows = self.steady_state_windows()
+        rows = []
+        for step_num in steps:
+            per_second = self.seconds.xs(step_num, level='step')
+            if steady_state:
+                first, last = windows[step_num]
+            else:
+                first, last = per_second.index.min(), per_second.index.max()
+            in_window = per_second.loc[first:last].sum()
+            histogram = self._merge_slices(self.slices, step_num, first, last)
+            corrected = self.corrected_histogram(step_num, first, last)
+            duration_s = last - first + 1
+            measured = in_window['Samples'] - in_window['dropped']
+            rows.append({
+                'step': step_num,
+                'Samples': int(in_window['Samples']),
+                'Achieved_RPS': measured / duration_s,
+                'Steady_s': duration_s,
+                'Window_start': first,
+                'mean_ms': in_window['elapsed_sum'] / measured if measured else np.nan,
+                'max_ms': histogram.max,
+                **dict(zip(PERCENTILE_COLUMNS, histogram.percentiles(PERCENTILES))),
+                **dict(zip(CO_PERCENTILE_COLUMNS, corrected.percentiles(PERCENTILES))),
+                'Error_%': in_window['errors'] / in_window['Samples'] * 100,
+            })
+            for name, source in (('', histogram), ('_co', corrected)):
+                bounds = np.percentile(source.bootstrap_percentiles(CI_PERCENTILES, resamples), [tail, 100 - tail], axis=0)
+                for q, low, high in zip(CI_PERCENTILES, *bounds):
+                    rows[-1][f'p{q:g}{name}_ms_low'], rows[-1][f'p{q:g}{name}_ms_high'] = low, high
+            # Parametric bootstrap of the error count
+            error_rates = np.random.default_rng(0).binomial(
+                int(in_window['Samples']), in_window['errors'] / in_window['Samples'], resamples) / in_window['Samples'] * 100
+            rows[-1]['Error_%_low'], rows[-1]['Error_%_high'] = np.percentile(error_rates, [tail, 100 - tail])
+        ci_columns = [f'p{q:g}{name}_ms_{bound}' for name in ('', '_co') for q in CI_PERCENTILES for bound in ('low', 'high')]
+        columns = ['Samples', 'Achieved_RPS', 'Steady_s', 'Window_start', 'mean_ms', 'max_ms',
+                   *PERCENTILE_COLUMNS, *CO_PERCENTILE_COLUMNS, 'Error_%', *ci_columns, 'Error_%_low', 'Error_%_high']
+        return pd.DataFrame(rows, columns=['step', *columns]).set_index('step')
+    
+    def slice_threads(self):
+        """Mean grpThreads per (step, slice start), summed over the source files"""
+        threads = self.threads.reset_index()
+        threads['second'] -= threads['second'] % self.slice_seconds
+        per_source = threads.groupby(['source', 'step', 'second'])[self.THREAD_COLUMNS].sum()
+        return (per_source['threads_sum'] / per_source['threaded']).groupby(level=['step', 'second']).sum()
+    
+    def intended_interval_ms(self, step_num, slice_start, slice_threads=None):
+        """Intended time between two requests of one thread in a slice: threads / target RPS.
+        
+        Threads are the slice's mean grpThreads of each source file, summed
+        over the files, since every injector counts only its own threads and
+        the target rate is the total. Without thread counts they are
+        estimated with Little's law from the target rate and the whole step's
+        mean latency. Both come from the final per-second sums; pass
+        `slice_threads()` when asking for many slices.
+        """
+        target_rps = (self.target_rps or {}).get(step_num)
+        if not target_rps:
+            return 0
+        if slice_threads is None:
+            slice_threads = self.slice_threads()
+        threads = slice_threads.get((step_num, slice_start))
+        if threads is None:
+            per_second = self.seconds.xs(step_num, level='step')
+            measured = per_second['Samples'].sum() - per_second['dropped'].sum()
+            threads = max(target_rps * per_second['elapsed_sum'].sum() / max(measured, 1) / 1000, 1)
+        return threads * 1000 / target_rps
+    
+    def corrected_histogram(self, step_num, first, last):
+        """Coordinated-omission corrected histogram of one step between two seconds (whole slices)"""
+        histogram = LatencyHistogram(self.significant_digits)
+        if not self.target_rps:
+            return histogram
+        slice_threads = self.slice_threads()
+        for (slice_step, slice_start), slice_histogram in self.slices.items():
+            if slice_step == step_num and first <= slice_start <= last:
+                interval_ms = self.intended_interval_ms(step_num, slice_start, slice_threads)
+                histogram.merge(slice_histogram.backfilled(interval_ms))
+        return histogram
+    
+    def window_histogram(self, step_num, first, last):
+        """Latency histogram of one step between two seconds (whole slices)"""
+        return self._merge_slices(self.slices, step_num, first, last)
+    
+    def _merge_slices(self, store, step_num, first, last):
+        histogram = LatencyHistogram(self.significant_digits)
+        for (slice_step, slice_start), slice_histogram in store.items():
+            if slice_step == step_num and first <= slice_start <= last:
+                histogram.merge(slice_histogram)
+        return histogram
+    
+    def endpoint_metrics(self, percentiles=(95, 99)):
+        """Per (step, label) percentiles split into connect / server / transfer, and tail shares.
+        
+        A percentile's split is the mean split of the samples in its latency
+        bucket, scaled to add up to the percentile. Tail_% is the label's
+        share of the step's samples slower than the step's p95.
+        """
+        step_p95 = {step_num: histogram.percentiles([95])[0] for step_num, histogram in self.step_histograms().items()}
+        tail_counts = {key: histogram.count_above(step_p95[key[0]]) for key, histogram in self.histograms.items()}
+        step_tail = pd.Series(tail_counts, dtype=float).groupby(level=0).sum()
+        
+        rows = []
+        for (step_num, label), histogram in sorted(self.histograms.items()):
+            total = self.totals.loc[(step_num, label)]
+            row = {
+                'step': step_num,
+                'label': label,
+                'Samples': total['Samples'],
+                'Error_%': (1 - total['successes'] / total['Samples']) * 100,
+                'Tail_%': tail_counts[(step_num, label)] / step_tail[step_num] * 100 if step_tail[step_num] else 0.0,
+            }
+            has_components = (step_num, label) in self.components.index.droplevel('bucket')
+            components = self.components.loc[(step_num, label)] if has_components else None
+            for q, value in zip(percentiles, histogram.percentiles(percentiles)):
+                row[f'p{q:g}_ms'] = value
+                for name in ('connect', 'server', 'transfer'):
+                    row[f'p{q:g}_{name}_ms'] = np.nan
+                if components is not None:
+                    row.update(self._split_percentile(histogram, components, q, value))
+            row['bytes_mean'] = components['bytes_sum'].sum() / components['count'].sum() if has_components else np.nan
+            rows.append(row)
+        return pd.DataFrame(rows).set_index(['step', 'label'])
+    
+    @staticmethod
+    def _split_percentile(histogram, components, q, value):
+        # Nearest bucket with samples to the one holding the percentile
+        buckets = components.index.to_numpy()
+        position = min(np.searchsorted(buckets, histogram.bucket_index([round(value)])[0]), len(buckets) - 1)
+        bucket = components.iloc[position]
+        parts = bucket[['connect_sum', 'server_sum', 'transfer_sum']].to_numpy(dtype=np.float64)
+        scale = value / parts.sum() if parts.sum() > 0 else 0.0
+        return {f'p{q:g}_{name}_ms': part * scale for name, part in zip(('connect', 'server', 'transfer'), parts)}
+    
+    def error_codes(self):
+        """Failed samples per (step, label, responseCode) with their share of the label's samples"""
+        errors = self.errors.copy()
+        samples = self.totals['Samples'].reindex(errors.index.droplevel('responseCode')).to_numpy()
+        errors['Share_%'] = errors['errors'] / samples * 100
+        return errors.sort_index()
+    
+    def slo_burn(self, objective):
+        """Per-second burn rates of one objective over the whole test"""
+        if objective.name not in self.slo_seconds.index.get_level_values('objective'):
+            return None
+        per_second = self.slo_seconds.xs(objective.name, level='objective')
+        per_second = per_second.reindex(range(per_second.index.min(), per_second.index.max() + 1), fill_value=0)
+        return objective.evaluate(per_second).join(per_second)
+    
+    def slice_metrics(self):
+        """Samples, p95 and error rate of every (step, slice)"""
+        seconds = self.seconds.reset_index()
+        seconds['slice'] = seconds['second'] - seconds['second'] % self.slice_seconds
+        per_slice = seconds.groupby(['step', 'slice'])[['Samples', 'errors']].sum()
+        per_slice['p95_ms'] = [self.slices[key].percentiles([95])[0] for key in per_slice.index]
+        per_slice['Error_%'] = per_slice.pop('errors') / per_slice['Samples'] * 100
+        return per_slice
+    
+    def time_series(self):
+        """Per-second achieved RPS, in-flight requests, error rate and p95 over the last slice"""
+        per_second = self.seconds.groupby(level='second').sum()
+        per_second = per_second.reindex(range(per_second.index.min(), per_second.index.max() + 1), fill_value=0)
+        series = pd.DataFrame(index=per_second.index.rename('second'))
+        series['RPS'] = per_second['Samples']
+        # Little's law: average concurrency = arrival rate x mean latency
+        series['In_Flight'] = per_second['elapsed_sum'] / 1000
+        series['Error_%'] = (per_second['errors'] / per_second['Samples'].where(per_second['Samples'] > 0) * 100)
+        
+        slice_histograms = {}
+        for (_, slice_start), histogram in self.slices.items():
+            self._histogram(slice_histograms, slice_start).merge(histogram)
+        slice_p95 = pd.Series({slice_start: histogram.percentiles([95])[0]
+                               for slice_start, histogram in slice_histograms.items()}, dtype=float)
+        series[f'p95_{self.slice_seconds}s_ms'] = slice_p95.reindex(series.index - series.index % self.slice_seconds).to_numpy()
+        return series
+    
+    def to_dict(self):
+        return {
+            'significant_digits': self.significant_digits,
+            'slice_seconds': self.slice_seconds,
+            'source': self.source,
+            'target_rps': self.target_rps and {str(step_num): rps for step_num, rps in self.target_rps.items()},
+            'objectives': [objective.to_dict() for objective in self.objectives],
+            'slo_seconds': self.slo_seconds.reset_index().to_dict(orient='records'),
+            'totals': self.totals.reset_index().to_dict(orient='records'),
+            'seconds': self.seconds.reset_index().to_dict(orient='records'),
+            'threads': self.threads.reset_index().to_dict(orient='records'),
+            'components': self.components.reset_index().to_dict(orient='records'),
+            'errors': self.errors.reset_index().to_dict(orient='records'),
+            'histograms': [
+                {'step': int(step_num), 'label': label, **histogram.to_dict()}
+                for (step_num, label), histogram in sorted(self.histograms.items())
+            ],
+            'slices': [
+                {'step': int(step_num), 'second': int(slice_start), **histogram.to_dict()}
+                for (step_num, slice_start), histogram in sorted(self.slices.items())
+            ],
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        target_rps = data.get('target_rps')
+        aggregator = cls(data['significant_digits'], data['slice_seconds'],
+                         target_rps and {int(step_num): rps for step_num, rps in target_rps.items()},
+                         [SloObjective.from_dict(objective) for objective in data.get('objectives', [])],
+                         data.get('source', ''))
+        if data['totals']:
+            aggregator.totals = pd.DataFrame(data['totals']).set_index(['step', 'label']).astype('int64')
+        if data['seconds']:
+            seconds = pd.DataFrame(data['seconds']).set_index(['step', 'second'])
+            aggregator.seconds = seconds.reindex(columns=cls.SECOND_COLUMNS, fill_value=0).astype('int64')
+            # Files saved before thread counts were kept per source have them per second
+            if 'threaded' in seconds.columns and not data.get('threads'):
+                threads = seconds.loc[seconds['threaded'] > 0, cls.THREAD_COLUMNS]
+                aggregator.threads = pd.concat({aggregator.source: threads}, names=['source']).astype('int64')
+        if data.get('threads'):
+            aggregator.threads = pd.DataFrame(data['threads']).set_index(['source', 'step', 'second']).astype('int64')
+        if data.get('components'):
+            aggregator.components = pd.DataFrame(data['components']).set_index(['step', 'label', 'bucket']).astype('int64')
+        if data.get('slo_seconds'):
+            aggregator.slo_seconds = pd.DataFrame(data['slo_seconds']).set_index(['objective', 'second']).astype('int64')
+        if data.get('errors'):
+            aggregator.errors = pd.DataFrame(data['errors']).set_index(['step', 'label', 'responseCode']).astype('int64')
+        for entry in data['histograms']:
+            aggregator.histograms[(entry['step'], entry['label'])] = LatencyHistogram.from_dict(entry)
+        for entry in data['slices']:
+            aggregator.slices[(entry['step'], entry['second'])] = LatencyHistogram.from_dict(entry)
+        return aggregator
+    
+    def save(self, path):
+        """Serialize the aggregates (a few KB per step and label) to JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+def aggregate_jtl_range(results_file, header, start, end, chunksize, aggregator_options):
+    """Process pool worker: aggregate one byte range of one JTL file"""
+    aggregator = StepAggregator(**aggregator_options, source=results_file)
+    for chunk in read_jtl_range(results_file, header, start, end, chunksize):
+        aggregator.add_chunk(prepare_samples(chunk))
+    return aggregator
+
+def aggregate_cached_jtl(results_file, cache_dir, chunksize, aggregator_options):
+    """Process pool worker: aggregate one JTL file through the columnar cache"""
+    aggregator = StepAggregator(**aggregator_options, source=results_file)
+    for chunk in JtlCache(cache_dir).read(results_file, chunksize):
+        aggregator.add_chunk(chunk)
+    return aggregator
@@ -0,0 +1,1109 @@
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import contextlib
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+from _aggregation import StepAggregator, aggregate_cached_jtl, aggregate_jtl_range
+from _history import RunHistory
+from _jtl import (ARRIVAL_MODEL_COLUMN, JtlCache, JtlTail, SummariserTail, SummaryRing, endpoint_name, jtl_header,
+                  prepare_samples, read_jtl, split_jtl)
+from _stats import PERCENTILE_COLUMNS, PERCENTILES, CapacityModel, SloObjective, default_slo_objectives
+
+# Utilization (1.0 = saturated) of each resource sampled by resource-sampler.py
+RESOURCE_UTILIZATION = {
+    'host CPU': lambda samples: samples['cpu_pct'] / 100,
+    'container CPU': lambda samples: samples['cgroup_cpu_pct'] / 100,
+    'host memory': lambda samples: samples['mem_pct'] / 100,
+    'container memory': lambda samples: samples['cgroup_mem_pct'] / 100,
+    'app CPU (one core)': lambda samples: samples['proc_cpu_pct'] / 100,     # Node runs JavaScript on one core
+    'pg pool connections': lambda samples: samples['pg_connections'] / samples['pool_max'],
+    'pg active queries': lambda samples: samples['pg_active'] / samples['pool_max'],
+    'pg max_connections': lambda samples: samples['pg_connections'] / samples['pg_max_connections'],
+}
+
+class ResourceTimeline:
+    """Per-second server-side samples (resource-sampler.py CSV), on the JTL's epoch-second clock"""
+    
+    def __init__(self, samples):
+        self.samples = samples
+    
+    @classmethod
+    def load(cls, resource_file, clock_offset_s=0):
+        """Read the sampler CSV; `clock_offset_s` is added when the sampler's clock differs from the injector's"""
+        samples = pd.read_csv(resource_file)
+        samples['second'] = samples.pop('timestamp_ms') // 1000 + clock_offset_s
+        return cls(samples.groupby('second').mean())
+    
+    def utilization(self):
+        """Per-second utilization of every resource that has samples"""
+        utilization = pd.DataFrame(index=self.samples.index)
+        for resource, formula in RESOURCE_UTILIZATION.items():
+            try:
+                values = formula(self.samples)
+            except KeyError:
+                continue
+            if values.notna().any():
+                utilization[resource] = values
+        return utilization
+    
+    def saturation(self, threshold=0.9, sustain_s=5):
+        """First second from which each resource stays at or above `threshold` for `sustain_s` seconds"""
+        first = {}
+        for resource, values in self.utilization().items():
+            values = values.reindex(range(values.index.min(), values.index.max() + 1))
+            saturated = (values >= threshold).astype(int)
+            # Seconds ending a run of `sustain_s` saturated seconds
+            sustained = saturated.rolling(sustain_s).sum() >= sustain_s
+            if sustained.any():
+                first[resource] = sustained.idxmax() - sustain_s + 1
+        return first
+
+class StageProfiler:
+    """Per-stage timers, row counts and (optionally) tracemalloc peaks of an analysis.
+    
+    Every finished stage becomes an event dict (stage, start_s, seconds,
+    rows, peak_mb) that is appended to the trace and passed to each
+    registered hook, in batch and in --follow mode alike. Stages may nest;
+    an outer stage's peak includes its inner stages. Timing costs two
+    perf_counter() calls per stage, memory tracing is only on after
+    start_memory().
+    """
+    
+    def __init__(self):
+        self.hooks = []
+        self.events = []
+        self.memory = False
+        self._origin = time.perf_counter()
+        self._stack = []
+    
+    def add_hook(self, hook):
+        """Call `hook(event)` for every finished stage"""
+        self.hooks.append(hook)
+    
+    def start_memory(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.memory = True
+    
+    def stop_memory(self):
+        if self.memory:
+            tracemalloc.stop()
+            self.memory = False
+    
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Time the enclosed block; the yielded event's 'rows' may be set inside it"""
+        event = {'stage': name, 'start_s': time.perf_counter() - self._origin, 'seconds': None, 'rows': rows, 'peak_mb': None}
+        peak = 0
+        if self.memory:
+            # Fold the peak so far into the enclosing stage before restarting the count
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = [event, peak]
+        self._stack.append(frame)
+        try:
+            yield event
+        finally:
+            self._stack.pop()
+            event['seconds'] = time.perf_counter() - self._origin - event['start_s']
+            if self.memory:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                event['peak_mb'] = peak / 1e6
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+            self.record(event)
+    
+    def iterate(self, name, chunks):
+        """Yield from `chunks`, timing each step of the iteration (e.g. CSV parsing) as a stage"""
+        chunks = iter(chunks)
+        while True:
+            with self.stage(name) as event:
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    event['rows'] = len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+    
+    def record(self, event):
+        self.events.append(event)
+        for hook in self.hooks:
+            hook(event)
+    
+    def totals(self, since=0):
+        """Per-stage calls, seconds, rows and peak of the events from index `since` on"""
+        totals = {}
+        for event in self.events[since:]:
+            total = totals.setdefault(event['stage'], {'calls': 0, 'seconds': 0.0, 'rows': 0, 'peak_mb': None})
+            total['calls'] += 1
+            total['seconds'] += event['seconds']
+            total['rows'] += event['rows'] or 0
+            if event['peak_mb'] is not None:
+                total['peak_mb'] = max(total['peak_mb'] or 0, event['peak_mb'])
+        for total in totals.values():
+            total['rows_per_s'] = total['rows'] / total['seconds'] if total['rows'] and total['seconds'] else None
+        return totals
+    
+    def save(self, trace_file):
+        """Write the stage totals and the full event trace as JSON"""
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'wall_s': time.perf_counter() - self._origin,
+                'memory_traced': self.memory,
+                'stages': self.totals(),
+                'events': self.events,
+            }, f, indent=2)
+
+# Outputs of an analysis run; table-only and summary-only runs never load matplotlib
+OUTPUTS = ('table', 'json', 'timeseries', 'endpoints', 'slo', 'resources', 'plot', 'summary')
+TABLE_OUTPUTS = ('table', 'json')
+# Outputs that show the capacity model; without them it is not fitted
+CAPACITY_OUTPUTS = ('plot', 'summary')
+
+SLA_COLORS = {'PASS': 'green', 'FAIL': 'red', 'INCONCLUSIVE': 'orange'}
+
+def png_text(path):
+    """tEXt metadata of a PNG file, e.g. the inputs digest written by render_plot"""
+    text = {}
+    try:
+        with open(path, 'rb') as f:
+            if f.read(8) != b'\x89PNG\r\n\x1a\n':
+                return text
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                length, chunk_type = struct.unpack('>I4s', header)
+                if chunk_type == b'IDAT':
+                    break   # Metadata written by matplotlib precedes the image data
+                data = f.read(length)
+                f.seek(4, os.SEEK_CUR)  # CRC
+                if chunk_type == b'tEXt':
+                    key, _, value = data.partition(b'\0')
+                    text[key.decode('latin-1')] = value.decode('latin-1')
+    except OSError:
+        pass
+    return text
+
+def render_plot(plot_file, plot, digest=None, show=False):
+    """Draw the p95 vs RPS chart from plain plot data (runs in a background process).
+    
+    matplotlib is imported here only, with the non-interactive Agg backend
+    unless the chart is to be shown, so runs without a plot never load it.
+    """
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    rps = np.array(plot['rps'], dtype=np.float64)
+    judged = np.array(plot['judged'], dtype=np.float64)
+    sla_latency_ms = plot['sla_latency_ms']
+    overload_threshold = plot['overload_threshold']
+    plt.figure(figsize=(12, 8))
+    
+    # Plot p95 latency (the SLA markers sit on the latency the SLA is judged on)
+    colors = [SLA_COLORS[sla] for sla in plot['verdicts']]
+    plt.plot(rps, np.array(plot['p95'], dtype=np.float64), 'b-', alpha=0.5, linewidth=2, label='p95 (measured)')
+    if any(value is not None for value in plot['p95_co']):
+        plt.plot(rps, np.array(plot['p95_co'], dtype=np.float64), 'm--', alpha=0.7, linewidth=2, label='p95 (coordinated-omission corrected)')
+    plt.scatter(rps, judged, c=colors, s=100, alpha=0.8, edgecolors='black', linewidth=2)
+    
+    # Fitted capacity model, p95 against throughput up to the saturation point
+    if plot['curve_rps']:
+        plt.plot(plot['curve_rps'], plot['curve_p95'], 'g-.', linewidth=2, alpha=0.8, label='USL capacity model (p95 vs achieved RPS)')
+        if plot['max_rps'] is not None:
+            plt.axvline(x=plot['max_rps'], color='gray', linestyle='-.', linewidth=1.5, alpha=0.8,
+                        label=f"Max throughput ≈ {plot['max_rps']:.0f} RPS")
+    
+    # Mark SLA threshold
+    plt.axhline(y=sla_latency_ms, color='red', linestyle='--', linewidth=2, alpha=0.8, label=f'SLA Limit ({sla_latency_ms}ms)')
+    
+    # Mark overload threshold
+    if overload_threshold:
+        plt.axvline(x=overload_threshold, color='red', linestyle=':', linewidth=3, alpha=0.9, label=f'Overload Threshold ({overload_threshold} RPS)')
+    
+    plt.xlabel('Target RPS', fontsize=14, fontweight='bold')
+    plt.ylabel('p95 Latency (ms)', fontsize=14, fontweight='bold')
+    plt.title('Healthcare Application - Overload Threshold Analysis\np95 Latency vs RPS', fontsize=16, fontweight='bold')
+    plt.grid(True, alpha=0.3)
+    plt.legend(fontsize=12)
+    
+    # Add annotations for SLA pass/fail
+    for x, y, sla in zip(rps, judged, plot['verdicts']):
+        plt.annotate(sla, 
+                    (x, y), 
+                    xytext=(5, 5), textcoords='offset points',
+                    fontsize=10, fontweight='bold', color=SLA_COLORS[sla])
+    
+    plt.tight_layout()
+    
+    # Save plot, with the digest of its inputs so an unchanged plot is not redrawn
+    plt.savefig(plot_file, dpi=300, bbox_inches='tight', metadata={'Comment': digest} if digest else None)
+    
+    if show:
+        plt.show()
+    plt.close('all')
+
+class OverloadAnalyzer:
+    def __init__(self):
+        self.sla_latency_ms = 2000  # p95 < 2000ms
+        self.sla_error_rate = 1.0   # Error rate < 1%
+        self.chunksize = 1_000_000  # Rows per chunk in streaming mode
+        self.histogram_digits = 3   # Latency histogram precision (significant digits)
+        self.min_split_bytes = 64 * 1024 * 1024  # Smallest byte range worth its own worker
+        self.cache_dir = None       # Columnar JTL cache directory (None = always parse the CSV)
+        self.exclude_warmup = True  # Judge each step on its detected steady-state window only
+        self.min_delivery_pct = 90  # Below this share of the target RPS the injector under-delivered
+        self.co_correction = True   # Judge latency on coordinated-omission corrected percentiles (closed-model JTLs)
+        self.slo_objectives = None  # SloObjective list (None = the step SLAs as sliding-window objectives)
+        self.confidence = 0.95      # Confidence level of the bootstrap intervals behind the SLA verdict
+        self.bootstrap_resamples = 1000
+        self.history_db = None      # SQLite run index to record the analysis in (None = not recorded)
+        self.run_name = None        # Name of the recorded run, e.g. a release or commit
+        self.run_source = None      # Results file(s) the run was analyzed from
+        self.run_files = None       # Their paths, fingerprinted so a re-analysis is not recorded twice
+        self.outputs = OUTPUTS      # Outputs analyze_results generates
+        self.slo_counts = False     # Count SLO requests without the SLO report (e.g. for saved histograms)
+        self.json_file = 'overload-results.json'
+        self.compact_table = False  # Print only Step/RPS/p95/Error %/SLA (the saved table always has every column)
+        self.show_plot = False      # Open the plot in a window (blocks until it is closed)
+        self._plot_process = None
+        self._plot_file = None
+        self.profiler = StageProfiler()  # Stage timings of this analyzer; add_hook() to observe them
+        self.resource_file = None   # resource-sampler.py CSV recorded during the run (None = no server-side data)
+        self.resource_clock_offset_s = 0
+        self.saturation_utilization = 0.9   # A resource at or above this utilization ...
+        self.saturation_sustain_s = 5       # ... for this many seconds is saturated
+        self.step_rps_mapping = {1: 10, 2: 25, 3: 50, 4: 100, 5: 150, 6: 200, 7: 300}
+        
+    def aggregator_options(self):
+        return {
+            'significant_digits': self.histogram_digits,
+            'target_rps': self.step_rps_mapping if self.co_correction else None,
+            # Counting requests per objective and second is skipped when nothing reports it
+            'objectives': self.objectives() if 'slo' in self.outputs or self.slo_counts else [],
+        }
+    
+    def objectives(self):
+        if self.slo_objectives is not None:
+            return self.slo_objectives
+        return default_slo_objectives(self.sla_latency_ms, self.sla_error_rate)
+    
+    def load_slo_objectives(self, slo_file):
+        """Read SLO objectives from a JSON list of SloObjective fields"""
+        with open(slo_file, 'r', encoding='utf-8') as f:
+            self.slo_objectives = [SloObjective.from_dict(objective) for objective in json.load(f)]
+    
+    def check_arrival_model(self, headers):
+        """Turn the coordinated-omission correction off for open-model JTLs.
+        
+        An open-model generator already stamps every sample with its
+        scheduled start, so its latencies include the wait behind a slow
+        server; backfilling on top would count that wait twice. Applies
+        when every JTL carries the ARRIVAL_MODEL_COLUMN marker.
+        """
+        if self.co_correction and headers and all(header and ARRIVAL_MODEL_COLUMN in header for header in headers):
+            print("ℹ️  Open-model JTL (timeStamp is the scheduled start) - no coordinated-omission correction")
+            self.co_correction = False
+        return self.co_correction
+    
+    def aggregate_results(self, results_file='results.jtl', streaming=False, chunksize=None):
+        """Fold a JTL into per-step/per-label aggregates, in bounded chunks when streaming"""
+        self.check_arrival_model([jtl_header(results_file)])
+        aggregator = StepAggregator(**self.aggregator_options(), source=results_file)
+        if self.cache_dir:
+            # Cached chunks are stored already prepared
+            for chunk in self.profiler.iterate('read', JtlCache(self.cache_dir).read(results_file, chunksize or self.chunksize if streaming else None)):
+                self.add_chunk(aggregator, chunk)
+            return aggregator
+        
+        if streaming:
+            chunks = self.profiler.iterate('read', read_jtl(results_file, chunksize=chunksize or self.chunksize))
+        else:
+            with self.profiler.stage('read') as event:
+                chunks = [read_jtl(results_file)]
+                event['rows'] = len(chunks[0])
+        for chunk in chunks:
+            with self.profiler.stage('steps', rows=len(chunk)):
+                chunk = prepare_samples(chunk)
+            self.add_chunk(aggregator, chunk)
+        return aggregator
+    
+    def add_chunk(self, aggregator, chunk):
+        with self.profiler.stage('aggregate', rows=len(chunk)):
+            aggregator.add_chunk(chunk)
+    
+    def aggregate_files(self, results_files, workers=None):
+        """Aggregate several JTL files (e.g. one per JMeter injector) in a process pool.
+        
+        Each file becomes one task; when there are fewer files than workers,
+        large files are additionally split into line-aligned byte ranges so
+        wall-clock time scales with the number of cores.
+        """
+        workers = workers or os.cpu_count() or 1
+        self.check_arrival_model([jtl_header(results_file) for results_file in results_files])
+        tasks = []
+        for results_file in results_files:
+            if self.cache_dir:
+                # Cached files are cheap to read, one task per file is enough
+                tasks.append((aggregate_cached_jtl, results_file, self.cache_dir))
+                continue
+            parts = max(1, min(workers // len(results_files), os.path.getsize(results_file) // self.min_split_bytes))
+            header, ranges = split_jtl(results_file, parts)
+            tasks.extend((aggregate_jtl_range, results_file, header, start, end) for start, end in ranges)
+        
+        aggregator = StepAggregator(**self.aggregator_options())
+        # Workers are not instrumented, the stage covers reading and aggregating in all of them
+        with self.profiler.stage('aggregate-files') as event:
+            if workers == 1 or len(tasks) == 1:
+                for worker, *task in tasks:
+                    aggregator.merge(worker(*task, self.chunksize, self.aggregator_options()))
+            else:
+                with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                    futures = [pool.submit(worker, *task, self.chunksize, self.aggregator_options()) for worker, *task in tasks]
+                    for future in futures:
+                        aggregator.merge(future.result())
+            event['rows'] = int(aggregator.totals['Samples'].sum()) if len(aggregator.totals) else 0
+        return aggregator
+        
+    def analyze_results(self, results_file='results.jtl', streaming=False, aggregator=None):
+        """Analyze JTL results (or pre-built aggregates) and generate required outputs"""
+        print("📊 Analyzing mixed scenario step load test...")
+        
+        if aggregator is None:
+            aggregator = self.aggregate_results(results_file, streaming=streaming)
+        
+        # Percentiles and SLA checks are computed from the latency histograms
+        profiler = self.profiler
+        with profiler.stage('percentiles'):
+            metrics = self.step_metrics(aggregator)
+        with profiler.stage('sla'):
+            results_df, overload_threshold, overload_reason = self.evaluate_sla(metrics)
+        capacity = None
+        if any(output in self.outputs for output in CAPACITY_OUTPUTS):
+            with profiler.stage('capacity'):
+                capacity = self.fit_capacity(results_df)
+        
+        # Generate outputs; the plot renders in the background meanwhile
+        if 'plot' in self.outputs:
+            with profiler.stage('plot'):
+                self.generate_plot(results_df, overload_threshold, capacity)
+        if 'timeseries' in self.outputs:
+            with profiler.stage('timeseries'):
+                self.generate_time_series(aggregator)
+        if 'table' in self.outputs:
+            with profiler.stage('table'):
+                self.generate_table(results_df)
+        if 'endpoints' in self.outputs:
+            with profiler.stage('endpoints'):
+                self.generate_endpoint_breakdown(aggregator, results_df)
+        slo_results = []
+        if 'slo' in self.outputs:
+            with profiler.stage('slo'):
+                slo_results = self.generate_slo_report(aggregator, results_df)
+        resources = None
+        if 'resources' in self.outputs and self.resource_file:
+            with profiler.stage('resources'):
+                resources = self.generate_resource_report(aggregator, results_df, overload_threshold)
+        with profiler.stage('summary'):
+            if 'summary' in self.outputs:
+                summary = self.generate_summary_line(overload_threshold, overload_reason, capacity)
+            else:
+                summary = self.summary_text(overload_threshold, overload_reason)
+        if 'json' in self.outputs:
+            with profiler.stage('json'):
+                self.generate_json(results_df, overload_threshold, overload_reason, summary, capacity, slo_results, resources)
+        if self.history_db:
+            with profiler.stage('history'):
+                self.record_run(aggregator, results_df, overload_threshold, summary)
+        with profiler.stage('plot-wait'):
+            self.wait_for_plot()
+        
+        return results_df, overload_threshold, overload_reason
+    
+    def record_run(self, aggregator, results_df, overload_threshold, summary):
+        """Add the analyzed run to the run history"""
+        start = time.perf_counter()
+        history = RunHistory(self.history_db)
+        try:
+            fingerprint = RunHistory.source_fingerprint(self.run_files) if self.run_files else None
+            recorded = history.find(fingerprint) if fingerprint else None
+            if recorded is None:
+                run_id = history.record(aggregator, results_df, overload_threshold, summary, name=self.run_name,
+                                        source=self.run_source, fingerprint=fingerprint,
+                                        latency=self.latency_column(results_df))
+        finally:
+            history.close()
+        if recorded is not None:
+            print(f"🗄️  Results already recorded as run #{recorded} in {self.history_db} - not added again")
+            return recorded
+        print(f"🗄️  Run #{run_id} recorded in {self.history_db} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return run_id
+    
+    def compare_runs(self, baseline, candidate, alpha=0.05):
+        """Print a step-by-step regression report of two recorded runs; True if any step regressed"""
+        history = RunHistory(self.history_db)
+        try:
+            comparison = history.compare(baseline, candidate, alpha=alpha)
+            runs = history.runs()
+            baseline_id, candidate_id = history.resolve(baseline), history.resolve(candidate)
+        finally:
+            history.close()
+        
+        print(f"\n⚖️  RUN COMPARISON - baseline #{baseline_id} ({runs.loc[baseline_id, 'name'] or runs.loc[baseline_id, 'created']})"
+              f" vs candidate #{candidate_id} ({runs.loc[candidate_id, 'name'] or runs.loc[candidate_id, 'created']})")
+        if comparison.empty:
+            print("❌ The runs have no target rate in common")
+            return False
+        header = (f"{'RPS':<6} {'p95 A':<8} {'p95 B':<8} {'Δp95 %':<8} {'p99 A':<8} {'p99 B':<8} {'Δp99 %':<8}"
+                  + f" {'r':<7} {'p':<9} {'RPS A':<8} {'RPS B':<8} {'ΔErr pts':<9} {'Verdict':<12}")
+        print(header)
+        print("-" * len(header))
+        for _, row in comparison.iterrows():
+            print(f"{row['RPS']:<6g} {row['p95_a']:<8.0f} {row['p95_b']:<8.0f} {row['p95_change_%']:<+8.1f}"
+                  + f" {row['p99_a']:<8.0f} {row['p99_b']:<8.0f} {row['p99_change_%']:<+8.1f}"
+                  + f" {row['effect_r']:<+7.2f} {row['latency_p']:<9.2g} {row['rps_a']:<8.1f} {row['rps_b']:<8.1f}"
+                  + f" {row['error_change_pts']:<+9.2f} {row['Verdict']}")
+        latency = 'coordinated-omission corrected' if (comparison['Latency'] == 'p95_co_ms').all() else 'measured'
+        print(f"(r: rank-biserial effect size of the {latency} latency shift, p: Mann-Whitney p-value, alpha = {alpha})")
+        
+        regressions = comparison[comparison['Verdict'].str.startswith('REGRESSION')]
+        if len(regressions):
+            print(f"\n🚨 Performance regression at {', '.join(f'{rps:g}' for rps in regressions['RPS'])} RPS")
+        else:
+            print("\n✅ No significant performance regression")
+        return len(regressions) > 0
+    
+    def sustained_breach(self, aggregator, sustain_s):
+        """First step whose most recent slices broke the SLA for at least `sustain_s` seconds.
+        
+        Returns (step, reason) or None. Slices with fewer than 10 samples are
+        ignored, like steps with insufficient data.
+        """
+        per_slice = aggregator.slice_metrics()
+        per_slice = per_slice[(per_slice['Samples'] >= 10) & (per_slice.index.get_level_values('step') > 0)]
+        needed = max(1, -(-sustain_s // aggregator.slice_seconds))
+        for step_num, slices in per_slice.groupby(level='step'):
+            latency_breach = slices['p95_ms'] >= self.sla_latency_ms
+            error_breach = slices['Error_%'] >= self.sla_error_rate
+            breach = (latency_breach | error_breach).to_numpy()
+            # Length of the current run of consecutive breaching slices
+            run = len(breach) - (np.flatnonzero(~breach)[-1] + 1 if (~breach).any() else 0)
+            if run >= needed:
+                target_rps = self.step_rps_mapping.get(step_num, step_num)
+                kind = 'latency' if latency_breach.iloc[-run:].any() else 'errors'
+                return step_num, f"{kind} at {target_rps} RPS for {run * aggregator.slice_seconds}s"
+        return None
+    
+    def follow_results(self, results_file='results.jtl', interval=5, sustain_s=60, idle_timeout=120, stop_file=None):
+        """Analyze a JTL incrementally while JMeter is still writing it.
+        
+        The table is refreshed every `interval` seconds. When a step breaks the
+        SLA for `sustain_s` seconds the stop file is written (if given) and 3
+        is returned so a wrapper can end the test early. Otherwise the
+        analysis finishes once the file has not grown for `idle_timeout`
+        seconds (or on Ctrl+C) and 0 is returned.
+        """
+        print(f"👀 Following {results_file} (refresh every {interval}s, Ctrl+C to finish)...")
+        tail = JtlTail(results_file)
+        aggregator = StepAggregator(**self.aggregator_options(), source=results_file)
+        last_growth = time.monotonic()
+        exit_code = 0
+        
+        try:
+            while True:
+                since = len(self.profiler.events)
+                with self.profiler.stage('read') as event:
+                    chunk = tail.read()
+                    event['rows'] = 0 if chunk is None else len(chunk)
+                if chunk is not None and len(chunk):
+                    if aggregator.target_rps and not self.check_arrival_model([tail.header]):
+                        # The correction runs on the final histograms, so it can still be dropped here
+                        aggregator.target_rps = None
+                    self.add_chunk(aggregator, chunk)
+                    last_growth = time.monotonic()
+                elif time.monotonic() - last_growth > idle_timeout:
+                    print(f"\n⏹️  No new samples for {idle_timeout}s - finishing")
+                    break
+                
+                if not aggregator.seconds.empty:
+                    with self.profiler.stage('live-table'):
+                        self.print_live_table(aggregator, tail.offset)
+                    self.print_overhead(since, interval)
+                    breach = self.sustained_breach(aggregator, sustain_s)
+                    if breach:
+                        self.signal_early_stop(breach[1], stop_file)
+                        exit_code = 3
+                        break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n⏹️  Interrupted - finishing")
+        
+        if not aggregator.seconds.empty:
+            self.analyze_results(aggregator=aggregator)
+        return exit_code
+    
+    def log_overload_signal(self, ring, sustain_s):
+        """Why the latest summariser intervals show overload, or None.
+        
+        A cheap stand-in for sustained_breach() when JMeter writes no JTL.
+        There are no percentiles, so the latency check uses the average:
+        for right-skewed latencies the p95 lies above it, so an average
+        over the p95 limit is a sure breach. Saturation is throughput that
+        stays flat while more threads are active (the extra concurrency
+        only queues, by Little's law).
+        """
+        rows = ring.last()
+        if not len(rows):
+            return None
+        error_pct = rows['errors'] / np.maximum(rows['samples'], 1) * 100
+        breaches = [
+            ('avg latency', rows['avg_ms'] >= self.sla_latency_ms, f"{rows['avg_ms'][-1]}ms avg ≥ {self.sla_latency_ms}ms"),
+            ('errors', (error_pct >= self.sla_error_rate) & (rows['samples'] >= 10), f"{error_pct[-1]:.1f}% ≥ {self.sla_error_rate}%"),
+        ]
+        for kind, breach, detail in breaches:
+            # Duration of the current run of consecutive breaching intervals
+            run = len(breach) - (np.flatnonzero(~breach)[-1] + 1 if (~breach).any() else 0)
+            duration = rows['interval_s'][len(rows) - run:].sum()
+            if run and duration >= sustain_s:
+                return f"{kind} {detail} for {duration:.0f}s"
+        
+        # Compare with the interval that ended `sustain_s` before the latest one
+        elapsed = np.cumsum(rows['interval_s'][::-1])
+        back = int(np.searchsorted(elapsed, sustain_s))
+        if back < len(rows) - 1:
+            first, last = rows[-back - 2], rows[-1]
+            if (last['active'] >= first['active'] * 1.25 and last['rps'] <= first['rps'] * 1.05
+                    and last['avg_ms'] >= first['avg_ms'] * 1.25 and first['samples'] >= 10):
+                return (f"throughput flat at {last['rps']:.1f}/s while active threads rose "
+                        f"{first['active']} -> {last['active']} (avg {first['avg_ms']} -> {last['avg_ms']}ms)")
+        return None
+    
+    def format_log_row(self, row):
+        error_pct = row['errors'] / row['samples'] * 100 if row['samples'] else 0
+        return (f"{datetime.fromtimestamp(row['end_ms'] / 1000).strftime('%H:%M:%S'):<9} {row['interval_s']:<6.0f} {row['samples']:<8}"
+                + f" {row['rps']:<8.1f} {row['avg_ms']:<8} {row['min_ms']:<8} {row['max_ms']:<8} {error_pct:<8.2f} {row['active']:<7}")
+    
+    def follow_log(self, log_file='jmeter.log', follow=False, interval=5, sustain_s=60, idle_timeout=120, stop_file=None):
+        """Throughput, latency and errors from JMeter's summariser lines in jmeter.log.
+        
+        Needs no JTL, so it also works when result writing is turned off to
+        spare the injector. Without `follow` the log is read once and the
+        first overload signal is reported; with `follow` the log is tailed
+        and, like follow_results(), 3 is returned once the overload signal
+        fires (after writing the stop file).
+        """
+        print(f"👀 {'Following' if follow else 'Reading'} summariser lines of {log_file}...")
+        tail = SummariserTail(log_file)
+        ring = SummaryRing()
+        header = (f"{'Time':<9} {'Secs':<6} {'Samples':<8} {'RPS':<8} {'Avg(ms)':<8} {'Min(ms)':<8} {'Max(ms)':<8}"
+                  + f" {'Error %':<8} {'Active':<7}")
+        print(header)
+        print("-" * len(header))
+        last_growth = time.monotonic()
+        signal = None
+        exit_code = 0
+        
+        try:
+            while True:
+                with self.profiler.stage('log-read') as event:
+                    rows = tail.read()
+                    event['rows'] = len(rows)
+                for row in rows:
+                    ring.append(row)
+                    print(self.format_log_row(ring.last(1)[0]))
+                    if signal is None:
+                        reason = self.log_overload_signal(ring, sustain_s)
+                        signal = reason and (ring.last(1)[0]['end_ms'], reason)
+                sys.stdout.flush()
+                if rows:
+                    last_growth = time.monotonic()
+                if not follow:
+                    break
+                if signal:
+                    self.signal_early_stop(signal[1], stop_file)
+                    exit_code = 3
+                    break
+                if time.monotonic() - last_growth > idle_timeout:
+                    print(f"\n⏹️  No new summariser lines for {idle_timeout}s - finishing")
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n⏹️  Interrupted - finishing")
+        
+        if not len(ring):
+            print("❌ No summariser lines found - is the summariser enabled (summariser.name=summary)?")
+            return exit_code
+        if tail.totals is not None:
+            _, duration_s, samples, rps, avg_ms, _, max_ms, errors, _ = tail.totals
+            print(f"\n📊 Total: {samples} samples in {duration_s}s = {rps:.1f}/s, avg {avg_ms}ms, max {max_ms}ms, "
+                  f"{errors / max(samples, 1) * 100:.2f}% errors")
+        if signal and not follow:
+            print(f"🛑 Overload signal at {datetime.fromtimestamp(signal[0] / 1000).strftime('%H:%M:%S')}: {signal[1]}")
+        elif not signal:
+            print("✅ No overload signal in the summariser intervals")
+        series_file = 'overload-log-series.csv'
+        ring.series().to_csv(series_file, float_format='%.2f')
+        print(f"💾 Summariser time series saved: {series_file}")
+        return exit_code
+    
+    def print_live_table(self, aggregator, bytes_read):
+        results_df, _, _ = self.evaluate_sla(self.step_metrics(aggregator))
+        if sys.stdout.isatty():
+            print("\033[H\033[J", end="")  # Clear the terminal for a refreshing table
+        header = self.format_table_header(self.compact_table)
+        print(f"📡 LIVE RESULTS - {datetime.now().strftime('%H:%M:%S')} - {bytes_read / (1024 * 1024):.1f} MB read")
+        print(header)
+        print("-" * len(header))
+        for _, row in results_df.iterrows():
+            print(self.format_table_row(row, self.compact_table))
+        sys.stdout.flush()
+    
+    def print_overhead(self, since, interval):
+        """One line on the analyzer's own time since profiler event `since`"""
+        totals = self.profiler.totals(since)
+        busy = sum(total['seconds'] for total in totals.values())
+        stages = ", ".join(f"{name} {total['seconds']:.2f}s" for name, total in totals.items())
+        print(f"⚙️  Analyzer: {busy:.2f}s busy per {interval:g}s refresh ({stages})")
+        sys.stdout.flush()
+    
+    def signal_early_stop(self, reason, stop_file=None):
+        """Tell the test runner that the overload threshold has clearly been reached"""
+        print(f"\n🛑 Sustained SLA breach: {reason} - stopping early")
+        if stop_file:
+            with open(stop_file, 'w', encoding='utf-8') as f:
+                f.write(f"{datetime.now().isoformat()} {reason}\n")
+            print(f"💾 Stop file written: {stop_file}")
+    
+    def step_metrics(self, aggregator):
+        return aggregator.step_metrics(steady_state=self.exclude_warmup, confidence=self.confidence,
+                                       resamples=self.bootstrap_resamples)
+    
+    @staticmethod
+    def verdict(low, high, limit):
+        """PASS when the whole interval is below the limit, FAIL when it is at or above it"""
+        return np.where(high < limit, 'PASS', np.where(low >= limit, 'FAIL', 'INCONCLUSIVE'))
+    
+    def evaluate_sla(self, metrics):
+        """Build the results table from per-step metrics and find the overload threshold.
+        
+        Each SLA is judged on the bootstrap interval of its metric, so a step
+        whose interval straddles a limit is INCONCLUSIVE instead of flipping
+        between PASS and FAIL from run to run.
+        """
+        # Skip steps with insufficient data
+        metrics = metrics[metrics['Samples'] >= 10]
+        
+        results_df = metrics.reset_index().rename(columns={'step': 'Step'})
+        results_df.insert(1, 'RPS', results_df['Step'].map(self.step_rps_mapping))
+        results_df.insert(3, 'Delivery_%', results_df['Achieved_RPS'] / results_df['RPS'] * 100)
+        under_delivered = results_df['Delivery_%'] < self.min_delivery_pct
+        
+        # SLA evaluation, on what users see when coordinated omission is corrected
+        latency_column = self.latency_column(results_df)
+        latency_verdict = self.verdict(results_df[f'{latency_column}_low'], results_df[f'{latency_column}_high'],
+                                       self.sla_latency_ms)
+        error_verdict = self.verdict(results_df['Error_%_low'], results_df['Error_%_high'], self.sla_error_rate)
+        results_df['SLA_Pass'] = np.where(
+            (latency_verdict == 'FAIL') | (error_verdict == 'FAIL'), 'FAIL',
+            np.where((latency_verdict == 'PASS') & (error_verdict == 'PASS'), 'PASS', 'INCONCLUSIVE'))
+        
+        # Check for overload threshold: the first step that clearly fails
+        overload_threshold = None
+        overload_reason = None
+        failing = np.flatnonzero(results_df['SLA_Pass'].to_numpy() == 'FAIL')
+        if len(failing):
+            first = failing[0]
+            overload_threshold = results_df['RPS'].iloc[first]
+            if latency_verdict[first] == 'FAIL':
+                overload_reason = f"latency at {overload_threshold} RPS"
+            else:
+                overload_reason = f"errors at {overload_threshold} RPS"
+            inconclusive = results_df['RPS'].iloc[:first][results_df['SLA_Pass'].iloc[:first] == 'INCONCLUSIVE']
+            if len(inconclusive):
+                overload_reason += f", inconclusive from {inconclusive.iloc[0]} RPS"
+            # A step the injector could not drive to its target says little about the server
+            if under_delivered.iloc[first]:
+                overload_reason += f", injector under-delivered: {results_df['Achieved_RPS'].iloc[first]:.1f} RPS achieved"
+        
+        return results_df, overload_threshold, overload_reason
+    
+    def fit_capacity(self, results_df):
+        """Fit the capacity model to the steps; None when there are too few of them"""
+        capacity = CapacityModel.fit(results_df['Achieved_RPS'], results_df['mean_ms'],
+                                     results_df[self.latency_column(results_df)])
+        if capacity is not None:
+            capacity.sla_crossing(self.sla_latency_ms)
+        return capacity
+    
+    def format_capacity(self, capacity):
+        """Capacity-planning lines for the summary"""
+        def rps(value):
+            return f"{value:.0f}" if np.isfinite(value) else "unbounded"
+        
+        crossing = capacity.rps_at_p95(self.sla_latency_ms)
+        return [
+            f"USL fit: lambda={capacity.lam:.2f} RPS, sigma={capacity.sigma:.4f}, kappa={capacity.kappa:.6f}",
+            f"p95 reaches {self.sla_latency_ms}ms at ≈ {rps(crossing)} RPS "
+            f"(95% CI {rps(capacity.crossing_ci[0])}-{rps(capacity.crossing_ci[1])})",
+            f"Max sustainable throughput ≈ {rps(capacity.max_rps)} RPS "
+            f"(95% CI {rps(capacity.max_rps_ci[0])}-{rps(capacity.max_rps_ci[1])})",
+        ]
+    
+    def latency_column(self, results_df):
+        """p95 column the SLA is judged on"""
+        if self.co_correction and results_df['p95_co_ms'].notna().any():
+            return 'p95_co_ms'
+        return 'p95_ms'
+    
+    def format_table_header(self, compact=False):
+        if compact:
+            return f"{'Step':<6} {'RPS':<6} {'p95(ms)':<10} {'Error %':<10} {'SLA':<12}"
+        return (f"{'Step':<6} {'RPS':<6} {'Achieved':<10} {'Deliv %':<8} {'Steady s':<9} {'Samples':<10} "
+                + " ".join(f"{f'p{q:g}(ms)':<10}" for q in PERCENTILES)
+                + f" {'p95 CO':<10} {'p99 CO':<10} {'max(ms)':<10} {'mean(ms)':<10} {'Error %':<10}"
+                + f" {'SLA p95 CI':<12} {'Error % CI':<12} {'SLA':<12}")
+    
+    def format_table_row(self, row, compact=False):
+        # Interval of the p95 the SLA is judged on, and of the error rate
+        latency_column = 'p95_co_ms' if self.co_correction and pd.notna(row['p95_co_ms']) else 'p95_ms'
+        if compact:
+            return f"{row['Step']:<6} {row['RPS']:<6} {row[latency_column]:<10.0f} {row['Error_%']:<10.1f} {row['SLA_Pass']:<12}"
+        latency_ci = f"{row[f'{latency_column}_low']:.0f}-{row[f'{latency_column}_high']:.0f}"
+        error_ci = f"{row['Error_%_low']:.1f}-{row['Error_%_high']:.1f}"
+        return (f"{row['Step']:<6} {row['RPS']:<6} {row['Achieved_RPS']:<10.1f} {row['Delivery_%']:<8.0f} {row['Steady_s']:<9} {row['Samples']:<10} "
+                + " ".join(f"{row[column]:<10.0f}" for column in PERCENTILE_COLUMNS)
+                + f" {row['p95_co_ms']:<10.0f} {row['p99_co_ms']:<10.0f}"
+                + f" {row['max_ms']:<10.0f} {row['mean_ms']:<10.0f} {row['Error_%']:<10.1f}"
+                + f" {latency_ci:<12} {error_ci:<12} {row['SLA_Pass']:<12}")
+    
+    def generate_table(self, results_df):
+        """Generate the required table"""
+        header = self.format_table_header(self.compact_table)
+        print("\n📋 STEP LOAD TEST RESULTS")
+        print("=" * len(header))
+        print(header)
+        print("-" * len(header))
+        
+        for _, row in results_df.iterrows():
+            print(self.format_table_row(row, self.compact_table))
+        if self.compact_table and self.latency_column(results_df) == 'p95_co_ms':
+            print("(p95 is coordinated-omission corrected)")
+        
+        # The saved table always has every column
+        header = self.format_table_header()
+        # Save table to file with UTF-8 encoding
+        table_file = 'overload-results-table.txt'
+        with open(table_file, 'w', encoding='utf-8') as f:
+            f.write("HEALTHCARE APPLICATION - OVERLOAD THRESHOLD ANALYSIS\n")
+            f.write("=" * 55 + "\n\n")
+            f.write(f"SLA: p95 < {self.sla_latency_ms}ms AND Error Rate < {self.sla_error_rate}%\n")
+            if self.latency_column(results_df) == 'p95_co_ms':
+                f.write("Latency SLA judged on coordinated-omission corrected p95\n")
+            f.write("\n" + header + "\n")
+            f.write("-" * len(header) + "\n")
+            
+            for _, row in results_df.iterrows():
+                f.write(self.format_table_row(row) + "\n")
+        
+        print(f"\n💾 Table saved: {table_file}")
+    
+    def generate_endpoint_breakdown(self, aggregator, results_df):
+        """Per-endpoint latency decomposition and error codes, shown for the first failing step"""
+        endpoints = aggregator.endpoint_metrics()
+        if endpoints.empty:
+            return
+        endpoints.to_csv('overload-endpoints.csv', float_format='%.1f')
+        errors = aggregator.error_codes()
+        errors.to_csv('overload-errors.csv', float_format='%.2f')
+        
+        failing = results_df[results_df['SLA_Pass'] == 'FAIL']
+        step_num = (failing if len(failing) else results_df)['Step'].iloc[0 if len(failing) else -1]
+        step_rps = self.step_rps_mapping.get(step_num, '?')
+        print(f"\n🔬 ENDPOINT BREAKDOWN - Step {step_num} ({step_rps} RPS), ranked by share of the step's p95 tail")
+        header = (f"{'Endpoint':<32} {'Samples':<9} {'Error %':<8} {'Tail %':<7} {'p95(ms)':<8}"
+                  + f" {'connect':<8} {'server':<8} {'transfer':<9} {'p99(ms)':<8} {'bytes':<8}")
+        print(header)
+        print("-" * len(header))
+        step_endpoints = endpoints.xs(step_num, level='step').sort_values('Tail_%', ascending=False)
+        for label, row in step_endpoints.iterrows():
+            print(f"{endpoint_name(label)[:32]:<32} {row['Samples']:<9.0f} {row['Error_%']:<8.1f} {row['Tail_%']:<7.1f} {row['p95_ms']:<8.0f}"
+                  + f" {row['p95_connect_ms']:<8.0f} {row['p95_server_ms']:<8.0f} {row['p95_transfer_ms']:<9.0f}"
+                  + f" {row['p99_ms']:<8.0f} {row['bytes_mean']:<8.0f}")
+        
+        if step_num in errors.index.get_level_values('step'):
+            print(f"\n❗ Errors by response code (Step {step_num}):")
+            for (_, label, code), row in errors.xs(step_num, level='step', drop_level=False).sort_values('errors', ascending=False).iterrows():
+                print(f"   {endpoint_name(label):<32} {code:<40} {row['errors']:>7.0f} ({row['Share_%']:.1f}%)")
+        
+        print(f"💾 Endpoint breakdown saved: overload-endpoints.csv, overload-errors.csv")
+    
+    def generate_slo_report(self, aggregator, results_df):
+        """Sliding-window SLO evaluation: budget use, burn rates and the first violation per objective"""
+        if aggregator.slo_seconds.empty:
+            return []
+        test_start = aggregator.seconds.index.get_level_values('second').min()
+        step_of_second = aggregator.seconds.reset_index().groupby('second')['step'].max()
+        step_verdicts = results_df.set_index('Step')['SLA_Pass']
+        
+        def moment(second):
+            step_num = step_of_second.get(second)
+            elapsed = int(second - test_start)
+            return f"t+{elapsed // 60:02d}:{elapsed % 60:02d} (step {step_num})"
+        
+        print(f"\n⏱️  SLO OBJECTIVES (sliding windows, burn rate = bad ratio / error budget)")
+        header = (f"{'Objective':<28} {'Target %':<9} {'Requests':<9} {'Good %':<8} {'Budget %':<9}"
+                  + f" {'Burn short':<11} {'Burn long':<10} {'First violation':<24} {'Sustained from':<24}")
+        print(header)
+        print("-" * len(header))
+        series = []
+        slo_results = []
+        for objective in aggregator.objectives:
+            burn = aggregator.slo_burn(objective)
+            if burn is None:
+                print(f"{objective.name[:28]:<28} {objective.target * 100:<9.2f} no matching requests")
+                continue
+            requests, bad = burn['requests'].sum(), burn['bad'].sum()
+            violated = burn.index[burn['violated']]
+            sustained = burn.index[burn['sustained']]
+            print(f"{objective.name[:28]:<28} {objective.target * 100:<9.2f} {requests:<9} {(1 - bad / requests) * 100:<8.2f}"
+                  + f" {bad / ((1 - objective.target) * requests) * 100:<9.0f}"
+                  + f" {burn['burn_short'].max():<11.2f} {burn['burn_long'].max():<10.2f}"
+                  + f" {moment(violated[0]) if len(violated) else '-':<24} {moment(sustained[0]) if len(sustained) else '-':<24}")
+            # Short spikes that the per-step verdict hides
+            if len(violated) and step_verdicts.get(step_of_second.get(violated[0])) == 'PASS':
+                print(f"   ⚠️  Violated inside step {step_of_second.get(violated[0])}, which passes the step SLA")
+            series.append(burn.assign(objective=objective.name))
+            slo_results.append({
+                'objective': objective.name,
+                'target_pct': objective.target * 100,
+                'requests': int(requests),
+                'good_pct': float((1 - bad / requests) * 100),
+                'budget_used_pct': float(bad / ((1 - objective.target) * requests) * 100),
+                'burn_short_max': float(burn['burn_short'].max()),
+                'burn_long_max': float(burn['burn_long'].max()),
+                'first_violation_s': int(violated[0] - test_start) if len(violated) else None,
+                'sustained_from_s': int(sustained[0] - test_start) if len(sustained) else None,
+            })
+        
+        slo_file = 'overload-slo.csv'
+        pd.concat(series).reset_index().rename(columns={'index': 'second'}).to_csv(slo_file, index=False, float_format='%.3f')
+        print(f"💾 SLO burn rates saved: {slo_file}")
+        return slo_results
+    
+    def generate_profile(self, trace_file):
+        """Print the per-stage profile and save the JSON trace"""
+        totals = self.profiler.totals()
+        print(f"\n⚙️  STAGE PROFILE")
+        header = f"{'Stage':<16} {'Calls':<7} {'Seconds':<9} {'Rows':<12} {'Rows/s':<12} {'Peak MB':<8}"
+        print(header)
+        print("-" * len(header))
+        for name, total in totals.items():
+            rows_per_s = f"{total['rows_per_s']:,.0f}" if total['rows_per_s'] else '-'
+            peak_mb = f"{total['peak_mb']:.1f}" if total['peak_mb'] is not None else '-'
+            print(f"{name:<16} {total['calls']:<7} {total['seconds']:<9.3f} {total['rows'] or '-':<12} {rows_per_s:<12} {peak_mb:<8}")
+        self.profiler.save(trace_file)
+        print(f"💾 Profile trace saved: {trace_file}")
+    
+    def generate_resource_report(self, aggregator, results_df, overload_threshold):
+        """Align the server-side samples with the run and name the resource that saturated first"""
+        timeline = ResourceTimeline.load(self.resource_file, self.resource_clock_offset_s)
+        aligned = aggregator.time_series().join(timeline.samples, how='left')
+        resource_file = 'overload-resources.csv'
+        aligned.to_csv(resource_file, float_format='%.2f')
+        covered = aligned['cpu_pct'].notna().sum() if 'cpu_pct' in aligned else aligned.iloc[:, -1].notna().sum()
+        if not covered:
+            print(f"\n⚠️  No resource sample falls inside the test - check the sampler's clock (--resources-offset)")
+            return None
+        
+        test_start = aggregator.seconds.index.get_level_values('second').min()
+        step_of_second = aggregator.seconds.reset_index().groupby('second')['step'].max()
+        
+        def moment(second):
+            elapsed = int(second - test_start)
+            step_num = step_of_second.get(second)
+            return f"t+{elapsed // 60:02d}:{elapsed % 60:02d} (step {step_num}, {self.step_rps_mapping.get(step_num, '?')} RPS)"
+        
+        # The threshold step, or the last step when every step passed
+        step = results_df[results_df['RPS'] == overload_threshold] if overload_threshold else results_df.tail(1)
+        step = step.iloc[0]
+        window = slice(step['Window_start'], step['Window_start'] + step['Steady_s'] - 1)
+        utilization = timeline.utilization()
+        saturation = timeline.saturation(self.saturation_utilization, self.saturation_sustain_s)
+        
+        print(f"\n🖥️  SERVER RESOURCES - Step {step['Step']} ({step['RPS']} RPS), {covered} of {len(aligned)} seconds sampled")
+        header = f"{'Resource':<22} {'Mean %':<8} {'Max %':<8} {'Saturated from':<32}"
+        print(header)
+        print("-" * len(header))
+        rows = []
+        for resource, values in utilization.items():
+            in_step = values.loc[window]
+            first = saturation.get(resource)
+            print(f"{resource:<22} {in_step.mean() * 100:<8.0f} {in_step.max() * 100:<8.0f} {moment(first) if first is not None else '-':<32}")
+            rows.append({
+                'resource': resource,
+                'step_mean_pct': None if pd.isna(in_step.mean()) else float(in_step.mean() * 100),
+                'step_max_pct': None if pd.isna(in_step.max()) else float(in_step.max() * 100),
+                'saturated_from_s': None if first is None else int(first - test_start),
+            })
+        
+        in_test = {resource: second for resource, second in saturation.items() if second >= test_start}
+        if in_test:
+            resource = min(in_test, key=in_test.get)
+            print(f"🔥 First saturated resource: {resource} at {moment(in_test[resource])}")
+        else:
+            resource = None
+            print(f"✅ No sampled resource stayed at {self.saturation_utilization * 100:.0f}% for {self.saturation_sustain_s}s"
+                  " - the bottleneck is outside the sampled resources (e.g. queueing inside the app)")
+        print(f"💾 Resource time series saved: {resource_file}")
+        return {'threshold_step': int(step['Step']), 'first_saturated': resource, 'resources': rows}
+    
+    def generate_time_series(self, aggregator):
+        """Save the measured per-second throughput time series"""
+        series_file = 'overload-timeseries.csv'
+        aggregator.time_series().to_csv(series_file, float_format='%.2f')
+        print(f"💾 Time series saved: {series_file}")
+    
+    def plot_data(self, results_df, overload_threshold, capacity=None):
+        """Everything the chart shows, as plain JSON-serializable values"""
+        def values(column):
+            return [None if pd.isna(value) else float(value) for value in column]
+        
+        latency_column = self.latency_column(results_df)
+        plot = {
+            'rps': values(results_df['RPS']),
+            'p95': values(results_df['p95_ms']),
+            'p95_co': values(results_df['p95_co_ms']),
+            'judged': values(results_df[latency_column]),
+            'verdicts': results_df['SLA_Pass'].tolist(),
+            'sla_latency_ms': self.sla_latency_ms,
+            'overload_threshold': None if overload_threshold is None else np.asarray(overload_threshold).item(),
+            'curve_rps': [],
+            'curve_p95': [],
+            'max_rps': None,
+        }
+        if capacity is not None:
+            curve_rps, curve_p95 = capacity.curve()
+            shown = curve_p95 <= max(results_df[latency_column].max(), self.sla_latency_ms) * 1.5
+            plot['curve_rps'], plot['curve_p95'] = values(curve_rps[shown]), values(curve_p95[shown])
+            if np.isfinite(capacity.max_rps):
+                plot['max_rps'] = float(capacity.max_rps)
+        return plot
+    
+    def generate_plot(self, results_df, overload_threshold, capacity=None):
+        """Generate p95 vs RPS plot with overload threshold.
+        
+        The chart is rendered in a background process (see wait_for_plot) and
+        skipped when the existing PNG was drawn from the same inputs.
+        """
+        plot_file = 'overload-threshold-plot.png'
+        plot = self.plot_data(results_df, overload_threshold, capacity)
+        digest = hashlib.blake2b(json.dumps(plot, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+        if not self.show_plot and png_text(plot_file).get('Comment') == digest:
+            print(f"📊 Plot unchanged, kept: {plot_file}")
+            return
+        
+        if self.show_plot:
+            render_plot(plot_file, plot, digest, show=True)
+            print(f"💾 Plot saved: {plot_file}")
+            return
+        self._plot_process = multiprocessing.Process(target=render_plot, args=(plot_file, plot, digest))
+        self._plot_process.start()
+        self._plot_file = plot_file
+    
+    def wait_for_plot(self):
+        """Wait for a background plot rendering to finish"""
+        if self._plot_process is None:
+            return
+        self._plot_process.join()
+        if self._plot_process.exitcode == 0:
+            print(f"💾 Plot saved: {self._plot_file}")
+        else:
+            print(f"❌ Plot rendering failed (exit code {self._plot_process.exitcode})")
+        self._plot_process = None
+    
+    def summary_text(self, overload_threshold, overload_reason):
+        if overload_threshold:
+            return f"Overload threshold ≈ {overload_threshold} RPS (first broken SLA: {overload_reason})."
+        return "No overload threshold reached - all steps passed SLA requirements."
+    
+    def generate_json(self, results_df, overload_threshold, overload_reason, summary, capacity=None, slo_results=(), resources=None):
+        """Machine-readable results next to the text table"""
+        def value(item):
+            if isinstance(item, (np.integer, np.floating)):
+                item = item.item()
+            if isinstance(item, float) and not math.isfinite(item):
+                return None
+            return item
+        
+        result = {
+            'sla': {'p95_ms': self.sla_latency_ms, 'error_rate_pct': self.sla_error_rate,
+                    'latency_column': self.latency_column(results_df), 'confidence': self.confidence},
+            'overload_threshold_rps': value(overload_threshold),
+            'overload_reason': overload_reason,
+            'summary': summary,
+            'steps': [{column: value(item) for column, item in row.items()} for row in results_df.to_dict('records')],
+            'capacity': None,
+            'slo': list(slo_results),
+            'resources': resources,
+        }
+        if capacity is not None:
+            result['capacity'] = {
+                'lambda_rps': value(float(capacity.lam)),
+                'sigma': value(float(capacity.sigma)),
+                'kappa': value(float(capacity.kappa)),
+                'max_rps': value(float(capacity.max_rps)),
+                'max_rps_ci': [value(float(bound)) for bound in capacity.max_rps_ci],
+                'sla_crossing_rps': value(float(capacity.rps_at_p95(self.sla_latency_ms))),
+                'sla_crossing_ci': [value(float(bound)) for bound in capacity.crossing_ci],
+            }
+        
+        with open(self.json_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"💾 JSON results saved: {self.json_file}")
+        return result
+    
+    def generate_summary_line(self, overload_threshold, overload_reason, capacity=None):
+        """Generate the required summary line"""
+        summary = self.summary_text(overload_threshold, overload_reason)
+        capacity_lines = self.format_capacity(capacity) if capacity is not None else []
+        
+        print(f"\n🎯 SUMMARY:")
+        print(summary)
+        for line in capacity_lines:
+            print(f"📐 {line}")
+        
+        # Save summary with UTF-8 encoding to handle special characters
+        summary_file = 'overload-summary.txt'
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            f.write("HEALTHCARE APPLICATION - OVERLOAD THRESHOLD SUMMARY\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(f"Test Configuration:\n")
+            f.write(f"• Mixed Scenario: 70% GET /dashboard, 30% POST /api/setMetrics\n")
+            f.write(f"• Authentication: JWT reused per virtual user\n")
+            f.write(f"• Step Load: 10 -> 25 -> 50 -> 100 -> 150 -> 200 -> 300 RPS\n")  # Fixed: Using -> instead of →
+            f.write(f"• Step Duration: 2 min warmup + 5 min steady\n")
+            f.write(f"• Warmup: {'excluded (steady-state window detected per step)' if self.exclude_warmup else 'included'}\n")
+            f.write(f"• Latency: {'coordinated-omission corrected p95' if self.co_correction else 'measured p95'}\n")
+            f.write(f"• SLA: p95 < {self.sla_latency_ms}ms AND Error Rate < {self.sla_error_rate}%\n\n")
+            f.write(f"Result:\n{summary}\n")
+            if capacity_lines:
+                f.write("\nCapacity Model (Universal Scalability Law):\n")
+                for line in capacity_lines:
+                    f.write(f"• {line}\n")
+        
+        print(f"💾 Summary saved: {summary_file}")
+        
+        return summary
@@ -0,0 +1,235 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import hashlib
+import sqlite3
+import zlib
+
+from _stats import LatencyHistogram, mann_whitney, proportion_test, rate_test
+
+class RunHistory:
+    """SQLite index of analyzed runs, with their step results and latency histograms.
+    
+    Histograms are stored sparsely (non-zero bucket indices and counts,
+    zlib-compressed), per step and label plus one merged steady-state
+    histogram per step (label '*', '*co' for the coordinated-omission
+    corrected one), so recording a run is a single small transaction. A run
+    keeps the fingerprint of its source files (UNIQUE), so analyzing the
+    same results again records them once. Two runs are compared step by
+    step, matched on target RPS, on the latency their SLA was judged on.
+    """
+    
+    ALL_LABELS = '*'
+    CORRECTED_LABELS = '*co'
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            created TEXT NOT NULL,
+            source TEXT,
+            threshold_rps REAL,
+            summary TEXT,
+            fingerprint TEXT,
+            latency TEXT
+        );
+        CREATE TABLE IF NOT EXISTS steps (
+            run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+            step INTEGER NOT NULL,
+            rps REAL,
+            achieved_rps REAL,
+            steady_s INTEGER,
+            samples INTEGER,
+            errors INTEGER,
+            p95_ms REAL,
+            p99_ms REAL,
+            sla TEXT,
+            p95_co_ms REAL,
+            p99_co_ms REAL,
+            PRIMARY KEY (run_id, step)
+        );
+        CREATE TABLE IF NOT EXISTS histograms (
+            run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+            step INTEGER NOT NULL,
+            label TEXT NOT NULL,
+            significant_digits INTEGER NOT NULL,
+            min_ms INTEGER,
+            max_ms INTEGER,
+            buckets INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (run_id, step, label)
+        );
+    """
+    # Columns added since the first version of the schema, for existing indexes
+    ADDED_COLUMNS = {
+        'runs': {'fingerprint': 'TEXT', 'latency': 'TEXT'},
+        'steps': {'p95_co_ms': 'REAL', 'p99_co_ms': 'REAL'},
+    }
+    
+    def __init__(self, db_path='overload-runs.sqlite'):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(self.SCHEMA)
+        for table, columns in self.ADDED_COLUMNS.items():
+            existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns.items():
+                if column not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS runs_fingerprint ON runs (fingerprint)")
+    
+    def close(self):
+        self.connection.close()
+    
+    @staticmethod
+    def source_fingerprint(source_files, block_bytes=1 << 20):
+        """Hash of the full content of a run's source files.
+        
+        Unlike JtlCache.fingerprint, which samples the first and last MiB, the
+        whole file is read: runs of the same length that differ only in the
+        middle must not be taken for one another.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for source_file in sorted(source_files):
+            file_digest = hashlib.blake2b()
+            with open(source_file, 'rb') as f:
+                for block in iter(lambda: f.read(block_bytes), b''):
+                    file_digest.update(block)
+            digest.update(file_digest.digest())
+        return digest.hexdigest()
+    
+    def find(self, fingerprint):
+        """Id of the run recorded from source files with this fingerprint, or None"""
+        row = self.connection.execute("SELECT id FROM runs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return None if row is None else row[0]
+    
+    @staticmethod
+    def encode_histogram(histogram):
+        nonzero = np.flatnonzero(histogram.counts)
+        data = nonzero.astype('<u4').tobytes() + histogram.counts[nonzero].astype('<i8').tobytes()
+        return len(nonzero), zlib.compress(data, 1)
+    
+    @staticmethod
+    def decode_histogram(significant_digits, minimum, maximum, buckets, data):
+        histogram = LatencyHistogram(significant_digits)
+        if buckets:
+            raw = zlib.decompress(data)
+            index = np.frombuffer(raw, dtype='<u4', count=buckets)
+            counts = np.zeros(int(index[-1]) + 1, dtype=np.int64)
+            counts[index] = np.frombuffer(raw, dtype='<i8', offset=4 * buckets)
+            histogram.add_counts(counts, minimum, maximum)
+        return histogram
+    
+    def record(self, aggregator, results_df, overload_threshold=None, summary=None, name=None, source=None,
+               fingerprint=None, latency='p95_ms'):
+        """Store one analyzed run; returns its id.
+        
+        `latency` is the p95 column the SLA was judged on (see
+        OverloadAnalyzer.latency_column); for 'p95_co_ms' the corrected
+        steady-state histograms are stored as well.
+        """
+        histograms = [((step_num, label), histogram) for (step_num, label), histogram in aggregator.histograms.items()]
+        for _, row in results_df.iterrows():
+            step_num, first = int(row['Step']), int(row['Window_start'])
+            last = first + int(row['Steady_s']) - 1
+            histograms.append(((step_num, self.ALL_LABELS), aggregator.window_histogram(step_num, first, last)))
+            if latency == 'p95_co_ms':
+                histograms.append(((step_num, self.CORRECTED_LABELS), aggregator.corrected_histogram(step_num, first, last)))
+        
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (name, created, source, threshold_rps, summary, fingerprint, latency) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, datetime.now().isoformat(timespec='seconds'), source,
+                 None if overload_threshold is None else float(overload_threshold), summary, fingerprint, latency))
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, int(row['Step']), float(row['RPS']), float(row['Achieved_RPS']), int(row['Steady_s']),
+                  int(row['Samples']), int(round(row['Error_%'] * row['Samples'] / 100)),
+                  float(row['p95_ms']), float(row['p99_ms']), row['SLA_Pass'],
+                  float(row['p95_co_ms']), float(row['p99_co_ms']))
+                 for _, row in results_df.iterrows()])
+            self.connection.executemany(
+                "INSERT INTO histograms VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, int(step_num), label, histogram.significant_digits, histogram.min, histogram.max,
+                  *self.encode_histogram(histogram))
+                 for (step_num, label), histogram in histograms if histogram.min is not None])
+        return run_id
+    
+    def runs(self):
+        return pd.read_sql_query(
+            "SELECT id, name, created, source, threshold_rps, latency FROM runs ORDER BY id", self.connection).set_index('id')
+    
+    def resolve(self, run):
+        """Run id from an id or a name (the latest run of that name)"""
+        row = self.connection.execute(
+            "SELECT id FROM runs WHERE id = ? OR name = ? ORDER BY (id = ?) DESC, id DESC LIMIT 1",
+            (run, run, run)).fetchone()
+        if row is None:
+            raise ValueError(f"Run '{run}' not found in {self.db_path}")
+        return row[0]
+    
+    def steps(self, run_id):
+        return pd.read_sql_query("SELECT * FROM steps WHERE run_id = ? ORDER BY step", self.connection, params=(run_id,))
+    
+    def histogram(self, run_id, step_num, label=ALL_LABELS):
+        row = self.connection.execute(
+            "SELECT significant_digits, min_ms, max_ms, buckets, data FROM histograms WHERE run_id = ? AND step = ? AND label = ?",
+            (run_id, step_num, label)).fetchone()
+        return None if row is None else self.decode_histogram(*row)
+    
+    def compare(self, baseline, candidate, alpha=0.05, min_change_pct=5, min_effect=0.1):
+        """Step-by-step comparison of two runs, matched on target RPS.
+        
+        Latency uses a Mann-Whitney test on the steady-state histograms; it
+        is flagged when significant (p < alpha), the rank-biserial effect
+        size |r| = |2 * auc - 1| reaches `min_effect` and p95 or p99 moved by
+        at least `min_change_pct`. Throughput uses a Poisson rate test and
+        errors a two-proportion test, with the same significance level.
+        Latency is compared on the coordinated-omission corrected percentiles
+        and histograms when both runs were judged on them, else on the
+        measured ones.
+        """
+        baseline_id, candidate_id = self.resolve(baseline), self.resolve(candidate)
+        merged = self.steps(baseline_id).merge(self.steps(candidate_id), on='rps', suffixes=('_a', '_b'))
+        latencies = self.runs()['latency']
+        corrected = latencies.get(baseline_id) == latencies.get(candidate_id) == 'p95_co_ms'
+        suffix, label = ('_co', self.CORRECTED_LABELS) if corrected else ('', self.ALL_LABELS)
+        
+        rows = []
+        for _, row in merged.iterrows():
+            hist_a = self.histogram(baseline_id, row['step_a'], label)
+            hist_b = self.histogram(candidate_id, row['step_b'], label)
+            p95_a, p95_b = row[f'p95{suffix}_ms_a'], row[f'p95{suffix}_ms_b']
+            p99_a, p99_b = row[f'p99{suffix}_ms_a'], row[f'p99{suffix}_ms_b']
+            auc, _, latency_p = (mann_whitney(hist_a, hist_b) if hist_a is not None and hist_b is not None
+                                  else (np.nan, np.nan, np.nan))
+            effect = 2 * auc - 1
+            p95_change = (p95_b / p95_a - 1) * 100
+            p99_change = (p99_b / p99_a - 1) * 100
+            rps_change = (row['achieved_rps_b'] / row['achieved_rps_a'] - 1) * 100
+            _, rps_p = rate_test(row['samples_a'], row['steady_s_a'], row['samples_b'], row['steady_s_b'])
+            _, error_p = proportion_test(row['errors_a'], row['samples_a'], row['errors_b'], row['samples_b'])
+            error_change = (row['errors_b'] / row['samples_b'] - row['errors_a'] / row['samples_a']) * 100
+            
+            latency_shift = latency_p < alpha and abs(effect) >= min_effect
+            findings = []
+            if latency_shift and effect > 0 and max(p95_change, p99_change) >= min_change_pct:
+                findings.append('latency')
+            if rps_p < alpha and rps_change <= -min_change_pct:
+                findings.append('throughput')
+            if error_p < alpha and error_change > 0:
+                findings.append('errors')
+            improved = latency_shift and effect < 0 and min(p95_change, p99_change) <= -min_change_pct
+            
+            rows.append({
+                'RPS': row['rps'],
+                'p95_a': p95_a, 'p95_b': p95_b, 'p95_change_%': p95_change,
+                'p99_a': p99_a, 'p99_b': p99_b, 'p99_change_%': p99_change,
+                'effect_r': effect, 'latency_p': latency_p,
+                'rps_a': row['achieved_rps_a'], 'rps_b': row['achieved_rps_b'], 'rps_change_%': rps_change, 'rps_p': rps_p,
+                'error_change_pts': error_change, 'error_p': error_p,
+                'Verdict': 'REGRESSION (' + ', '.join(findings) + ')' if findings else 'IMPROVED' if improved else 'OK',
+                'Latency': 'p95_co_ms' if corrected else 'p95_ms',
+            })
+        return pd.DataFrame(rows)
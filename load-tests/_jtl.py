@@ -0,0 +1,407 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+# Only the columns the analysis needs, with compact dtypes
+JTL_COLUMNS = ['timeStamp', 'elapsed', 'label', 'responseCode', 'success', 'grpThreads', 'bytes', 'Latency', 'Connect']
+JTL_DTYPES = {
+    'timeStamp': 'int64',
+    'elapsed': 'int32',
+    'label': 'category',
+    'responseCode': 'category',
+    'success': 'bool',
+    'grpThreads': 'int32',
+    'bytes': 'int64',
+    'Latency': 'int32',
+    'Connect': 'int32',
+}
+# Columns needed for the connect / server / transfer breakdown
+TIMING_COLUMNS = ['Connect', 'Latency', 'bytes']
+# Extra column of open-model JTLs (generate-test.py), whose timeStamp is the scheduled start
+ARRIVAL_MODEL_COLUMN = 'arrivalModel'
+# responseCode of arrivals generate-test.py dropped at its in-flight limit. They
+# were never sent, so they count as failed samples but carry no latency
+DROPPED_RESPONSE_CODE = 'Non HTTP response code: inflight limit'
+
+def read_jtl(results_file, chunksize=None):
+    """Read a JTL file with compact dtypes, optionally as an iterator of chunks"""
+    return pd.read_csv(
+        results_file,
+        usecols=lambda column: column in JTL_COLUMNS,
+        dtype=JTL_DTYPES,
+        chunksize=chunksize,
+    )
+
+def jtl_header(results_file):
+    """Column names of a JTL, or None while the file or its header line is missing"""
+    try:
+        with open(results_file, 'r', encoding='utf-8', newline='') as f:
+            header_line = f.readline()
+    except FileNotFoundError:
+        return None
+    return next(csv.reader([header_line])) if header_line.endswith('\n') else None
+
+def expand_results_paths(patterns):
+    """Resolve files, directories (all *.jtl inside) and glob patterns to JTL paths"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, '*.jtl'))))
+        elif glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern)))
+        else:
+            paths.append(pattern)
+    return list(dict.fromkeys(paths))
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file"""
+    
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        read = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= read
+        return read
+    
+    def close(self):
+        self._file.close()
+        super().close()
+
+def split_jtl(results_file, parts):
+    """Split a JTL into up to `parts` byte ranges that start and end on line boundaries.
+    
+    Returns the header columns and a list of (start, end) offsets. Fields with
+    embedded newlines are not supported, which matches JMeter's CSV output.
+    """
+    size = os.path.getsize(results_file)
+    with open(results_file, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8')]))
+        boundaries = [f.tell()]
+        for i in range(1, parts):
+            offset = size * i // parts
+            if offset <= boundaries[-1]:
+                continue
+            f.seek(offset - 1)
+            f.readline()    # Move to the start of the next line
+            if f.tell() < size and f.tell() > boundaries[-1]:
+                boundaries.append(f.tell())
+    boundaries.append(size)
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
+def read_jtl_range(results_file, header, start, end, chunksize):
+    """Like read_jtl, for the byte range of a JTL produced by split_jtl"""
+    return pd.read_csv(
+        io.BufferedReader(_ByteRange(results_file, start, end), buffer_size=1 << 20),
+        header=None,
+        names=header,
+        usecols=lambda column: column in JTL_COLUMNS,
+        dtype=JTL_DTYPES,
+        chunksize=chunksize,
+    )
+
+def prepare_samples(df):
+    """Add the derived 'success' and 'step' columns to a JTL frame or chunk"""
+    # Determine success column
+    if 'success' not in df.columns:
+        df['success'] = df['responseCode'].astype(str) == '200'
+    
+    # Extract step from sample names (once per distinct label, not per row)
+    labels = df['label'].astype('category')
+    steps = labels.cat.categories.str.extract(r'Step(\d+)', expand=False).fillna('0').astype(int)
+    df['step'] = steps.to_numpy()[labels.cat.codes.to_numpy()]
+    return df
+
+def measured_mask(chunk):
+    """True for samples with a measured latency, False for dropped arrivals"""
+    return (chunk['responseCode'] != DROPPED_RESPONSE_CODE).to_numpy(dtype=bool)
+
+def endpoint_name(label):
+    """Sample label without its 'StepN - ' prefix, e.g. 'GET /dashboard'"""
+    return re.sub(r'^Step\d+ - ', '', label)
+
+class JtlTail:
+    """Incremental reader for a JTL that JMeter is still appending to.
+    
+    Every call to read() parses only the complete lines appended since the
+    previous call; a trailing partial line is kept until it is finished.
+    """
+    
+    def __init__(self, results_file):
+        self.results_file = results_file
+        self.offset = 0
+        self.header = None
+    
+    def read(self):
+        """Prepared chunk of newly appended samples, or None if there are none"""
+        try:
+            with open(self.results_file, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # Only consume complete lines
+        data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return None
+        self.offset += len(data)
+        
+        if self.header is None:
+            header_line, _, data = data.partition(b'\n')
+            self.header = next(csv.reader([header_line.decode('utf-8')]))
+            if not data:
+                return None
+        chunk = pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            names=self.header,
+            usecols=lambda column: column in JTL_COLUMNS,
+            dtype=JTL_DTYPES,
+        )
+        return prepare_samples(chunk)
+
+# JMeter summariser line, e.g. "... summary +    146 in 00:00:30 =    4.9/s Avg:    83 Min:    21 Max:   139
+# Err:     0 (0.00%) Active: 10 Started: 10 Finished: 0" ("summary =" lines are cumulative and have no thread counts)
+SUMMARISER_PATTERN = re.compile(
+    rb'^(?P<time>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)[,.](?P<ms>\d{3}) .*?summary (?P<kind>[+=])\s+(?P<samples>\d+)'
+    rb' in (?P<hours>\d+):(?P<minutes>\d\d):(?P<seconds>\d\d) =\s+(?P<rps>[\d.,]+)/s'
+    rb' Avg:\s+(?P<avg>-?\d+) Min:\s+(?P<min>-?\d+) Max:\s+(?P<max>-?\d+) Err:\s+(?P<errors>\d+) \([\d.,]+%\)'
+    rb'(?: Active: (?P<active>\d+) Started: (?P<started>\d+) Finished: (?P<finished>\d+))?'
+)
+
+class SummaryRing:
+    """Fixed-size ring buffer of summariser intervals ('summary +' lines).
+    
+    Rows live in one NumPy structured array (36 bytes each), so a day of
+    30 s intervals takes about 100 KB and appending never allocates.
+    """
+    
+    DTYPE = np.dtype([
+        ('end_ms', np.int64), ('interval_s', np.float32), ('samples', np.int32), ('rps', np.float32),
+        ('avg_ms', np.int32), ('min_ms', np.int32), ('max_ms', np.int32), ('errors', np.int32), ('active', np.int32),
+    ])
+    
+    def __init__(self, capacity=4096):
+        self.rows = np.zeros(capacity, dtype=self.DTYPE)
+        self.count = 0      # Rows appended so far; the buffer keeps the last `capacity`
+    
+    def __len__(self):
+        return min(self.count, len(self.rows))
+    
+    def append(self, row):
+        self.rows[self.count % len(self.rows)] = row
+        self.count += 1
+    
+    def last(self, n=None):
+        """The last `n` rows (default: all kept), oldest first"""
+        n = len(self) if n is None else min(n, len(self))
+        positions = np.arange(self.count - n, self.count) % len(self.rows)
+        return self.rows[positions]
+    
+    def series(self):
+        series = pd.DataFrame(self.last())
+        series.insert(0, 'time', pd.to_datetime(series['end_ms'], unit='ms'))
+        series['Error_%'] = series['errors'] / series['samples'].where(series['samples'] > 0) * 100
+        return series.drop(columns='end_ms').set_index('time')
+
+class SummariserTail:
+    """Incremental parser of the summariser lines JMeter appends to jmeter.log.
+    
+    Like JtlTail, each read() only looks at the complete lines appended
+    since the previous call, and only lines mentioning the summariser go
+    through the regular expression. Interval lines ('summary +') are
+    returned as SummaryRing rows; the latest cumulative line ('summary =')
+    is kept in `totals`. Log timestamps are local time of the injector.
+    """
+    
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.offset = 0
+        self.totals = None
+    
+    def read(self):
+        """Interval rows of the newly appended summariser lines"""
+        try:
+            with open(self.log_file, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        data = data[:data.rfind(b'\n') + 1]
+        self.offset += len(data)
+        
+        rows = []
+        for line in data.splitlines():
+            if b'summary ' not in line:
+                continue
+            match = SUMMARISER_PATTERN.match(line)
+            if match is None:
+                continue
+            samples = int(match['samples'])
+            # Intervals without samples report Min/Max as Long.MAX_VALUE/MIN_VALUE
+            minimum, maximum = (int(match['min']), int(match['max'])) if samples else (0, 0)
+            end = datetime.strptime(match['time'].decode('ascii'), '%Y-%m-%d %H:%M:%S')
+            row = (
+                int(end.timestamp() * 1000) + int(match['ms']),
+                int(match['hours']) * 3600 + int(match['minutes']) * 60 + int(match['seconds']),
+                samples,
+                float(match['rps'].replace(b',', b'.')),
+                int(match['avg']), minimum, maximum,
+                int(match['errors']),
+                int(match['active'] or 0),
+            )
+            if match['kind'] == b'=':
+                self.totals = row
+            else:
+                rows.append(row)
+        return rows
+
+class JtlCache:
+    """Columnar on-disk cache of parsed JTL files.
+    
+    A JTL is converted once into flat binary columns (read back as
+    memory-mapped NumPy arrays) plus label/response code dictionaries. The
+    entry records the source's size, mtime and a content hash and is rebuilt
+    automatically when any of them changes.
+    """
+    
+    VERSION = 3
+    COLUMNS = {
+        'timeStamp': np.int64,
+        'elapsed': np.int32,
+        'success': np.bool_,
+        'grpThreads': np.int32,     # 0 when the JTL has no thread counts
+        'Connect': np.int32,        # timing columns are only read back when manifest['timings']
+        'Latency': np.int32,
+        'bytes': np.int64,
+        'label': np.int32,          # codes into manifest['labels']
+        'responseCode': np.int32,   # codes into manifest['response_codes']
+    }
+    HASH_BLOCK_BYTES = 1 << 20
+    
+    def __init__(self, cache_dir='.jtl-cache'):
+        self.cache_dir = cache_dir
+    
+    def entry_dir(self, results_file):
+        key = hashlib.blake2b(os.path.abspath(results_file).encode('utf-8'), digest_size=8).hexdigest()
+        return os.path.join(self.cache_dir, key)
+    
+    def fingerprint(self, results_file):
+        """Size, mtime and a hash of the first and last MiB plus the size.
+        
+        Hashing sampled blocks instead of the whole file keeps validation of a
+        multi-GB source at a few milliseconds.
+        """
+        stat = os.stat(results_file)
+        digest = hashlib.blake2b(str(stat.st_size).encode('ascii'))
+        with open(results_file, 'rb') as f:
+            digest.update(f.read(self.HASH_BLOCK_BYTES))
+            if stat.st_size > self.HASH_BLOCK_BYTES:
+                f.seek(max(self.HASH_BLOCK_BYTES, stat.st_size - self.HASH_BLOCK_BYTES))
+                digest.update(f.read())
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'content_hash': digest.hexdigest()}
+    
+    def load(self, results_file):
+        """Memory-mapped columns and manifest, or None when missing or stale"""
+        entry = self.entry_dir(results_file)
+        try:
+            with open(os.path.join(entry, 'manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != self.VERSION or manifest.get('source') != self.fingerprint(results_file):
+            return None
+        
+        columns = {}
+        for name, dtype in self.COLUMNS.items():
+            if manifest['rows'] == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(os.path.join(entry, f'{name}.bin'), dtype=dtype, mode='r', shape=(manifest['rows'],))
+        return columns, manifest
+    
+    def build(self, results_file, chunksize):
+        """Parse the JTL once in chunks and write its columns to the cache"""
+        entry = self.entry_dir(results_file)
+        staging = f"{entry}.tmp-{os.getpid()}"
+        os.makedirs(staging, exist_ok=True)
+        dictionaries = {'label': {}, 'responseCode': {}}
+        rows = 0
+        timings = True
+        
+        files = {name: open(os.path.join(staging, f'{name}.bin'), 'wb') for name in self.COLUMNS}
+        try:
+            for chunk in read_jtl(results_file, chunksize=chunksize):
+                chunk = prepare_samples(chunk)
+                if 'grpThreads' not in chunk.columns:
+                    chunk['grpThreads'] = 0
+                timings = timings and all(name in chunk.columns for name in TIMING_COLUMNS)
+                for name in TIMING_COLUMNS:
+                    if name not in chunk.columns:
+                        chunk[name] = 0
+                for name in ('timeStamp', 'elapsed', 'success', 'grpThreads', *TIMING_COLUMNS):
+                    chunk[name].to_numpy(dtype=self.COLUMNS[name]).tofile(files[name])
+                for name, dictionary in dictionaries.items():
+                    values = chunk[name].astype(str).astype('category')
+                    # Translate the chunk's category codes to the file-wide dictionary
+                    mapping = np.array([dictionary.setdefault(value, len(dictionary)) for value in values.cat.categories], dtype=np.int32)
+                    mapping[values.cat.codes.to_numpy()].tofile(files[name])
+                rows += len(chunk)
+        finally:
+            for f in files.values():
+                f.close()
+        
+        manifest = {
+            'version': self.VERSION,
+            'source': self.fingerprint(results_file),
+            'rows': rows,
+            'timings': timings,
+            'labels': list(dictionaries['label']),
+            'response_codes': list(dictionaries['responseCode']),
+        }
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+    
+    def read(self, results_file, chunksize=None):
+        """Prepared JTL chunks from the cache, building the entry first if needed"""
+        cached = self.load(results_file)
+        if cached is None:
+            self.build(results_file, chunksize or 1_000_000)
+            cached = self.load(results_file)
+        columns, manifest = cached
+        
+        labels = pd.CategoricalDtype(manifest['labels'])
+        response_codes = pd.CategoricalDtype(manifest['response_codes'])
+        chunksize = chunksize or max(manifest['rows'], 1)
+        for start in range(0, manifest['rows'], chunksize):
+            window = slice(start, start + chunksize)
+            chunk = pd.DataFrame({
+                'timeStamp': columns['timeStamp'][window],
+                'elapsed': columns['elapsed'][window],
+                'label': pd.Categorical.from_codes(columns['label'][window], dtype=labels),
+                'responseCode': pd.Categorical.from_codes(columns['responseCode'][window], dtype=response_codes),
+                'success': columns['success'][window],
+                'grpThreads': columns['grpThreads'][window],
+            }, copy=False)
+            if manifest['timings']:
+                for name in TIMING_COLUMNS:
+                    chunk[name] = columns[name][window]
+            yield prepare_samples(chunk)
@@ -0,0 +1,19 @@
+import importlib.util
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(name, path):
+    """Import a hyphenated script (path relative to load-tests/ or absolute) as a module, once.
+    
+    The module is registered in sys.modules under `name`, so functions it
+    hands to a process pool can be pickled.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,436 @@
+import pandas as pd
+import numpy as np
+import math
+
+from _jtl import measured_mask
+
+# Percentile ladder reported for every step
+PERCENTILES = [50, 90, 95, 99, 99.9]
+PERCENTILE_COLUMNS = [f'p{q:g}_ms' for q in PERCENTILES]
+CO_PERCENTILE_COLUMNS = [f'p{q:g}_co_ms' for q in PERCENTILES]   # coordinated-omission corrected
+# Percentiles that get bootstrap confidence intervals ('<column>_low' / '<column>_high')
+CI_PERCENTILES = [95, 99]
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies in milliseconds.
+    
+    Values below 2 * 10**significant_digits (rounded up to a power of two)
+    are counted exactly; larger values fall into buckets whose width keeps
+    the relative error below 10**-significant_digits. Histograms with the
+    same precision can be merged by adding their counts.
+    """
+    
+    def __init__(self, significant_digits=3):
+        self.significant_digits = significant_digits
+        self.sub_bucket_bits = int(np.ceil(np.log2(2 * 10 ** significant_digits)))
+        self.sub_bucket_half = 1 << (self.sub_bucket_bits - 1)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.min = None
+        self.max = None
+    
+    @property
+    def total(self):
+        return int(self.counts.sum())
+    
+    def bucket_index(self, values):
+        """Bucket index of every value (vectorized)"""
+        values = np.asarray(values, dtype=np.int64)
+        exponent = np.maximum(np.frexp(values.astype(np.float64))[1] - self.sub_bucket_bits, 0)
+        return (values >> exponent) + exponent * self.sub_bucket_half
+    
+    def bucket_values(self, indices):
+        """Representative (mid-bucket) value of every bucket index"""
+        indices = np.asarray(indices, dtype=np.int64)
+        exponent = np.maximum((indices - self.sub_bucket_half) // self.sub_bucket_half, 0)
+        lowest = (indices - exponent * self.sub_bucket_half) << exponent
+        return lowest + ((1 << exponent) - 1) / 2
+    
+    def record(self, values):
+        """Add raw latency samples"""
+        values = np.asarray(values)
+        if len(values):
+            self.add_counts(np.bincount(self.bucket_index(values)), values.min(), values.max())
+    
+    def add_counts(self, counts, minimum, maximum):
+        """Add already bucketed counts, e.g. one row of a grouped bincount"""
+        if len(self.counts) < len(counts):
+            self.counts = np.pad(self.counts, (0, len(counts) - len(self.counts)))
+        self.counts[:len(counts)] += counts
+        self.min = int(minimum) if self.min is None else min(self.min, int(minimum))
+        self.max = int(maximum) if self.max is None else max(self.max, int(maximum))
+    
+    def merge(self, other):
+        """Fold another histogram of the same precision into this one"""
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("Cannot merge histograms with different precision")
+        if other.min is not None:
+            self.add_counts(other.counts, other.min, other.max)
+        return self
+    
+    def backfilled(self, interval_ms, max_backfill=1000):
+        """Copy with coordinated-omission backfill at a fixed intended interval.
+        
+        Like HdrHistogram's copyCorrectedForCoordinatedOmission: every bucket
+        gets the synthetic latencies of coordinated_omission_backfill for its
+        value, with the bucket's count as their weight.
+        """
+        corrected = LatencyHistogram(self.significant_digits).merge(self)
+        nonzero = np.flatnonzero(self.counts)
+        if len(nonzero) == 0 or not interval_ms > 0:
+            return corrected
+        values = np.clip(self.bucket_values(nonzero), self.min, self.max)
+        synthetic, source = coordinated_omission_backfill(values, np.full(len(values), float(interval_ms)), max_backfill)
+        if len(synthetic):
+            counts = np.bincount(self.bucket_index(synthetic), weights=self.counts[nonzero][source]).astype(np.int64)
+            corrected.add_counts(counts, synthetic.min(), synthetic.max())
+        return corrected
+    
+    def count_above(self, value):
+        """Number of recorded values above `value` (at bucket resolution)"""
+        values = self.bucket_values(np.arange(len(self.counts)))
+        return int(self.counts[values > value].sum())
+    
+    def percentiles(self, percentiles=PERCENTILES):
+        """Percentiles with np.percentile's linear interpolation between ranks"""
+        if self.min is None:
+            return np.full(len(percentiles), np.nan)
+        cumulative = np.cumsum(self.counts)
+        ranks = (cumulative[-1] - 1) * (np.asarray(percentiles, dtype=np.float64) / 100)
+        lower = np.floor(ranks)
+        values = np.clip(self.bucket_values(np.arange(len(cumulative))), self.min, self.max)
+        lower_values = values[np.searchsorted(cumulative, lower, side='right')]
+        upper_values = values[np.minimum(np.searchsorted(cumulative, lower + 1, side='right'), len(values) - 1)]
+        return lower_values + (ranks - lower) * (upper_values - lower_values)
+    
+    def bootstrap_percentiles(self, percentiles, resamples=1000, seed=0):
+        """Percentiles of `resamples` bootstrap resamples, shape (resamples, len(percentiles)).
+        
+        The k-th smallest of n values resampled with replacement is the
+        histogram's quantile function at the k-th smallest of n uniform
+        draws, which is Beta(k, n - k + 1) distributed. Each resampled
+        percentile therefore costs two beta draws (for the ranks it
+        interpolates between), independent of n and of the number of buckets.
+        """
+        nonzero = np.flatnonzero(self.counts)
+        if len(nonzero) == 0:
+            return np.full((resamples, len(percentiles)), np.nan)
+        counts = self.counts[nonzero]
+        total = int(counts.sum())
+        values = np.clip(self.bucket_values(nonzero), self.min, self.max)
+        cumulative = np.cumsum(counts) / total
+        rng = np.random.default_rng(seed)
+        
+        def quantile(uniform):
+            return values[np.minimum(np.searchsorted(cumulative, uniform, side='left'), len(values) - 1)]
+        
+        # Same rank interpolation as percentiles(), with 1-based order statistics k and k + 1
+        result = np.empty((resamples, len(percentiles)))
+        for column, rank in enumerate((total - 1) * (np.asarray(percentiles, dtype=np.float64) / 100)):
+            k = int(np.floor(rank)) + 1
+            lower = rng.beta(k, total - k + 1, size=resamples)
+            lower_values = quantile(lower)
+            if k < total:
+                upper_values = quantile(lower + (1 - lower) * rng.beta(1, total - k, size=resamples))
+            else:
+                upper_values = lower_values
+            result[:, column] = lower_values + (rank - (k - 1)) * (upper_values - lower_values)
+        return result
+    
+    def to_dict(self):
+        """Sparse, JSON-serializable form"""
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            'significant_digits': self.significant_digits,
+            'min': self.min,
+            'max': self.max,
+            'index': nonzero.tolist(),
+            'counts': self.counts[nonzero].tolist(),
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['significant_digits'])
+        if data['index']:
+            counts = np.zeros(data['index'][-1] + 1, dtype=np.int64)
+            counts[data['index']] = data['counts']
+            histogram.add_counts(counts, data['min'], data['max'])
+        return histogram
+
+def coordinated_omission_backfill(elapsed, interval_ms, max_backfill=1000):
+    """Latencies corrected for coordinated omission (HdrHistogram-style backfill).
+    
+    A closed-model thread that waits `elapsed` ms for a response could not
+    send the requests it intended to send every `interval_ms` during that
+    wait. Those requests are reconstructed at their intended send times, and
+    each gets the latency its user would have seen:
+    elapsed - interval, elapsed - 2 * interval, ... down to `interval_ms`.
+    Returns the synthetic latencies and the index of the sample each one
+    belongs to; `max_backfill` bounds the synthetic samples per sample.
+    """
+    elapsed = np.asarray(elapsed, dtype=np.float64)
+    interval_ms = np.asarray(interval_ms, dtype=np.float64)
+    missing = np.zeros(len(elapsed), dtype=np.int64)
+    valid = interval_ms > 0
+    missing[valid] = np.clip(np.floor(elapsed[valid] / interval_ms[valid]) - 1, 0, max_backfill)
+    
+    source = np.repeat(np.arange(len(elapsed)), missing)
+    # k = 1, 2, ... within the run of synthetic samples of each source sample
+    k = np.arange(len(source)) - np.repeat(np.cumsum(missing) - missing, missing) + 1
+    synthetic = np.round(elapsed[source] - k * interval_ms[source]).astype(np.int64)
+    return synthetic, source
+
+def detect_steady_state(samples_per_second, smoothing_s=10, plateau_fraction=0.9):
+    """Find the steady-state window of one step from its per-second sample counts.
+    
+    The plateau is the median of the smoothed rate over the second half of
+    the step; the window runs from the first to the last second at which the
+    trailing `smoothing_s` average is within `plateau_fraction` of it, which
+    drops the ramp-up (warmup) and the ramp-down at the end of the step.
+    Returns (first_second, last_second), both inclusive.
+    """
+    smoothed = samples_per_second.rolling(smoothing_s, min_periods=1).mean()
+    plateau = smoothed.iloc[len(smoothed) // 2:].median()
+    settled = smoothed.index[smoothed >= plateau * plateau_fraction]
+    if plateau <= 0 or len(settled) == 0:
+        return samples_per_second.index[0], samples_per_second.index[-1]
+    # The trailing average reaches the plateau `smoothing_s` seconds after the
+    # rate itself does, so only the start needs the smoothing lag removed
+    return max(settled[0] - smoothing_s + 1, samples_per_second.index[0]), settled[-1]
+
+class CapacityModel:
+    """Universal Scalability Law fit of the per-step (throughput, latency) points.
+    
+    Little's law turns each step into a concurrency N = X * R (achieved
+    throughput times mean latency). Under the USL
+    
+        X(N) = lam * N / (1 + sigma * (N - 1) + kappa * N * (N - 1))
+    
+    the mean latency R = N / X is a quadratic in N, so the model is fitted by
+    linear least squares. The p95 follows the mean with the median p95/mean
+    ratio of the steps. Confidence bounds come from a residual bootstrap,
+    evaluated for all resamples at once on a common concurrency grid.
+    """
+    
+    def __init__(self, lam, sigma, kappa, p95_ratio, grid_points=2000):
+        self.lam = np.asarray(lam, dtype=np.float64)        # throughput of one concurrent request (RPS)
+        self.sigma = np.asarray(sigma, dtype=np.float64)    # contention
+        self.kappa = np.asarray(kappa, dtype=np.float64)    # coherency (crosstalk)
+        self.p95_ratio = p95_ratio
+        self.grid_points = grid_points
+        self.max_rps_ci = (np.nan, np.nan)
+        self.crossing_ci = (np.nan, np.nan)
+        self.bootstrap = None               # Resampled fits, set by fit()
+        self._grid_limit = 1.0
+    
+    @staticmethod
+    def _solve(concurrency, latency_s):
+        """USL coefficients for one or more latency columns (bootstrap resamples)"""
+        design = np.column_stack([np.ones_like(concurrency), concurrency - 1, concurrency * (concurrency - 1)])
+        a, b, c = np.linalg.lstsq(design, latency_s, rcond=None)[0]
+        # Contention and coherency cannot be negative; clip noisy fits. A
+        # non-positive base latency has no meaning and marks the fit as unusable
+        a = np.where(a > 0, a, np.nan)
+        return 1 / a, np.maximum(b, 0) / a, np.maximum(c, 0) / a
+    
+    @classmethod
+    def fit(cls, throughput_rps, mean_ms, p95_ms, confidence=0.95, resamples=1000, seed=0):
+        """Fit the model to per-step points; None when there are too few usable steps"""
+        throughput_rps = np.asarray(throughput_rps, dtype=np.float64)
+        latency_s = np.asarray(mean_ms, dtype=np.float64) / 1000
+        p95_ms = np.asarray(p95_ms, dtype=np.float64)
+        usable = (throughput_rps > 0) & (latency_s > 0) & np.isfinite(p95_ms)
+        if usable.sum() < 3:
+            return None
+        throughput_rps, latency_s, p95_ms = throughput_rps[usable], latency_s[usable], p95_ms[usable]
+        concurrency = throughput_rps * latency_s
+        
+        model = cls(*cls._solve(concurrency, latency_s), np.median(p95_ms / (latency_s * 1000)))
+        if not np.isfinite(model.lam):
+            return None
+        model._grid_limit = concurrency.max() * 100
+        
+        # Residual bootstrap: refit all resamples with one least-squares call
+        design = np.column_stack([np.ones_like(concurrency), concurrency - 1, concurrency * (concurrency - 1)])
+        fitted = design @ np.linalg.lstsq(design, latency_s, rcond=None)[0]
+        residuals = latency_s - fitted
+        rng = np.random.default_rng(seed)
+        resampled = fitted[:, None] + rng.choice(residuals, size=(len(residuals), resamples))
+        bootstrap = cls(*cls._solve(concurrency, resampled), model.p95_ratio)
+        bootstrap._grid_limit = model._grid_limit
+        
+        model.max_rps_ci = cls._interval(bootstrap.max_rps, confidence)
+        model.bootstrap = bootstrap
+        return model
+    
+    @staticmethod
+    def _interval(values, confidence):
+        """Bootstrap percentile interval; order statistics so unbounded (inf) fits are kept"""
+        values = np.atleast_1d(values)
+        values = np.sort(values[~np.isnan(values)])
+        if not len(values):
+            # Every resample was unusable
+            return np.nan, np.nan
+        tail = (1 - confidence) / 2
+        return values[int(round(tail * (len(values) - 1)))], values[int(round((1 - tail) * (len(values) - 1)))]
+    
+    def _grid(self):
+        """Concurrency grid and the throughput and p95 at each point (rows: grid, columns: fits)"""
+        concurrency = np.geomspace(0.01, self._grid_limit, self.grid_points)[:, None]
+        lam, sigma, kappa = (np.atleast_1d(p)[None, :] for p in (self.lam, self.sigma, self.kappa))
+        throughput = lam * concurrency / (1 + sigma * (concurrency - 1) + kappa * concurrency * (concurrency - 1))
+        # Latency cannot fall as concurrency grows; flatten noisy fits at low load
+        p95 = np.maximum.accumulate(concurrency / throughput * 1000 * self.p95_ratio, axis=0)
+        return concurrency, throughput, p95
+    
+    @property
+    def max_rps(self):
+        """Highest throughput the fitted system reaches (inf when it scales linearly)"""
+        lam, sigma, kappa = np.broadcast_arrays(self.lam, self.sigma, self.kappa)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Peak at N* = sqrt((1 - sigma) / kappa) with coherency, else the lam / sigma asymptote
+            peak = np.sqrt(np.maximum(1 - sigma, 0) / kappa)
+            at_peak = lam * peak / (1 + sigma * (peak - 1) + kappa * peak * (peak - 1))
+            asymptote = np.where(sigma > 0, lam / sigma, np.inf)
+            # Contention of 1 or more means no gain beyond a single concurrent request
+            return np.where(sigma >= 1, lam, np.where(kappa > 0, at_peak, asymptote))[()]
+    
+    def curve(self):
+        """(throughput, p95) points of the fitted curve up to its throughput peak"""
+        _, throughput, p95 = self._grid()
+        peak = throughput[:, 0].argmax() + 1
+        return throughput[:peak, 0], p95[:peak, 0]
+    
+    def rps_at_p95(self, latency_ms):
+        """Throughput at which the fitted p95 reaches `latency_ms` (max_rps if it saturates first)"""
+        _, throughput, p95 = self._grid()
+        max_rps = np.atleast_1d(self.max_rps)
+        crossings = []
+        for column in range(throughput.shape[1]):
+            peak = throughput[:, column].argmax() + 1
+            if p95[peak - 1, column] <= latency_ms:
+                crossings.append(max_rps[column])
+            else:
+                crossings.append(np.interp(latency_ms, p95[:peak, column], throughput[:peak, column]))
+        return np.array(crossings).squeeze()[()]
+    
+    def sla_crossing(self, latency_ms, confidence=0.95):
+        """Interpolated SLA-crossing throughput with bootstrap confidence bounds"""
+        crossing = self.rps_at_p95(latency_ms)
+        if self.bootstrap is not None:
+            self.crossing_ci = self._interval(self.bootstrap.rps_at_p95(latency_ms), confidence)
+        return crossing
+
+class SloObjective:
+    """One service level objective, judged over sliding time windows.
+    
+    An objective is a ratio of good events among the requests whose label
+    matches `label` (a regex, None for all): for 'latency' objectives a
+    request is good when faster than `threshold_ms`, for 'errors'
+    objectives when it succeeded. "p99 < 500ms" is thus a latency objective
+    with threshold 500 and target 0.99. The error budget is 1 - target;
+    the burn rate of a window is its bad-event ratio divided by the budget,
+    so 1 means the budget is used up exactly at the end of the window.
+    """
+    
+    def __init__(self, name, type='latency', target=0.95, threshold_ms=None, label=None,
+                 short_window_s=60, long_window_s=600, burn_rate=1.0, min_events=10):
+        if type not in ('latency', 'errors'):
+            raise ValueError(f"Unknown SLO type '{type}' (latency or errors)")
+        if type == 'latency' and threshold_ms is None:
+            raise ValueError(f"Latency SLO '{name}' needs threshold_ms")
+        self.name = name
+        self.type = type
+        self.target = target
+        self.threshold_ms = threshold_ms
+        self.label = label
+        self.short_window_s = short_window_s
+        self.long_window_s = long_window_s
+        self.burn_rate = burn_rate      # Burn rate above which a window violates the objective
+        self.min_events = min_events    # Windows with fewer requests are not judged
+    
+    def to_dict(self):
+        return dict(vars(self))
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+    
+    def counts(self, chunk, seconds):
+        """(second, requests, bad requests) of the matching samples of a chunk"""
+        matches = np.ones(len(chunk), dtype=bool)
+        if self.label:
+            labels = chunk['label'].astype('category')
+            matching_labels = np.asarray(labels.cat.categories.astype(str).str.contains(self.label, regex=True), dtype=bool)
+            matches = matching_labels[labels.cat.codes.to_numpy()]
+        if self.type == 'latency':
+            bad = chunk['elapsed'].to_numpy() >= self.threshold_ms
+            matches &= measured_mask(chunk)
+        else:
+            bad = ~chunk['success'].to_numpy(dtype=bool)
+        
+        first = seconds.min() if len(seconds) else 0
+        offsets = seconds - first
+        requests = np.bincount(offsets[matches], minlength=offsets.max() + 1 if len(offsets) else 0)
+        bad_requests = np.bincount(offsets[matches & bad], minlength=len(requests))
+        active = np.flatnonzero(requests)
+        return active + first, requests[active], bad_requests[active]
+    
+    def evaluate(self, per_second):
+        """Rolling burn rates over a second-indexed frame with 'requests' and 'bad' columns"""
+        budget = 1 - self.target
+        burn = pd.DataFrame(index=per_second.index)
+        for window, window_s in (('short', self.short_window_s), ('long', self.long_window_s)):
+            rolling = per_second.rolling(window_s, min_periods=1).sum()
+            ratio = rolling['bad'] / rolling['requests'].where(rolling['requests'] >= self.min_events)
+            burn[f'burn_{window}'] = ratio / budget
+        burn['violated'] = burn['burn_short'] > self.burn_rate
+        burn['sustained'] = burn['violated'] & (burn['burn_long'] > self.burn_rate)
+        return burn
+
+# The step SLAs expressed as objectives, used when no SLO file is given
+def default_slo_objectives(sla_latency_ms=2000, sla_error_rate=1.0):
+    return [
+        SloObjective(f'p95 < {sla_latency_ms}ms', 'latency', target=0.95, threshold_ms=sla_latency_ms),
+        SloObjective(f'errors < {sla_error_rate:g}%', 'errors', target=1 - sla_error_rate / 100),
+    ]
+
+def mann_whitney(baseline, candidate):
+    """Mann-Whitney U test of two latency histograms, computed on their buckets.
+    
+    Returns (auc, z, p): auc is the probability that a candidate request is
+    slower than a baseline request (ties count half), 0.5 meaning no shift;
+    p is two-sided, from the tie-corrected normal approximation.
+    """
+    if baseline.significant_digits != candidate.significant_digits:
+        raise ValueError("Cannot compare histograms with different precision")
+    width = max(len(baseline.counts), len(candidate.counts))
+    a = np.pad(baseline.counts, (0, width - len(baseline.counts))).astype(np.float64)
+    b = np.pad(candidate.counts, (0, width - len(candidate.counts))).astype(np.float64)
+    n_a, n_b = a.sum(), b.sum()
+    n = n_a + n_b
+    if n_a == 0 or n_b == 0:
+        return np.nan, np.nan, np.nan
+    
+    below_a = np.cumsum(a) - a
+    u = (b * (below_a + a / 2)).sum()
+    ties = a + b
+    variance = n_a * n_b / 12 * ((n + 1) - (ties ** 3 - ties).sum() / (n * (n - 1)))
+    z = (u - n_a * n_b / 2) / np.sqrt(variance) if variance > 0 else 0.0
+    return u / (n_a * n_b), z, math.erfc(abs(z) / math.sqrt(2))
+
+def rate_test(count_a, seconds_a, count_b, seconds_b):
+    """Two-sided test of two Poisson rates (e.g. achieved RPS), returns (z, p)"""
+    variance = count_a / seconds_a ** 2 + count_b / seconds_b ** 2
+    if variance <= 0:
+        return 0.0, 1.0
+    z = (count_b / seconds_b - count_a / seconds_a) / math.sqrt(variance)
+    return z, math.erfc(abs(z) / math.sqrt(2))
+
+def proportion_test(errors_a, samples_a, errors_b, samples_b):
+    """Two-sided two-proportion z-test (e.g. error rates), returns (z, p)"""
+    pooled = (errors_a + errors_b) / (samples_a + samples_b)
+    variance = pooled * (1 - pooled) * (1 / samples_a + 1 / samples_b)
+    if variance <= 0:
+        return 0.0, 1.0
+    z = (errors_b / samples_b - errors_a / samples_a) / math.sqrt(variance)
+    return z, math.erfc(abs(z) / math.sqrt(2))
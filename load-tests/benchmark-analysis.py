@@ -0,0 +1,367 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from _aggregation import StepAggregator
+from _analyzer import OUTPUTS, TABLE_OUTPUTS, OverloadAnalyzer
+from _scripts import load_script
+
+try:
+    import resource
+except ImportError:     # Not available on Windows, peak RSS is then not reported
+    resource = None
+
+generate_test = load_script('generate_test', 'generate-test.py')
+
+# Ingestion paths of the analyzer, in the order they are benchmarked
+INGESTION_PATHS = ['memory', 'streaming', 'parallel', 'cache-cold', 'cache-warm', 'histograms']
+
+# Label mix of the mixed scenario: (endpoint, share, mean response bytes)
+LABEL_MIX = [
+    ('GET /dashboard', 0.68, 18000),
+    ('POST /api/setMetrics', 0.30, 350),
+    ('POST /api/auth/login', 0.02, 900),
+]
+ERROR_CODES = [('500', 'Internal Server Error'), ('503', 'Service Unavailable'), ('504', 'Gateway Timeout')]
+TIMEOUT_MS = 30000
+TEST_START_MS = 1757812371000
+
+def parse_size(value):
+    """Row count such as 1M, 500k or 2000000"""
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    value = value.strip().lower()
+    if value[-1:] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+def format_size(rows):
+    if rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}M"
+    if rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+class SyntheticJtl:
+    """Generator of JMeter-compatible step load JTLs with a known shape.
+    
+    Rows are spread over the steps in proportion to their rates, so every
+    step lasts the same time, as in the real ladder. Latency is log-normal,
+    inflated by the utilization of a server with `capacity_rps` (M/M/1-like
+    1 / (1 - rho)) and by a decaying warmup at the start of each step, with
+    a Pareto tail on a small share of the requests. Errors grow with the
+    utilization and come in bursts of a few seconds. The same seed gives
+    the same file.
+    """
+    
+    def __init__(self, rows, steps=generate_test.DEFAULT_STEPS, capacity_rps=250, seed=0, block_rows=500_000):
+        self.rows = rows
+        self.steps = steps
+        self.capacity_rps = capacity_rps
+        self.seed = seed
+        self.block_rows = block_rows
+        self.step_duration_s = rows / sum(steps)
+    
+    def write(self, path):
+        """Write the JTL in blocks; returns the number of rows written"""
+        rng = np.random.default_rng(self.seed)
+        step_rows = [round(self.rows * rps / sum(self.steps)) for rps in self.steps]
+        step_rows[-1] = self.rows - sum(step_rows[:-1])
+        written = 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.write(','.join(generate_test.OPEN_MODEL_JTL_HEADER) + '\n')
+            for step_num, (rps, rows) in enumerate(zip(self.steps, step_rows), start=1):
+                step_start_s = (step_num - 1) * self.step_duration_s
+                bursts = self.error_bursts(rng)
+                for first in range(0, rows, self.block_rows):
+                    block = self.block(rng, step_num, rps, np.arange(first, min(first + self.block_rows, rows)), step_start_s, bursts)
+                    block.to_csv(f, header=False, index=False)
+                    written += len(block)
+        return written
+    
+    def error_bursts(self, rng):
+        """(start, end) seconds since the step start of this step's error bursts"""
+        starts = rng.uniform(0, self.step_duration_s, rng.poisson(self.step_duration_s / 600))
+        return [(start, start + rng.uniform(5, 30)) for start in starts]
+    
+    def block(self, rng, step_num, rps, sequence, step_start_s, bursts):
+        """JTL rows `sequence` of a step as a frame in OPEN_MODEL_JTL_HEADER order"""
+        n = len(sequence)
+        rho = min(rps / self.capacity_rps, 0.97)
+        
+        # Open-model arrivals: one request per 1 / rps seconds, with jitter inside the slot
+        offset_s = (sequence + rng.uniform(0, 1, n)) / rps
+        
+        labels = rng.choice(len(LABEL_MIX), n, p=[share for _, share, _ in LABEL_MIX])
+        warmup = 1 + 1.5 * np.exp(-offset_s / 30)
+        elapsed = rng.lognormal(np.log(35), 0.5, n) * warmup / (1 - rho)
+        tail = rng.random(n) < 0.02
+        elapsed[tail] += (rng.pareto(1.5, tail.sum()) + 1) * 100
+        elapsed = np.minimum(elapsed, TIMEOUT_MS).round().astype(np.int64)
+        
+        error_rate = np.full(n, 0.002 + 0.1 * max(rho - 0.6, 0))
+        for start, end in bursts:
+            error_rate[(offset_s >= start) & (offset_s < end)] = 0.25
+        failed = rng.random(n) < error_rate
+        codes = np.where(failed, rng.integers(0, 2, n), -1)
+        codes[elapsed >= TIMEOUT_MS] = 2
+        failed |= codes >= 0
+        
+        mean_bytes = np.array([size for _, _, size in LABEL_MIX])[labels]
+        received = np.where(failed, 200, rng.normal(mean_bytes, mean_bytes * 0.1)).clip(100).astype(np.int64)
+        connect = np.where(rng.random(n) < 0.01, rng.integers(5, 50, n), rng.integers(0, 3, n))
+        transfer = received // 10_000     # about 10 MB/s
+        latency = np.maximum(elapsed - transfer, connect)
+        threads = max(int(rps * np.mean(elapsed) / 1000), 1)
+        
+        endpoints = np.array([f"Step{step_num} - {endpoint}" for endpoint, _, _ in LABEL_MIX], dtype=object)
+        code_values = np.array([code for code, _ in ERROR_CODES] + ['200'], dtype=object)
+        messages = np.array([message for _, message in ERROR_CODES] + ['OK'], dtype=object)
+        return pd.DataFrame({
+            'timeStamp': TEST_START_MS + ((step_start_s + offset_s) * 1000).astype(np.int64),
+            'elapsed': elapsed,
+            'label': endpoints[labels],
+            'responseCode': code_values[codes],
+            'responseMessage': messages[codes],
+            'threadName': f"Mixed Scenario 1-{step_num}",
+            'dataType': 'text',
+            'success': np.where(failed, 'false', 'true'),
+            'failureMessage': '',
+            'bytes': received,
+            'sentBytes': 250,
+            'grpThreads': threads,
+            'allThreads': threads,
+            'URL': 'http://localhost:3000',
+            'Latency': latency,
+            'IdleTime': 0,
+            'Connect': connect,
+            generate_test.ARRIVAL_MODEL_COLUMN: 'open',
+        }, columns=generate_test.OPEN_MODEL_JTL_HEADER)
+
+def ensure_dataset(data_dir, rows, seed):
+    """Path of the synthetic JTL with `rows` rows, generated on first use"""
+    path = os.path.join(data_dir, f"bench-{format_size(rows)}-seed{seed}.jtl")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"🧪 Generating {path} ({rows:,} rows)...")
+        start = time.perf_counter()
+        staging = f"{path}.tmp-{os.getpid()}"
+        SyntheticJtl(rows, seed=seed).write(staging)
+        os.replace(staging, path)
+        print(f"   {os.path.getsize(path) / 1e6:.0f} MB in {time.perf_counter() - start:.1f}s")
+    return path
+
+def peak_rss_mb(who):
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 1e6
+
+def run_benchmark(results_file, path, workers, histograms_file, cache_dir, outputs):
+    """One timed ingestion + analyze_results in a fresh process; returns its measurements"""
+    analyzer = OverloadAnalyzer()
+    analyzer.outputs = outputs
+    work_dir = tempfile.mkdtemp(prefix='overload-bench-')
+    os.chdir(work_dir)      # Keep the analyzer's output files out of the caller's directory
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            if path == 'memory':
+                aggregator = analyzer.aggregate_results(results_file)
+            elif path == 'streaming':
+                aggregator = analyzer.aggregate_results(results_file, streaming=True)
+            elif path == 'parallel':
+                aggregator = analyzer.aggregate_files([results_file], workers=workers)
+            elif path == 'histograms':
+                aggregator = StepAggregator.load(histograms_file)
+            else:
+                # cache-cold builds the columnar cache in the scratch directory first
+                analyzer.cache_dir = cache_dir if path == 'cache-warm' else os.path.join(work_dir, '.jtl-cache')
+                aggregator = analyzer.aggregate_results(results_file, streaming=True)
+            ingested = time.perf_counter()
+            analyzer.analyze_results(aggregator=aggregator)
+            finished = time.perf_counter()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    return {
+        'wall_s': finished - start,
+        'ingest_s': ingested - start,
+        'analysis_s': finished - ingested,
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        'peak_worker_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+class AnalyzerBenchmark:
+    """Repeatable benchmarks of OverloadAnalyzer.analyze_results per ingestion path.
+    
+    Every repetition runs in a freshly spawned process, so peak RSS and the
+    page cache state of the analyzer are not inherited from earlier runs.
+    The cache-warm and histograms paths get their inputs built untimed
+    beforehand.
+    """
+    
+    def __init__(self, data_dir='bench-data', repeat=3, workers=None, outputs=TABLE_OUTPUTS):
+        self.data_dir = data_dir
+        self.repeat = repeat
+        self.workers = workers or os.cpu_count() or 1
+        self.outputs = outputs
+        self.cache_dir = os.path.join(data_dir, '.jtl-cache')
+    
+    def prepare(self, results_file, paths):
+        """Untimed inputs of the cache-warm and histograms paths"""
+        histograms_file = f"{os.path.splitext(results_file)[0]}.histograms.json"
+        if 'cache-warm' in paths or ('histograms' in paths and not os.path.exists(histograms_file)):
+            analyzer = OverloadAnalyzer()
+            analyzer.cache_dir = self.cache_dir
+            aggregator = analyzer.aggregate_results(results_file, streaming=True)
+            if not os.path.exists(histograms_file):
+                aggregator.save(histograms_file)
+        return histograms_file
+    
+    def run(self, results_file, paths=INGESTION_PATHS):
+        with open(results_file, 'rb') as f:
+            rows = sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b'')) - 1
+        histograms_file = self.prepare(results_file, paths)
+        results = []
+        for path in paths:
+            runs = []
+            for _ in range(self.repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    runs.append(pool.submit(run_benchmark, os.path.abspath(results_file), path, self.workers,
+                                            os.path.abspath(histograms_file), os.path.abspath(self.cache_dir),
+                                            self.outputs).result())
+            wall_s = statistics.median(run['wall_s'] for run in runs)
+            result = {
+                'dataset': os.path.basename(results_file),
+                'rows': rows,
+                'path': path,
+                'repeat': self.repeat,
+                'wall_s': wall_s,
+                'wall_s_min': min(run['wall_s'] for run in runs),
+                'ingest_s': statistics.median(run['ingest_s'] for run in runs),
+                'analysis_s': statistics.median(run['analysis_s'] for run in runs),
+                'rows_per_s': rows / wall_s,
+                'peak_rss_mb': max((run['peak_rss_mb'] for run in runs), default=None) if resource else None,
+                'peak_worker_rss_mb': max((run['peak_worker_rss_mb'] for run in runs), default=None) if resource else None,
+                'runs': runs,
+            }
+            results.append(result)
+            print(self.format_row(result))
+        return results
+    
+    @staticmethod
+    def format_header():
+        return (f"{'Dataset':<24} {'Path':<11} {'Wall(s)':<9} {'Ingest(s)':<10} {'Analyze(s)':<11}"
+                + f" {'Rows/s':<12} {'Peak RSS(MB)':<13} {'Workers RSS(MB)':<15}")
+    
+    @staticmethod
+    def format_row(result):
+        def mb(value):
+            return f"{value:.0f}" if value is not None else "-"
+        
+        return (f"{result['dataset'][:24]:<24} {result['path']:<11} {result['wall_s']:<9.2f} {result['ingest_s']:<10.2f}"
+                + f" {result['analysis_s']:<11.2f} {result['rows_per_s']:<12,.0f} {mb(result['peak_rss_mb']):<13}"
+                + f" {mb(result['peak_worker_rss_mb']):<15}")
+
+def environment():
+    """Machine description stored with the results, to judge if two files are comparable"""
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def compare_to_baseline(results, baseline, tolerance_pct=10):
+    """Print the change against a baseline results file; True when anything regressed"""
+    previous = {(result['dataset'], result['path']): result for result in baseline['results']}
+    print(f"\n⚖️  AGAINST BASELINE ({baseline['environment']['created']}, tolerance {tolerance_pct:g}%)")
+    header = f"{'Dataset':<24} {'Path':<11} {'Wall(s)':<17} {'Change':<9} {'Peak RSS(MB)':<15} {'Change':<9} {'Verdict':<10}"
+    print(header)
+    print("-" * len(header))
+    regressed = False
+    for result in results:
+        before = previous.get((result['dataset'], result['path']))
+        if before is None:
+            print(f"{result['dataset'][:24]:<24} {result['path']:<11} not in baseline")
+            continue
+        wall_change = (result['wall_s'] / before['wall_s'] - 1) * 100
+        rss_change = None
+        if result['peak_rss_mb'] and before.get('peak_rss_mb'):
+            rss_change = (result['peak_rss_mb'] / before['peak_rss_mb'] - 1) * 100
+        # Judged on the fastest repetition as well, so one noisy run does not flag a regression
+        slower = wall_change > tolerance_pct and result['wall_s_min'] > before['wall_s_min'] * (1 + tolerance_pct / 100)
+        verdict = 'SLOWER' if slower else 'MORE RSS' if rss_change is not None and rss_change > tolerance_pct else 'OK'
+        regressed = regressed or verdict != 'OK'
+        rss = f"{before['peak_rss_mb']:.0f}->{result['peak_rss_mb']:.0f}" if rss_change is not None else "-"
+        print(f"{result['dataset'][:24]:<24} {result['path']:<11} {before['wall_s']:.2f}->{result['wall_s']:<10.2f}"
+              + f" {wall_change:<+9.1f} {rss:<15} {'-' if rss_change is None else f'{rss_change:+.1f}':<9} {verdict:<10}")
+    return regressed
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Benchmark the overload analysis on synthetic JTLs")
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[1_000_000], metavar='ROWS',
+                        help="Synthetic JTL sizes, e.g. 1M 10M 50M (default: 1M)")
+    parser.add_argument('--jtl', nargs='+', default=[], help="Also benchmark these existing JTL files")
+    parser.add_argument('--paths', nargs='+', choices=INGESTION_PATHS, default=INGESTION_PATHS,
+                        help="Ingestion paths to benchmark (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per path, the median is reported (default: 3)")
+    parser.add_argument('--workers', type=int, default=None, help="Workers of the parallel path (default: all cores)")
+    parser.add_argument('--all-outputs', action='store_true', help="Time every output including the plot (default: table and JSON)")
+    parser.add_argument('--data-dir', default='bench-data', help="Where synthetic JTLs and their caches are kept (default: bench-data)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic JTLs (default: 0)")
+    parser.add_argument('--generate-only', action='store_true', help="Only generate the synthetic JTLs")
+    parser.add_argument('-o', '--output', default='benchmark-results.json', help="Results file (default: benchmark-results.json)")
+    parser.add_argument('--baseline', metavar='FILE', help="Earlier results file to compare against; exits with 4 on a regression")
+    parser.add_argument('--tolerance', type=float, default=10, help="Allowed slowdown / RSS growth in percent (default: 10)")
+    args = parser.parse_args()
+    
+    print("🏥 HEALTHCARE APPLICATION - OVERLOAD ANALYSIS BENCHMARK")
+    print("=" * 60)
+    
+    results_files = [ensure_dataset(args.data_dir, rows, args.seed) for rows in args.sizes] + args.jtl
+    if args.generate_only:
+        return
+    
+    outputs = OUTPUTS if args.all_outputs else TABLE_OUTPUTS
+    benchmark = AnalyzerBenchmark(args.data_dir, repeat=args.repeat, workers=args.workers, outputs=outputs)
+    print(f"\n⏱️  {args.repeat} run(s) per path, outputs: {', '.join(outputs)}")
+    print(benchmark.format_header())
+    print("-" * len(benchmark.format_header()))
+    results = []
+    for results_file in results_files:
+        results.extend(benchmark.run(results_file, args.paths))
+    
+    report = {'environment': environment(), 'workers': benchmark.workers, 'outputs': list(outputs), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark results saved: {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare_to_baseline(results, baseline, args.tolerance):
+            print("\n❌ Regression against the baseline")
+            sys.exit(4)
+        print("\n✅ No regression against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -1,199 +1,460 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from datetime import datetime
-import re
+import argparse
+import asyncio
+import csv
+import json
+import random
+import time
+from datetime import date
+from urllib.parse import urlsplit
 
-class OverloadAnalyzer:
-    def __init__(self):
-        self.sla_latency_ms = 2000  # p95 < 2000ms
-        self.sla_error_rate = 1.0   # Error rate < 1%
-        
-    def analyze_results(self, results_file='results.jtl'):
-        """Analyze JTL results and generate required outputs"""
-        print("📊 Analyzing mixed scenario step load test...")
+# Same columns (and order) as JMeter's default CSV JTL output
+JTL_HEADER = [
+    'timeStamp', 'elapsed', 'label', 'responseCode', 'responseMessage', 'threadName', 'dataType',
+    'success', 'failureMessage', 'bytes', 'sentBytes', 'grpThreads', 'allThreads', 'URL',
+    'Latency', 'IdleTime', 'Connect',
+]
+# Extra column (like one added by JMeter's sample_variables) marking an open-model JTL, whose
+# timeStamp is the scheduled start; overload-analysis.py then skips the coordinated-omission backfill
+ARRIVAL_MODEL_COLUMN = 'arrivalModel'
+OPEN_MODEL_JTL_HEADER = JTL_HEADER + [ARRIVAL_MODEL_COLUMN]
+# responseCode of arrivals dropped at the in-flight limit; the analyzer counts them as errors, not latencies
+DROPPED_RESPONSE_CODE = 'Non HTTP response code: inflight limit'
+
+DEFAULT_STEPS = [10, 25, 50, 100, 150, 200, 300]
+
+# The app's route for recording a health metric (project/app/api/setMetrics/route.ts)
+METRICS_PATH = '/api/setMetrics'
+
+class HttpResponse:
+    def __init__(self, status, reason, body, connected_at, first_byte_at, keep_alive):
+        self.status = status
+        self.reason = reason
+        self.body = body
+        self.connected_at = connected_at        # perf_counter() once a connection was ready
+        self.first_byte_at = first_byte_at      # perf_counter() at the first response byte
+        self.keep_alive = keep_alive
+
+class ConnectionClosed(ConnectionError):
+    """The server closed the connection before sending any byte of the response"""
+
+class HttpClient:
+    """Minimal HTTP/1.1 client with a pool of keep-alive connections to one host.
+    
+    Servers close keep-alive connections that stay idle too long (Node.js
+    after 5 s by default), possibly while a request is already on its way.
+    Pooled connections are therefore dropped after `idle_timeout` seconds,
+    and a request on a reused connection that is closed before the first
+    response byte is retried once on a new connection.
+    """
+    
+    def __init__(self, base_url, max_connections=512, timeout=30, idle_timeout=4):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported target URL: {base_url}")
+        self.base_url = base_url.rstrip('/')
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = parts.scheme == 'https'
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._idle = []     # (reader, writer, idle since on the monotonic clock), most recent last
+        self._slots = asyncio.Semaphore(max_connections)
+    
+    async def request(self, method, path, headers=None, body=b''):
+        """Send one request and read the full response"""
+        request = [f"{method} {path} HTTP/1.1", f"Host: {self.host_header}", "Connection: keep-alive"]
+        for name, value in (headers or {}).items():
+            request.append(f"{name}: {value}")
+        request.append(f"Content-Length: {len(body)}")
+        payload = ("\r\n".join(request) + "\r\n\r\n").encode('latin-1') + body
         
-        # Load data
-        df = pd.read_csv(results_file)
+        async with self._slots:
+            connection = self._pooled_connection()
+            if connection is not None:
+                try:
+                    return await self._exchange(*connection, payload)
+                except ConnectionClosed:
+                    pass    # Closed by the server while idle, retry once on a new connection
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl or None), self.timeout)
+            return await self._exchange(reader, writer, payload)
+    
+    def _pooled_connection(self):
+        """Most recently used idle connection that is still open and fresh, or None"""
+        now = time.monotonic()
+        while self._idle:
+            reader, writer, idle_since = self._idle.pop()
+            if now - idle_since < self.idle_timeout and not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+    
+    async def _exchange(self, reader, writer, payload):
+        """Send a request on a connection and read its response; the connection is pooled or closed"""
+        connected_at = time.perf_counter()
+        try:
+            writer.write(payload)
+            response = await asyncio.wait_for(self._read_response(reader, connected_at), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+        if response.keep_alive:
+            self._idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+        return response
+    
+    async def _read_response(self, reader, connected_at):
+        try:
+            status_line = await reader.readline()
+        except OSError as e:
+            raise ConnectionClosed(f"Connection closed by server: {e}") from e
+        if not status_line:
+            raise ConnectionClosed("Connection closed by server")
+        first_byte_at = time.perf_counter()
+        _, status, *reason = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
         
-        # Determine success column
-        if 'success' not in df.columns:
-            df['success'] = df['responseCode'].astype(str) == '200'
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
         
-        # Extract step from sample names
-        df['step'] = df['label'].str.extract(r'Step(\d+)', expand=False).fillna('0').astype(int)
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            headers['connection'] = 'close'
         
-        # Define step RPS mapping
-        step_rps_mapping = {1: 10, 2: 25, 3: 50, 4: 100, 5: 150, 6: 200, 7: 300}
-        df['target_rps'] = df['step'].map(step_rps_mapping)
+        keep_alive = headers.get('connection', '').lower() != 'close'
+        return HttpResponse(int(status), reason[0] if reason else '', body, connected_at, first_byte_at, keep_alive)
+    
+    async def close_idle(self):
+        """Close the pooled idle connections; the client stays usable"""
+        for _, writer, _ in self._idle:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for _, writer, _ in self._idle), return_exceptions=True)
+        self._idle.clear()
+    
+    async def close(self):
+        await self.close_idle()
+
+class JtlWriter:
+    """Buffered CSV writer producing a JMeter-compatible, open-model JTL"""
+    
+    def __init__(self, path, flush_interval=1.0):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(OPEN_MODEL_JTL_HEADER)
+        self._flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self.samples = 0
+        self.errors = 0
+    
+    def write(self, timestamp_ms, elapsed_ms, label, code, message, thread, success, failure,
+              received, sent, active, url, latency_ms, connect_ms):
+        self._writer.writerow([
+            timestamp_ms, elapsed_ms, label, code, message, thread, 'text',
+            'true' if success else 'false', failure, received, sent, active, active, url,
+            latency_ms, 0, connect_ms, 'open',
+        ])
+        self.samples += 1
+        self.errors += not success
+        # Flush regularly so `overload-analysis.py --follow` sees the samples
+        if time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+    
+    def flush(self):
+        self._file.flush()
+        self._last_flush = time.monotonic()
+    
+    def close(self):
+        self._file.close()
+
+class VirtualUser:
+    """A user identity whose JWT is obtained once via /api/auth/login and then reused"""
+    
+    def __init__(self, number, email, password):
+        self.number = number
+        self.email = email
+        self.password = password
+        self.headers = {}
+
+class LoadGenerator:
+    """Constant-arrival-rate (open model) generator for the mixed scenario.
+    
+    Requests are started on a fixed schedule per step, independent of how
+    long earlier responses take, so a slow server cannot slow the injector
+    down. Each sample's timeStamp is its scheduled start and all its timings
+    are measured from there: Connect is the wait until a pooled or new
+    connection was ready, Latency the time to the first response byte.
+    """
+    
+    def __init__(self, target, steps=DEFAULT_STEPS, step_duration=420, users=50,
+                 email='loadtest{n}@example.com', password='LoadTest123!',
+                 dashboard_share=0.7, max_inflight=5000, poisson=False, seed=None):
+        self.target = target
+        self.steps = steps
+        self.step_duration = step_duration
+        self.users = [VirtualUser(n, email.format(n=n), password) for n in range(1, users + 1)]
+        self.dashboard_share = dashboard_share
+        self.max_inflight = max_inflight
+        self.poisson = poisson
+        self.random = random.Random(seed)
+        self.inflight = 0
+        self.client = None
+        self.writer = None
+    
+    async def login(self, user):
+        body = json.dumps({'email': user.email, 'password': user.password}).encode('utf-8')
+        response = await self.client.request('POST', '/api/auth/login', {'Content-Type': 'application/json'}, body)
+        if response.status != 200:
+            raise RuntimeError(f"Login failed for {user.email}: HTTP {response.status}")
+        return json.loads(response.body)['token']
+    
+    def next_request(self):
+        """Pick the next request of the 70/30 dashboard/metric-recording mix"""
+        if self.random.random() < self.dashboard_share:
+            return 'GET', '/dashboard', None
+        body = {
+            'metric_date': date.today().isoformat(),
+            'metric_type': 'heart_rate',
+            'value_numeric': self.random.randint(55, 110),
+            'unit': 'bpm',
+        }
+        return 'POST', METRICS_PATH, json.dumps(body).encode('utf-8')
+    
+    async def send(self, step_num, scheduled, user):
+        """One sample; `scheduled` is the intended start on the perf_counter clock"""
+        method, path, body = self.next_request()
+        headers = dict(user.headers)
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        self.inflight += 1
+        active = self.inflight
+        try:
+            response = await self.client.request(method, path, headers, body or b'')
+            code, message = str(response.status), response.reason
+            success = 200 <= response.status < 400
+            failure = '' if success else f"HTTP {response.status}"
+            received = len(response.body)
+            connect_ms = (response.connected_at - scheduled) * 1000
+            latency_ms = (response.first_byte_at - scheduled) * 1000
+        except Exception as e:
+            code, message = f"Non HTTP response code: {type(e).__name__}", str(e)
+            success, failure, received, connect_ms, latency_ms = False, str(e) or type(e).__name__, 0, 0, 0
+        finally:
+            self.inflight -= 1
         
-        # Calculate metrics per step
-        step_metrics = []
-        overload_threshold = None
-        overload_reason = None
+        elapsed_ms = (time.perf_counter() - scheduled) * 1000
+        self.writer.write(
+            self._epoch_ms(scheduled), round(elapsed_ms), f"Step{step_num} - {method} {path}", code, message,
+            f"VU {user.number}", success, failure, received, len(body or b''), active,
+            self.target + path, round(latency_ms), round(connect_ms),
+        )
+    
+    def _epoch_ms(self, perf_time):
+        """Convert a perf_counter() instant to a JTL epoch-milliseconds timestamp"""
+        return int(self._epoch_start_ms + (perf_time - self._clock_start) * 1000)
+    
+    async def login_all(self):
+        """Obtain every virtual user's JWT once, before the schedule starts"""
+        results = await asyncio.gather(*(self.login(user) for user in self.users), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            raise RuntimeError(f"{len(failures)} of {len(self.users)} logins failed: {failures[0]}")
+        for user, token in zip(self.users, results):
+            user.headers = {'Authorization': f"Bearer {token}"}
+    
+    async def run(self, output='results.jtl'):
+        await self.start(output)
+        try:
+            for step_num, rps in enumerate(self.steps, start=1):
+                # Steps follow each other without a gap, the last one waits for its responses
+                await self.run_step(step_num, rps, self.step_duration, drain=step_num == len(self.steps))
+        finally:
+            await self.finish()
+    
+    async def start(self, output='results.jtl'):
+        """Log all users in and open the JTL; steps can then be run one by one"""
+        self.client = HttpClient(self.target, max_connections=self.max_inflight)
+        print(f"🔑 Logging in {len(self.users)} virtual users...")
+        try:
+            await self.login_all()
+        except BaseException:
+            await self.client.close()
+            raise
+        self.writer = JtlWriter(output)
+        self._clock_start = time.perf_counter()
+        self._epoch_start_ms = time.time() * 1000
+        self._user_index = 0
+        self._next_arrival = None
+        self._tasks = set()
+    
+    async def run_step(self, step_num, rps, duration, drain=True):
+        """Run one constant-rate step.
         
-        for step_num in sorted(df['step'].unique()):
-            if step_num == 0:  # Skip unknown steps
-                continue
+        With `drain` the call returns once all requests of the step have
+        completed and the JTL is flushed; otherwise the next step continues
+        the arrival schedule seamlessly.
+        """
+        tasks = self._tasks
+        scheduled = self._next_arrival or time.perf_counter()
+        step_end = scheduled + duration
+        print(f"🚀 Step {step_num}: {rps:g} RPS for {duration:g}s")
+        while scheduled < step_end:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Start every arrival that is due, so timer jitter cannot lower the rate
+            while scheduled < step_end and scheduled <= time.perf_counter():
+                if self.inflight >= self.max_inflight:
+                    self._drop(step_num, scheduled)
+                else:
+                    user = self.users[self._user_index % len(self.users)]
+                    self._user_index += 1
+                    task = asyncio.ensure_future(self.send(step_num, scheduled, user))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                scheduled += self.random.expovariate(rps) if self.poisson else 1 / rps
+        print(f"   {self.writer.samples} samples, {self.writer.errors} errors, {self.inflight} in flight")
+        self._next_arrival = None if drain else scheduled
+        if drain:
+            if tasks:
+                await asyncio.wait(tasks)
+            self.writer.flush()
+    
+    async def finish(self):
+        if self.writer:
+            self.writer.close()
+        await self.client.close()
+    
+    def _drop(self, step_num, scheduled):
+        """Record an arrival that could not be started because too many are in flight"""
+        self.writer.write(
+            self._epoch_ms(scheduled), 0, f"Step{step_num} - dropped", DROPPED_RESPONSE_CODE,
+            'In-flight limit reached', 'scheduler', False, f"More than {self.max_inflight} requests in flight",
+            0, 0, self.inflight, self.target, 0, 0,
+        )
+
+async def serve_stub(host='127.0.0.1', port=0, delay_ms=5):
+    """Tiny keep-alive HTTP stub of the app's login, dashboard and metrics endpoints, for testing"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                if delay_ms:
+                    await asyncio.sleep(delay_ms / 1000)
                 
-            step_data = df[df['step'] == step_num]
-            if len(step_data) < 10:  # Skip if insufficient data
-                continue
-            
-            target_rps = step_rps_mapping[step_num]
-            
-            # Calculate actual RPS (requests in steady state - skip first 2 min warmup)
-            step_duration = 300  # 5 min steady state
-            actual_rps = len(step_data) / (step_duration / 60)  # Convert to per minute, then per second
-            
-            # Latency percentiles
-            p95_latency = np.percentile(step_data['elapsed'], 95)
-            
-            # Error rate
-            error_rate = (1 - step_data['success'].mean()) * 100
-            
-            # SLA evaluation
-            latency_sla_pass = p95_latency < self.sla_latency_ms
-            error_sla_pass = error_rate < self.sla_error_rate
-            overall_sla_pass = latency_sla_pass and error_sla_pass
-            
-            # Check for overload threshold
-            if overload_threshold is None and not overall_sla_pass:
-                overload_threshold = target_rps
-                if not latency_sla_pass:
-                    overload_reason = f"latency at {target_rps} RPS"
-                elif not error_sla_pass:
-                    overload_reason = f"errors at {target_rps} RPS"
-            
-            step_metrics.append({
-                'Step': step_num,
-                'RPS': target_rps,
-                'p95_ms': p95_latency,
-                'Error_%': error_rate,
-                'SLA_Pass': 'PASS' if overall_sla_pass else 'FAIL'
-            })
-        
-        results_df = pd.DataFrame(step_metrics)
-        
-        # Generate outputs
-        self.generate_table(results_df)
-        self.generate_plot(results_df, overload_threshold)
-        self.generate_summary_line(overload_threshold, overload_reason)
-        
-        return results_df, overload_threshold, overload_reason
-    
-    def generate_table(self, results_df):
-        """Generate the required table"""
-        print("\n📋 STEP LOAD TEST RESULTS")
-        print("=" * 50)
-        print(f"{'Step':<6} {'RPS':<6} {'p95(ms)':<10} {'Error %':<10} {'SLA':<8}")
-        print("-" * 50)
-        
-        for _, row in results_df.iterrows():
-            print(f"{row['Step']:<6} {row['RPS']:<6} {row['p95_ms']:<10.0f} {row['Error_%']:<10.1f} {row['SLA_Pass']:<8}")
-        
-        # Save table to file with UTF-8 encoding
-        table_file = 'overload-results-table.txt'
-        with open(table_file, 'w', encoding='utf-8') as f:
-            f.write("HEALTHCARE APPLICATION - OVERLOAD THRESHOLD ANALYSIS\n")
-            f.write("=" * 55 + "\n\n")
-            f.write(f"SLA: p95 < {self.sla_latency_ms}ms AND Error Rate < {self.sla_error_rate}%\n\n")
-            f.write(f"{'Step':<6} {'RPS':<6} {'p95(ms)':<10} {'Error %':<10} {'SLA':<8}\n")
-            f.write("-" * 50 + "\n")
-            
-            for _, row in results_df.iterrows():
-                f.write(f"{row['Step']:<6} {row['RPS']:<6} {row['p95_ms']:<10.0f} {row['Error_%']:<10.1f} {row['SLA_Pass']:<8}\n")
-        
-        print(f"\n💾 Table saved: {table_file}")
+                if path == '/api/auth/login':
+                    status, body = '200 OK', json.dumps({'success': True, 'token': 'stub-token'})
+                elif (method, path) in (('GET', '/dashboard'), ('POST', METRICS_PATH)):
+                    status, body = '200 OK', json.dumps({'success': True})
+                else:
+                    status, body = '404 Not Found', json.dumps({'error': 'Not found'})
+                body = body.encode('utf-8')
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Clients closing idle keep-alive connections, or the stub shutting down
+            pass
+        finally:
+            writer.close()
     
-    def generate_plot(self, results_df, overload_threshold):
-        """Generate p95 vs RPS plot with overload threshold"""
-        plt.figure(figsize=(12, 8))
-        
-        # Plot p95 latency
-        colors = ['green' if sla == 'PASS' else 'red' for sla in results_df['SLA_Pass']]
-        plt.scatter(results_df['RPS'], results_df['p95_ms'], c=colors, s=100, alpha=0.8, edgecolors='black', linewidth=2)
-        plt.plot(results_df['RPS'], results_df['p95_ms'], 'b-', alpha=0.5, linewidth=2)
-        
-        # Mark SLA threshold
-        plt.axhline(y=self.sla_latency_ms, color='red', linestyle='--', linewidth=2, alpha=0.8, label=f'SLA Limit ({self.sla_latency_ms}ms)')
-        
-        # Mark overload threshold
-        if overload_threshold:
-            plt.axvline(x=overload_threshold, color='red', linestyle=':', linewidth=3, alpha=0.9, label=f'Overload Threshold ({overload_threshold} RPS)')
-        
-        plt.xlabel('Target RPS', fontsize=14, fontweight='bold')
-        plt.ylabel('p95 Latency (ms)', fontsize=14, fontweight='bold')
-        plt.title('Healthcare Application - Overload Threshold Analysis\np95 Latency vs RPS', fontsize=16, fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.legend(fontsize=12)
-        
-        # Add annotations for SLA pass/fail
-        for _, row in results_df.iterrows():
-            color = 'green' if row['SLA_Pass'] == 'PASS' else 'red'
-            plt.annotate(row['SLA_Pass'], 
-                        (row['RPS'], row['p95_ms']), 
-                        xytext=(5, 5), textcoords='offset points',
-                        fontsize=10, fontweight='bold', color=color)
-        
-        plt.tight_layout()
-        
-        # Save plot
-        plot_file = 'overload-threshold-plot.png'
-        plt.savefig(plot_file, dpi=300, bbox_inches='tight')
-        print(f"💾 Plot saved: {plot_file}")
-        
-        plt.show()
+    return await asyncio.start_server(handle, host, port)
+
+async def run_load_test(args):
+    server = None
+    target = args.target
+    if args.stub:
+        server = await serve_stub(delay_ms=args.stub_delay_ms)
+        host, port = server.sockets[0].getsockname()[:2]
+        target = f"http://{host}:{port}"
+        print(f"🧪 Stub server listening on {target}")
     
-    def generate_summary_line(self, overload_threshold, overload_reason):
-        """Generate the required summary line"""
-        if overload_threshold:
-            summary = f"Overload threshold ≈ {overload_threshold} RPS (first broken SLA: {overload_reason})."
-        else:
-            summary = "No overload threshold reached - all steps passed SLA requirements."
-        
-        print(f"\n🎯 SUMMARY:")
-        print(summary)
-        
-        # Save summary with UTF-8 encoding to handle special characters
-        summary_file = 'overload-summary.txt'
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write("HEALTHCARE APPLICATION - OVERLOAD THRESHOLD SUMMARY\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(f"Test Configuration:\n")
-            f.write(f"• Mixed Scenario: 70% GET /dashboard, 30% POST /api/health-metrics\n")
-            f.write(f"• Authentication: JWT reused per virtual user\n")
-            f.write(f"• Step Load: 10 -> 25 -> 50 -> 100 -> 150 -> 200 -> 300 RPS\n")  # Fixed: Using -> instead of →
-            f.write(f"• Step Duration: 2 min warmup + 5 min steady\n")
-            f.write(f"• SLA: p95 < {self.sla_latency_ms}ms AND Error Rate < {self.sla_error_rate}%\n\n")
-            f.write(f"Result:\n{summary}\n")
-        
-        print(f"💾 Summary saved: {summary_file}")
-        
-        return summary
+    generator = LoadGenerator(
+        target,
+        steps=args.steps,
+        step_duration=args.step_duration,
+        users=args.users,
+        email=args.email,
+        password=args.password,
+        max_inflight=args.max_inflight,
+        poisson=args.poisson,
+        seed=args.seed,
+    )
+    try:
+        await generator.run(args.output)
+    finally:
+        if server:
+            server.close()
+            await server.wait_closed()
+    return generator
 
 def main():
     """Main execution"""
-    print("🏥 HEALTHCARE APPLICATION - OVERLOAD THRESHOLD ANALYSIS")
+    parser = argparse.ArgumentParser(description="Open-model step load generator for the mixed healthcare scenario")
+    parser.add_argument('--target', default='http://localhost:3000', help="Base URL of the app (default: http://localhost:3000)")
+    parser.add_argument('--steps', type=lambda value: [float(rps) for rps in value.split(',')], default=DEFAULT_STEPS,
+                        help="Comma-separated RPS per step (default: 10,25,50,100,150,200,300)")
+    parser.add_argument('--step-duration', type=float, default=420,
+                        help="Seconds per step, warmup included (default: 420 = 2 min warmup + 5 min steady)")
+    parser.add_argument('--users', type=int, default=50, help="Virtual users, each logging in once (default: 50)")
+    parser.add_argument('--email', default='loadtest{n}@example.com', help="Login email, {n} is the user number")
+    parser.add_argument('--password', default='LoadTest123!', help="Login password")
+    parser.add_argument('--max-inflight', type=int, default=5000, help="Arrivals beyond this many open requests are recorded as dropped")
+    parser.add_argument('--poisson', action='store_true', help="Exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for the request mix")
+    parser.add_argument('-o', '--output', default='results.jtl', help="JTL output file (default: results.jtl)")
+    parser.add_argument('--stub', action='store_true', help="Run against a built-in local stub server instead of --target")
+    parser.add_argument('--stub-delay-ms', type=float, default=5, help="Response delay of the stub server (default: 5)")
+    args = parser.parse_args()
+    
+    print("🏥 HEALTHCARE APPLICATION - STEP LOAD GENERATOR")
     print("=" * 60)
+    print(f"• Mixed Scenario: 70% GET /dashboard, 30% POST {METRICS_PATH}")
+    print(f"• Step Load: {' -> '.join(f'{rps:g}' for rps in args.steps)} RPS, {args.step_duration:g}s per step")
+    
+    try:
+        # uvloop lowers the per-request overhead further when it is installed
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
+    start = time.perf_counter()
+    generator = asyncio.run(run_load_test(args))
+    duration = time.perf_counter() - start
     
-    # Check for results file
-    results_file = 'results.jtl'
-    import os
-    if not os.path.exists(results_file):
-        print(f"❌ Results file '{results_file}' not found!")
-        print("Please run the mixed scenario test first:")
-        print("   jmeter -n -t mixed-scenario-test.jmx -l results.jtl")
-        return
-    
-    # Run analysis
-    analyzer = OverloadAnalyzer()
-    results_df, overload_threshold, overload_reason = analyzer.analyze_results(results_file)
-    
-    print("\n✅ Analysis completed! Generated:")
-    print("   📋 Overload results table")
-    print("   📊 p95 vs RPS plot with threshold marked")
-    print("   🎯 One-line summary")
+    print(f"\n✅ Load test completed in {duration:.0f}s")
+    print(f"   {generator.writer.samples} samples ({generator.writer.errors} errors) written to {args.output}")
+    print(f"   Analyze with: python overload-analysis.py {args.output}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,199 +1,179 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from datetime import datetime
-import re
+import argparse
+import cProfile
+import os
+import sys
 
-class OverloadAnalyzer:
-    def __init__(self):
-        self.sla_latency_ms = 2000  # p95 < 2000ms
-        self.sla_error_rate = 1.0   # Error rate < 1%
-        
-    def analyze_results(self, results_file='results.jtl'):
-        """Analyze JTL results and generate required outputs"""
-        print("📊 Analyzing mixed scenario step load test...")
-        
-        # Load data
-        df = pd.read_csv(results_file)
-        
-        # Determine success column
-        if 'success' not in df.columns:
-            df['success'] = df['responseCode'].astype(str) == '200'
-        
-        # Extract step from sample names
-        df['step'] = df['label'].str.extract(r'Step(\d+)', expand=False).fillna('0').astype(int)
-        
-        # Define step RPS mapping
-        step_rps_mapping = {1: 10, 2: 25, 3: 50, 4: 100, 5: 150, 6: 200, 7: 300}
-        df['target_rps'] = df['step'].map(step_rps_mapping)
-        
-        # Calculate metrics per step
-        step_metrics = []
-        overload_threshold = None
-        overload_reason = None
-        
-        for step_num in sorted(df['step'].unique()):
-            if step_num == 0:  # Skip unknown steps
-                continue
-                
-            step_data = df[df['step'] == step_num]
-            if len(step_data) < 10:  # Skip if insufficient data
-                continue
-            
-            target_rps = step_rps_mapping[step_num]
-            
-            # Calculate actual RPS (requests in steady state - skip first 2 min warmup)
-            step_duration = 300  # 5 min steady state
-            actual_rps = len(step_data) / (step_duration / 60)  # Convert to per minute, then per second
-            
-            # Latency percentiles
-            p95_latency = np.percentile(step_data['elapsed'], 95)
-            
-            # Error rate
-            error_rate = (1 - step_data['success'].mean()) * 100
-            
-            # SLA evaluation
-            latency_sla_pass = p95_latency < self.sla_latency_ms
-            error_sla_pass = error_rate < self.sla_error_rate
-            overall_sla_pass = latency_sla_pass and error_sla_pass
-            
-            # Check for overload threshold
-            if overload_threshold is None and not overall_sla_pass:
-                overload_threshold = target_rps
-                if not latency_sla_pass:
-                    overload_reason = f"latency at {target_rps} RPS"
-                elif not error_sla_pass:
-                    overload_reason = f"errors at {target_rps} RPS"
-            
-            step_metrics.append({
-                'Step': step_num,
-                'RPS': target_rps,
-                'p95_ms': p95_latency,
-                'Error_%': error_rate,
-                'SLA_Pass': 'PASS' if overall_sla_pass else 'FAIL'
-            })
-        
-        results_df = pd.DataFrame(step_metrics)
-        
-        # Generate outputs
-        self.generate_table(results_df)
-        self.generate_plot(results_df, overload_threshold)
-        self.generate_summary_line(overload_threshold, overload_reason)
-        
-        return results_df, overload_threshold, overload_reason
+from _aggregation import StepAggregator
+from _analyzer import OUTPUTS, TABLE_OUTPUTS, OverloadAnalyzer
+from _history import RunHistory
+from _jtl import expand_results_paths
+
+def run_analysis(analyzer, args):
+    """Analyze saved histograms, a growing JTL or finished JTLs; returns the exit code"""
+    if args.from_histograms:
+        # Combine results from several nodes or runs without touching raw JTLs
+        with analyzer.profiler.stage('load-histograms'):
+            aggregator = StepAggregator.load(args.from_histograms[0])
+            for histogram_file in args.from_histograms[1:]:
+                aggregator.merge(StepAggregator.load(histogram_file))
+        print(f"📂 Merged {len(args.from_histograms)} histogram file(s)")
+        analyzer.run_source = ', '.join(args.from_histograms)
+        analyzer.run_files = args.from_histograms
+        analyzer.analyze_results(aggregator=aggregator)
+        return 0
+    
+    if args.jmeter_log:
+        return analyzer.follow_log(args.jmeter_log, follow=args.follow, interval=args.interval, sustain_s=args.sustain,
+                                   idle_timeout=args.idle_timeout, stop_file=args.stop_file)
     
-    def generate_table(self, results_df):
-        """Generate the required table"""
-        print("\n📋 STEP LOAD TEST RESULTS")
-        print("=" * 50)
-        print(f"{'Step':<6} {'RPS':<6} {'p95(ms)':<10} {'Error %':<10} {'SLA':<8}")
-        print("-" * 50)
-        
-        for _, row in results_df.iterrows():
-            print(f"{row['Step']:<6} {row['RPS']:<6} {row['p95_ms']:<10.0f} {row['Error_%']:<10.1f} {row['SLA_Pass']:<8}")
-        
-        # Save table to file with UTF-8 encoding
-        table_file = 'overload-results-table.txt'
-        with open(table_file, 'w', encoding='utf-8') as f:
-            f.write("HEALTHCARE APPLICATION - OVERLOAD THRESHOLD ANALYSIS\n")
-            f.write("=" * 55 + "\n\n")
-            f.write(f"SLA: p95 < {self.sla_latency_ms}ms AND Error Rate < {self.sla_error_rate}%\n\n")
-            f.write(f"{'Step':<6} {'RPS':<6} {'p95(ms)':<10} {'Error %':<10} {'SLA':<8}\n")
-            f.write("-" * 50 + "\n")
-            
-            for _, row in results_df.iterrows():
-                f.write(f"{row['Step']:<6} {row['RPS']:<6} {row['p95_ms']:<10.0f} {row['Error_%']:<10.1f} {row['SLA_Pass']:<8}\n")
-        
-        print(f"\n💾 Table saved: {table_file}")
+    if args.follow:
+        # The file may not exist yet when JMeter is just starting up
+        analyzer.run_source = args.results[0]
+        analyzer.run_files = args.results[:1]
+        return analyzer.follow_results(args.results[0], interval=args.interval, sustain_s=args.sustain,
+                                       idle_timeout=args.idle_timeout, stop_file=args.stop_file)
+    
+    # Check for results files
+    results_files = expand_results_paths(args.results)
+    missing = [results_file for results_file in results_files if not os.path.exists(results_file)]
+    if not results_files or missing:
+        print(f"❌ Results file '{(missing or args.results)[0]}' not found!")
+        print("Please run the mixed scenario test first:")
+        print("   jmeter -n -t mixed-scenario-test.jmx -l results.jtl")
+        print("   or: python generate-test.py --target http://localhost:3000 -o results.jtl")
+        return 0
     
-    def generate_plot(self, results_df, overload_threshold):
-        """Generate p95 vs RPS plot with overload threshold"""
-        plt.figure(figsize=(12, 8))
-        
-        # Plot p95 latency
-        colors = ['green' if sla == 'PASS' else 'red' for sla in results_df['SLA_Pass']]
-        plt.scatter(results_df['RPS'], results_df['p95_ms'], c=colors, s=100, alpha=0.8, edgecolors='black', linewidth=2)
-        plt.plot(results_df['RPS'], results_df['p95_ms'], 'b-', alpha=0.5, linewidth=2)
-        
-        # Mark SLA threshold
-        plt.axhline(y=self.sla_latency_ms, color='red', linestyle='--', linewidth=2, alpha=0.8, label=f'SLA Limit ({self.sla_latency_ms}ms)')
-        
-        # Mark overload threshold
-        if overload_threshold:
-            plt.axvline(x=overload_threshold, color='red', linestyle=':', linewidth=3, alpha=0.9, label=f'Overload Threshold ({overload_threshold} RPS)')
-        
-        plt.xlabel('Target RPS', fontsize=14, fontweight='bold')
-        plt.ylabel('p95 Latency (ms)', fontsize=14, fontweight='bold')
-        plt.title('Healthcare Application - Overload Threshold Analysis\np95 Latency vs RPS', fontsize=16, fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.legend(fontsize=12)
-        
-        # Add annotations for SLA pass/fail
-        for _, row in results_df.iterrows():
-            color = 'green' if row['SLA_Pass'] == 'PASS' else 'red'
-            plt.annotate(row['SLA_Pass'], 
-                        (row['RPS'], row['p95_ms']), 
-                        xytext=(5, 5), textcoords='offset points',
-                        fontsize=10, fontweight='bold', color=color)
-        
-        plt.tight_layout()
-        
-        # Save plot
-        plot_file = 'overload-threshold-plot.png'
-        plt.savefig(plot_file, dpi=300, bbox_inches='tight')
-        print(f"💾 Plot saved: {plot_file}")
-        
-        plt.show()
+    # Run analysis
+    analyzer.run_source = ', '.join(results_files)
+    analyzer.run_files = results_files
+    if len(results_files) > 1 or args.workers:
+        print(f"📂 Aggregating {len(results_files)} result file(s) in parallel")
+        aggregator = analyzer.aggregate_files(results_files, workers=args.workers)
+    else:
+        aggregator = analyzer.aggregate_results(results_files[0], streaming=args.streaming)
+    results_df, overload_threshold, overload_reason = analyzer.analyze_results(aggregator=aggregator)
+    if args.save_histograms:
+        aggregator.save(args.save_histograms)
+        print(f"💾 Histograms saved: {args.save_histograms}")
     
-    def generate_summary_line(self, overload_threshold, overload_reason):
-        """Generate the required summary line"""
-        if overload_threshold:
-            summary = f"Overload threshold ≈ {overload_threshold} RPS (first broken SLA: {overload_reason})."
-        else:
-            summary = "No overload threshold reached - all steps passed SLA requirements."
-        
-        print(f"\n🎯 SUMMARY:")
-        print(summary)
-        
-        # Save summary with UTF-8 encoding to handle special characters
-        summary_file = 'overload-summary.txt'
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write("HEALTHCARE APPLICATION - OVERLOAD THRESHOLD SUMMARY\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(f"Test Configuration:\n")
-            f.write(f"• Mixed Scenario: 70% GET /dashboard, 30% POST /api/health-metrics\n")
-            f.write(f"• Authentication: JWT reused per virtual user\n")
-            f.write(f"• Step Load: 10 -> 25 -> 50 -> 100 -> 150 -> 200 -> 300 RPS\n")  # Fixed: Using -> instead of →
-            f.write(f"• Step Duration: 2 min warmup + 5 min steady\n")
-            f.write(f"• SLA: p95 < {self.sla_latency_ms}ms AND Error Rate < {self.sla_error_rate}%\n\n")
-            f.write(f"Result:\n{summary}\n")
-        
-        print(f"💾 Summary saved: {summary_file}")
-        
-        return summary
+    print("\n✅ Analysis completed! Generated:")
+    if 'table' in analyzer.outputs:
+        print("   📋 Overload results table")
+    if 'json' in analyzer.outputs:
+        print("   🧾 Machine-readable JSON results")
+    if 'timeseries' in analyzer.outputs:
+        print("   📈 Per-second throughput time series")
+    if 'plot' in analyzer.outputs:
+        print("   📊 p95 vs RPS plot with threshold marked")
+    if 'summary' in analyzer.outputs:
+        print("   🎯 One-line summary")
+    return 0
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Overload threshold analysis of JMeter step load results")
+    parser.add_argument('results', nargs='*', default=['results.jtl'],
+                        help="JTL files, directories or glob patterns (default: results.jtl)")
+    parser.add_argument('--streaming', action='store_true', help="Read the JTL in bounded chunks (constant memory)")
+    parser.add_argument('--chunksize', type=int, default=None, help="Rows per chunk in streaming mode")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Parse files/byte ranges in a process pool with this many workers (default: all cores)")
+    parser.add_argument('--cache', nargs='?', const='.jtl-cache', default=None, metavar='DIR',
+                        help="Convert JTLs once into a columnar cache and reuse it (default DIR: .jtl-cache)")
+    parser.add_argument('--save-histograms', metavar='FILE', help="Save the per-step/per-label latency histograms to FILE")
+    parser.add_argument('--from-histograms', metavar='FILE', nargs='+', help="Merge saved histogram files and analyze them instead of a JTL")
+    parser.add_argument('--follow', action='store_true', help="Tail a JTL that JMeter is still writing and analyze it incrementally")
+    parser.add_argument('--jmeter-log', metavar='FILE', nargs='?', const='jmeter.log',
+                        help="Use the summariser lines of jmeter.log instead of a JTL (with --follow: tail it)")
+    parser.add_argument('--interval', type=float, default=5, help="Refresh interval in seconds for --follow (default: 5)")
+    parser.add_argument('--sustain', type=int, default=60,
+                        help="Stop early once a step breaks the SLA for this many seconds (default: 60)")
+    parser.add_argument('--idle-timeout', type=float, default=120,
+                        help="Finish --follow after this many seconds without new samples (default: 120)")
+    parser.add_argument('--stop-file', help="File to create when --follow detects a sustained SLA breach")
+    parser.add_argument('--history', nargs='?', const='overload-runs.sqlite', default=None, metavar='DB',
+                        help="Record the analysis in this SQLite run index (default DB: overload-runs.sqlite)")
+    parser.add_argument('--run-name', help="Name of the recorded run, e.g. a release or commit")
+    parser.add_argument('--list-runs', action='store_true', help="List the recorded runs and exit")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Compare two recorded runs (id or name); exits with 4 on a regression")
+    parser.add_argument('--slo', metavar='FILE', help="JSON file of SLO objectives (default: the step SLAs as objectives)")
+    parser.add_argument('--no-co-correction', action='store_true',
+                        help="Judge latency on measured percentiles only (no coordinated-omission correction)")
+    outputs = parser.add_mutually_exclusive_group()
+    outputs.add_argument('--table-only', action='store_true',
+                         help="Only print and save the results table and JSON (no capacity model or SLO counts)")
+    outputs.add_argument('--summary-only', action='store_true', help="Only print and save the summary")
+    outputs.add_argument('--no-plot', action='store_true', help="All outputs except the plot")
+    parser.add_argument('--compact-table', action='store_true',
+                        help="Print only Step, RPS, p95, Error %% and SLA (the saved table keeps every column)")
+    parser.add_argument('--json', default='overload-results.json', metavar='FILE',
+                        help="Machine-readable results file (default: overload-results.json)")
+    parser.add_argument('--show', action='store_true', help="Open the plot in a window after saving it")
+    parser.add_argument('--resources', metavar='FILE', help="resource-sampler.py CSV recorded during the run")
+    parser.add_argument('--resources-offset', type=float, default=0, metavar='SECONDS',
+                        help="Seconds to add to the sampler's timestamps to match the injector's clock")
+    parser.add_argument('--saturation', type=float, default=90,
+                        help="Utilization in percent from which a resource counts as saturated (default: 90)")
+    parser.add_argument('--profile', nargs='?', const='overload-profile.json', default=None, metavar='FILE',
+                        help="Trace time, rows and peak memory per analysis stage to FILE (default FILE: overload-profile.json)")
+    parser.add_argument('--cprofile', metavar='FILE', help="Also write cProfile statistics of the analysis to FILE")
+    args = parser.parse_args()
+    
     print("🏥 HEALTHCARE APPLICATION - OVERLOAD THRESHOLD ANALYSIS")
     print("=" * 60)
     
-    # Check for results file
-    results_file = 'results.jtl'
-    import os
-    if not os.path.exists(results_file):
-        print(f"❌ Results file '{results_file}' not found!")
-        print("Please run the mixed scenario test first:")
-        print("   jmeter -n -t mixed-scenario-test.jmx -l results.jtl")
-        return
-    
-    # Run analysis
     analyzer = OverloadAnalyzer()
-    results_df, overload_threshold, overload_reason = analyzer.analyze_results(results_file)
+    if args.chunksize:
+        analyzer.chunksize = args.chunksize
+    analyzer.cache_dir = args.cache
+    analyzer.co_correction = not args.no_co_correction
+    if args.slo:
+        analyzer.load_slo_objectives(args.slo)
+    analyzer.history_db = args.history
+    analyzer.run_name = args.run_name
+    analyzer.json_file = args.json
+    analyzer.compact_table = args.compact_table
+    analyzer.resource_file = args.resources
+    analyzer.resource_clock_offset_s = args.resources_offset
+    analyzer.saturation_utilization = args.saturation / 100
+    analyzer.show_plot = args.show
+    analyzer.slo_counts = bool(args.save_histograms)
+    if args.table_only:
+        analyzer.outputs = TABLE_OUTPUTS
+    elif args.summary_only:
+        analyzer.outputs = ('summary',)
+    elif args.no_plot:
+        analyzer.outputs = tuple(output for output in OUTPUTS if output != 'plot')
     
-    print("\n✅ Analysis completed! Generated:")
-    print("   📋 Overload results table")
-    print("   📊 p95 vs RPS plot with threshold marked")
-    print("   🎯 One-line summary")
+    if args.list_runs or args.compare:
+        analyzer.history_db = args.history or 'overload-runs.sqlite'
+        if not os.path.exists(analyzer.history_db):
+            print(f"❌ Run index '{analyzer.history_db}' not found!")
+            sys.exit(1)
+        if args.list_runs:
+            history = RunHistory(analyzer.history_db)
+            print(history.runs().to_string())
+            history.close()
+        if args.compare:
+            sys.exit(4 if analyzer.compare_runs(*args.compare) else 0)
+        return
+    
+    if args.profile:
+        analyzer.profiler.start_memory()
+    if args.cprofile:
+        profile = cProfile.Profile()
+        profile.enable()
+    try:
+        exit_code = run_analysis(analyzer, args)
+    finally:
+        if args.cprofile:
+            profile.disable()
+            profile.dump_stats(args.cprofile)
+            print(f"💾 cProfile statistics saved: {args.cprofile} (python -m pstats {args.cprofile})")
+        if args.profile:
+            analyzer.generate_profile(args.profile)
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import math
+import time
+from statistics import NormalDist
+
+import pandas as pd
+
+from _aggregation import StepAggregator
+from _analyzer import OverloadAnalyzer
+from _jtl import JtlTail
+from _scripts import load_script
+
+generate_test = load_script('generate_test', 'generate-test.py')
+
+# Duration of the fixed 10 -> 300 RPS ladder, for comparison
+LADDER_DURATION_S = 7 * 420
+
+def required_samples(share, precision, confidence=0.95):
+    """Samples needed to estimate a share (e.g. 5% of requests above p95) to +/- `precision`"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return math.ceil(z * z * share * (1 - share) / precision ** 2)
+
+class ThresholdSearch:
+    """Adaptive overload-threshold search.
+    
+    Instead of the fixed 7-step ladder, probe rates are chosen on the fly:
+    the rate grows geometrically until the first SLA breach, then the
+    interval between the highest passing and the lowest failing rate is
+    bisected until it is at most 2 x `resolution` wide. Every probe runs
+    just long enough for its steady-state window to hold the number of
+    samples that pins down p95 and the error rate (see `required_samples`),
+    and is judged by `OverloadAnalyzer` on the samples fed to it
+    incrementally from the generator's JTL, minus its first `warmup_s`
+    seconds. An INCONCLUSIVE rate is probed
+    again with twice the measurement time, up to `max_probe_s`; if it stays
+    inconclusive the search stops and reports the bracket as unresolved.
+    """
+    
+    def __init__(self, generator, analyzer, start_rps=10, growth=1.5, max_rps=1000, resolution=5,
+                 warmup_s=15, min_probe_s=20, max_probe_s=180, cooldown_s=10, confidence=0.95):
+        self.generator = generator
+        self.analyzer = analyzer
+        self.start_rps = start_rps
+        self.growth = growth
+        self.max_rps = max_rps
+        self.resolution = resolution
+        self.warmup_s = warmup_s            # Expected time to steady state, trimmed from every probe
+        self.min_probe_s = min_probe_s
+        self.max_probe_s = max_probe_s
+        self.cooldown_s = cooldown_s        # Idle time after a failing probe so queues can drain
+        # Enough samples to place the p95 to +/-1 point and the error rate to half the SLA
+        self.samples_needed = max(
+            required_samples(0.05, 0.01, confidence),
+            required_samples(analyzer.sla_error_rate / 100, analyzer.sla_error_rate / 200, confidence),
+        )
+        self.probes = []
+        self.unresolved = None      # Rate still INCONCLUSIVE at max_probe_s, if any
+        self.aggregator = None
+        self.tail = None
+    
+    def measure_duration(self, rps):
+        return min(max(self.samples_needed / rps, self.min_probe_s), self.max_probe_s)
+    
+    def trim_warmup(self, chunk, step_num):
+        """Drop the samples scheduled in the first `warmup_s` seconds of a probe.
+        
+        The generator sends at a constant rate from the first second, so the
+        analyzer's rate-based steady-state detection finds no ramp-up to
+        exclude; the warmup has to be cut by time here.
+        """
+        in_step = chunk['step'] == step_num
+        if not in_step.any():
+            return chunk
+        warmup_end = chunk.loc[in_step, 'timeStamp'].min() + self.warmup_s * 1000
+        return chunk[~in_step | (chunk['timeStamp'] >= warmup_end)]
+    
+    async def probe(self, rps, measure_s=None):
+        """Run one probe at `rps` and return its row of the results table"""
+        step_num = len(self.probes) + 1
+        self.analyzer.step_rps_mapping[step_num] = rps
+        await self.generator.run_step(step_num, rps, self.warmup_s + (measure_s or self.measure_duration(rps)))
+        
+        chunk = self.tail.read()
+        if chunk is not None:
+            chunk = self.trim_warmup(chunk, step_num)
+        if chunk is not None and len(chunk):
+            self.aggregator.add_chunk(chunk)
+        metrics = self.analyzer.step_metrics(self.aggregator)
+        results_df, _, _ = self.analyzer.evaluate_sla(metrics)
+        row = results_df[results_df['Step'] == step_num]
+        if row.empty:
+            print(f"   ⚠️  Fewer than 10 samples at {rps:g} RPS - counted as a failure")
+            # Same columns as a measured row, so the table and plot can render it as a gap
+            row = pd.DataFrame([{'Step': step_num, 'RPS': rps, 'SLA_Pass': 'FAIL'}]).reindex(columns=results_df.columns)
+        row = row.iloc[0]
+        self.probes.append(row)
+        
+        if pd.notna(row['Samples']):
+            print(f"   {self.analyzer.format_table_row(row)}")
+            if row['Samples'] < self.samples_needed:
+                print(f"   ⚠️  Only {row['Samples']:.0f} of {self.samples_needed} samples in the steady-state window")
+        if row['SLA_Pass'] == 'FAIL' and self.cooldown_s:
+            await asyncio.sleep(self.cooldown_s)
+            # The server may have closed connections that idled through the cooldown, so the
+            # next probe starts on new ones instead of a burst of failed reuses and retries
+            await self.generator.client.close_idle()
+        return row
+    
+    async def decide(self, rps):
+        """PASS or FAIL at `rps`, probing longer while INCONCLUSIVE; INCONCLUSIVE if it never settles"""
+        measure_s = self.measure_duration(rps)
+        verdict = (await self.probe(rps, measure_s))['SLA_Pass']
+        while verdict == 'INCONCLUSIVE' and measure_s < self.max_probe_s:
+            measure_s = min(measure_s * 2, self.max_probe_s)
+            print(f"   ❔ Inconclusive at {rps:g} RPS - probing again for {measure_s:g}s")
+            verdict = (await self.probe(rps, measure_s))['SLA_Pass']
+        return verdict
+    
+    async def run(self, output='threshold-search.jtl'):
+        """Search the threshold; returns (highest passing RPS, lowest failing RPS)
+        
+        If a rate stays INCONCLUSIVE at `max_probe_s`, the search stops there and
+        records it in `unresolved`; the returned bracket is then not narrowed further.
+        """
+        await self.generator.start(output)
+        self.aggregator = StepAggregator(**self.analyzer.aggregator_options())
+        self.tail = JtlTail(output)
+        passing, failing = 0, None
+        
+        try:
+            # Phase 1: ramp geometrically to the first breach
+            rps = self.start_rps
+            while rps <= self.max_rps:
+                print(f"\n📈 Ramp: probing {rps:g} RPS")
+                verdict = await self.decide(rps)
+                if verdict == 'PASS':
+                    passing = rps
+                    rps = round(rps * self.growth)
+                else:
+                    if verdict == 'FAIL':
+                        failing = rps
+                    else:
+                        self.unresolved = rps
+                    break
+            
+            # Phase 2: bisect between the last passing and the first failing rate
+            while failing is not None and self.unresolved is None and failing - passing > 2 * self.resolution:
+                rps = round((passing + failing) / 2)
+                print(f"\n🔍 Bisection: {passing:g} PASS / {failing:g} FAIL, probing {rps:g} RPS")
+                verdict = await self.decide(rps)
+                if verdict == 'PASS':
+                    passing = rps
+                elif verdict == 'FAIL':
+                    failing = rps
+                else:
+                    self.unresolved = rps
+        finally:
+            await self.generator.finish()
+        
+        return passing, failing
+    
+    def results(self):
+        """Probe results ordered by rate"""
+        return pd.DataFrame(self.probes).sort_values('RPS').reset_index(drop=True)
+    
+    def generate_summary(self, passing, failing, duration):
+        if self.unresolved is not None:
+            upper = f", {failing:g} RPS fails" if failing is not None else ""
+            summary = (f"Overload threshold unresolved: {passing:g} RPS passes{upper}, "
+                       f"{self.unresolved:g} RPS stays inconclusive with {self.max_probe_s:g}s probes.")
+        elif failing is None:
+            summary = f"No overload threshold reached up to {passing:g} RPS."
+        elif not passing:
+            summary = f"Overload threshold below {failing:g} RPS - the lowest probe already broke the SLA."
+        else:
+            threshold = (passing + failing) / 2
+            summary = (f"Overload threshold ≈ {threshold:g} ± {(failing - passing) / 2:g} RPS "
+                       f"({passing:g} RPS passes, {failing:g} RPS fails).")
+        
+        print(f"\n🎯 SUMMARY:")
+        print(summary)
+        print(f"⏱️  {len(self.probes)} probes in {duration / 60:.1f} min "
+              f"(fixed ladder: {LADDER_DURATION_S / 60:.0f} min)")
+        
+        summary_file = 'threshold-search-summary.txt'
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            f.write("HEALTHCARE APPLICATION - ADAPTIVE OVERLOAD THRESHOLD SEARCH\n")
+            f.write("=" * 60 + "\n\n")
+            f.write(f"Search Configuration:\n")
+            f.write(f"• Mixed Scenario: 70% GET /dashboard, 30% POST {generate_test.METRICS_PATH}\n")
+            f.write(f"• Ramp: from {self.start_rps:g} RPS, x{self.growth:g} per probe, then bisection to ±{self.resolution:g} RPS\n")
+            f.write(f"• Probe: {self.warmup_s:g}s warmup + at least {self.samples_needed} steady-state samples\n")
+            f.write(f"• SLA: p95 < {self.analyzer.sla_latency_ms}ms AND Error Rate < {self.analyzer.sla_error_rate}%\n\n")
+            f.write("Probes (in order):\n")
+            for row in self.probes:
+                f.write(f"• Step {row['Step']}: {row['RPS']:g} RPS -> {row['SLA_Pass']}\n")
+            f.write(f"\nDuration: {duration / 60:.1f} min for {len(self.probes)} probes\n\n")
+            f.write(f"Result:\n{summary}\n")
+        
+        print(f"💾 Summary saved: {summary_file}")
+        return summary
+
+async def run_search(args):
+    server = None
+    target = args.target
+    if args.stub:
+        server = await generate_test.serve_stub(delay_ms=args.stub_delay_ms)
+        host, port = server.sockets[0].getsockname()[:2]
+        target = f"http://{host}:{port}"
+        print(f"🧪 Stub server listening on {target}")
+    
+    generator = generate_test.LoadGenerator(
+        target,
+        users=args.users,
+        email=args.email,
+        password=args.password,
+        max_inflight=args.max_inflight,
+        poisson=args.poisson,
+        seed=args.seed,
+    )
+    analyzer = OverloadAnalyzer()
+    analyzer.step_rps_mapping = {}
+    # The generator stamps samples with their scheduled start, so there is no coordinated omission to correct
+    analyzer.co_correction = False
+    search = ThresholdSearch(
+        generator,
+        analyzer,
+        start_rps=args.start_rps,
+        growth=args.growth,
+        max_rps=args.max_rps,
+        resolution=args.resolution,
+        warmup_s=args.warmup,
+        min_probe_s=args.min_probe,
+        max_probe_s=args.max_probe,
+        cooldown_s=args.cooldown,
+        confidence=args.confidence,
+    )
+    try:
+        passing, failing = await search.run(args.output)
+    finally:
+        if server:
+            server.close()
+            await server.wait_closed()
+    return search, passing, failing
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Adaptive search for the overload threshold (ramp, then bisection)")
+    parser.add_argument('--target', default='http://localhost:3000', help="Base URL of the app (default: http://localhost:3000)")
+    parser.add_argument('--start-rps', type=float, default=10, help="First probe rate (default: 10)")
+    parser.add_argument('--growth', type=float, default=1.5, help="Rate factor between ramp probes (default: 1.5)")
+    parser.add_argument('--max-rps', type=float, default=1000, help="Give up the ramp above this rate (default: 1000)")
+    parser.add_argument('--resolution', type=float, default=5, help="Report the threshold to +/- this many RPS (default: 5)")
+    parser.add_argument('--warmup', type=float, default=15, help="Seconds per probe before the steady state (default: 15)")
+    parser.add_argument('--min-probe', type=float, default=20, help="Minimum steady seconds per probe (default: 20)")
+    parser.add_argument('--max-probe', type=float, default=180, help="Maximum steady seconds per probe (default: 180)")
+    parser.add_argument('--cooldown', type=float, default=10, help="Idle seconds after a failing probe (default: 10)")
+    parser.add_argument('--confidence', type=float, default=0.95, help="Confidence level used to size the probes (default: 0.95)")
+    parser.add_argument('--users', type=int, default=50, help="Virtual users, each logging in once (default: 50)")
+    parser.add_argument('--email', default='loadtest{n}@example.com', help="Login email, {n} is the user number")
+    parser.add_argument('--password', default='LoadTest123!', help="Login password")
+    parser.add_argument('--max-inflight', type=int, default=5000, help="Arrivals beyond this many open requests are recorded as dropped")
+    parser.add_argument('--poisson', action='store_true', help="Exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for the request mix")
+    parser.add_argument('-o', '--output', default='threshold-search.jtl', help="JTL output file (default: threshold-search.jtl)")
+    parser.add_argument('--stub', action='store_true', help="Run against the generator's local stub server instead of --target")
+    parser.add_argument('--stub-delay-ms', type=float, default=5, help="Response delay of the stub server (default: 5)")
+    args = parser.parse_args()
+    
+    print("🏥 HEALTHCARE APPLICATION - ADAPTIVE OVERLOAD THRESHOLD SEARCH")
+    print("=" * 60)
+    
+    start = time.perf_counter()
+    search, passing, failing = asyncio.run(run_search(args))
+    duration = time.perf_counter() - start
+    
+    results_df = search.results()
+    measured = results_df['Samples'].notna().any()
+    if measured:
+        search.analyzer.generate_table(results_df)
+    else:
+        print("\n⚠️  No probe collected 10 samples - no results table or plot")
+    search.generate_summary(passing, failing, duration)
+    if measured:
+        search.analyzer.generate_plot(results_df, (passing + failing) / 2 if failing is not None and passing else None)
+        search.analyzer.wait_for_plot()
+    print(f"💾 JTL saved: {args.output}")
+
+if __name__ == "__main__":
+    main()
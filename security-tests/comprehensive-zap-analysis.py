@@ -4,31 +4,680 @@ Comprehensive ZAP Security Analysis
 Extracts security metrics from OWASP ZAP reports for medical application assessment
 """
 
+import argparse
+import contextlib
+import hashlib
+import io
 import json
+import math
+import mmap
+import operator
 import os
 import re
+import sqlite3
+import struct
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
-def analyze_security_reports():
-    """Main analysis function"""
-    reports_dir = Path("reports")
+# ZAP's riskcode values, for reports that carry no plain 'risk' field (traditional-json)
+RISK_CODES = {'0': 'Informational', '1': 'Low', '2': 'Medium', '3': 'High'}
+
+# Streaming JSON parse: characters read per chunk, instances per batch, and the
+# array size up to which a whole array is decoded at once
+STREAM_CHUNK_CHARS = 1 << 20
+STREAM_BATCH_SIZE = 1000
+STREAM_WHOLE_ARRAY_CHARS = 1 << 18
+JSON_WHITESPACE = re.compile(r'[ \t\r\n]*')
+JSON_SEPARATOR = re.compile(r'[ \t\r\n]*,[ \t\r\n]*')
+
+class JsonPullParser:
+    """Minimal pull parser for walking a large JSON document without loading it.
     
-    print("\n" + "="*60)
-    print("   COMPREHENSIVE SECURITY ANALYSIS")
-    print("   Medical Application Assessment")
-    print("="*60)
+    The caller navigates containers with object_keys() / array_items(),
+    decodes small values with value() and long arrays in batches with
+    array_batches(), all through json's C scanner on a bounded buffer, so
+    memory stays proportional to the chunk size and the largest single value.
+    """
     
-    if not reports_dir.exists():
-        print("❌ Reports directory not found!")
-        return
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+        self.scan = json.scanner.make_scanner(self.decoder)
+    
+    def fill(self):
+        """Read the next chunk; False at the end of the file"""
+        if self.eof:
+            return False
+        chunk = self.f.read(STREAM_CHUNK_CHARS)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self):
+        """Next non-whitespace character ('' at the end)"""
+        while True:
+            self.pos = JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+    
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected '{char}' at offset {self.pos} of the buffer")
+        self.pos += 1
+    
+    def value(self):
+        """Decode the next complete value"""
+        if self.buffer[self.pos:self.pos + 1] in ('', ' ', '\t', '\r', '\n'):
+            self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A value ending the buffer may continue in the next chunk, as may "3." of "3.5"
+            if (end == len(self.buffer) or self.buffer[end] in '.eE+-') and self.fill():
+                continue
+            self.pos = end
+            return value
+    
+    def object_keys(self):
+        """Yield the keys of the next object; the caller consumes each value before resuming"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+    
+    def array_items(self):
+        """Yield once per element of the next array; the caller consumes each element"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
+    
+    def array_batches(self, size=STREAM_BATCH_SIZE):
+        """Yield the decoded elements of the next array in lists of up to `size`"""
+        # An array that fits in the buffer is decoded in a single C call
+        if self.peek() == '[':
+            if len(self.buffer) - self.pos < STREAM_WHOLE_ARRAY_CHARS:
+                self.fill()
+            try:
+                values, end = self.scan(self.buffer, self.pos)
+            except (StopIteration, json.JSONDecodeError):
+                pass
+            else:
+                self.pos = end
+                for start in range(0, len(values), size):
+                    yield values[start:start + size]
+                return
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        batch = []
+        while True:
+            # Fast path: one C call per element while it and the next separator are buffered
+            buffer, pos = self.buffer, self.pos
+            while len(batch) < size:
+                try:
+                    value, end = self.scan(buffer, pos)
+                except (StopIteration, json.JSONDecodeError):
+                    break
+                separator = JSON_SEPARATOR.match(buffer, end)
+                if not separator or separator.end() == len(buffer):
+                    break
+                batch.append(value)
+                pos = separator.end()
+            self.pos = pos
+            if len(batch) >= size:
+                yield batch
+                batch = []
+                continue
+            
+            # Slow path: the element at the end of the buffer or of the array
+            batch.append(self.value())
+            if self.peek() == ',':
+                self.pos += 1
+                self.peek()
+            else:
+                self.expect(']')
+                if batch:
+                    yield batch
+                return
+
+def iter_zap_events(json_file):
+    """Stream a ZAP JSON report as ('instances', [dict, ...]) and ('alert', dict) events.
+    
+    The instances of each site[].alerts[].instances[] arrive in batches of
+    instance dicts; after the last batch the alert itself follows, with its
+    other fields and 'instance_count'.
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        parser = JsonPullParser(f)
+        for key in parser.object_keys():
+            if key != 'site':
+                parser.value()
+                continue
+            for _ in parser.array_items():
+                for site_key in parser.object_keys():
+                    if site_key != 'alerts':
+                        parser.value()
+                        continue
+                    for _ in parser.array_items():
+                        alert = {'instance_count': 0}
+                        for alert_key in parser.object_keys():
+                            if alert_key != 'instances':
+                                alert[alert_key] = parser.value()
+                                continue
+                            for instances in parser.array_batches():
+                                alert['instance_count'] += len(instances)
+                                yield 'instances', instances
+                        yield 'alert', alert
+
+def alert_risk(alert):
+    """Plain risk level of an alert: 'risk', else the first word of 'riskdesc', else 'riskcode'"""
+    if alert.get('risk'):
+        return alert['risk']
+    if alert.get('riskdesc'):
+        return alert['riskdesc'].split(' (')[0]
+    return RISK_CODES.get(str(alert.get('riskcode')), 'Unknown')
+
+# HTML report scan: compiled byte patterns run window by window over the memory-mapped file
+HTML_URL_PATTERN = re.compile(rb'https?://[^\s<>"]+')
+HTML_DURATION_PATTERN = re.compile(rb'Scan Duration[:\s]*([0-9]+(?:\.[0-9]+)?)\s*minutes?', re.IGNORECASE)
+HTML_SCAN_CHUNK = 8 << 20
+
+def stable_hashes(values):
+    """64-bit BLAKE2b hashes of byte strings; unlike hash() they are the same in every process and run"""
+    digests = b''.join([hashlib.blake2b(value, digest_size=8).digest() for value in values])
+    return struct.unpack(f'<{len(digests) // 8}Q', digests)
+
+class HyperLogLog:
+    """Approximate distinct counter (HyperLogLog) over 64-bit hashes (see stable_hashes).
+    
+    2^precision one-byte registers; the standard error is 1.04 / sqrt(2^precision),
+    i.e. about 0.8% in 16 KiB at the default precision of 14.
+    """
+    
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+    
+    def add(self, value):
+        self.update((value,))
+    
+    def update(self, values):
+        registers = self.registers
+        shift = 64 - self.precision
+        mask = (1 << shift) - 1
+        for value in values:
+            # Top bits pick the register, which keeps the longest run of leading zeros seen in the rest
+            value &= 0xFFFFFFFFFFFFFFFF
+            rank = shift - (value & mask).bit_length() + 1
+            if rank > registers[value >> shift]:
+                registers[value >> shift] = rank
+    
+    def __len__(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+def html_windows(data, chunk_size=HTML_SCAN_CHUNK):
+    """Split `data` (bytes or mmap) into (start, end) windows of about `chunk_size` bytes.
+    
+    Every window but the last ends just before a '<'. Neither pattern can
+    match across a '<', so no match spans two windows and scanning them in
+    order finds exactly what one scan over the whole file would.
+    """
+    size = len(data)
+    start = 0
+    while start < size:
+        end = data.find(b'<', start + chunk_size) if start + chunk_size < size else -1
+        end = size if end == -1 else end
+        yield start, end
+        start = end
+
+class FindingsIndex:
+    """SQLite index of the findings of every analyzed scan.
+    
+    A finding is one (rule, risk, URI, parameter) and is stored once across
+    all scans; a scan itself is just its (scan, finding, instances)
+    occurrence rows. Every scan keeps the content hash of its source report
+    (UNIQUE), so analyzing the same report twice records it once. Alerts are
+    appended to an unindexed staging table and moved on commit with
+    set-based INSERT ... SELECTs in index order, so the B-tree inserts are
+    sequential instead of random. Diffing two scans is
+    one GROUP BY over the occurrence primary key; the per-scan totals and
+    new / fixed counts against the previous scan are kept on the scan row
+    for trend queries.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scans (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            created TEXT NOT NULL,
+            started TEXT NOT NULL,
+            source TEXT,
+            fingerprint TEXT,
+            findings INTEGER,
+            high INTEGER,
+            medium INTEGER,
+            low INTEGER,
+            informational INTEGER,
+            new INTEGER,
+            fixed INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS scans_started ON scans (started, id);
+        CREATE TABLE IF NOT EXISTS rules (
+            id INTEGER PRIMARY KEY,
+            plugin_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE (plugin_id, name)
+        );
+        CREATE TABLE IF NOT EXISTS findings (
+            id INTEGER PRIMARY KEY,
+            rule_id INTEGER NOT NULL REFERENCES rules(id),
+            risk INTEGER NOT NULL,
+            uri TEXT NOT NULL,
+            param TEXT NOT NULL,
+            UNIQUE (rule_id, risk, uri, param)
+        );
+        CREATE TABLE IF NOT EXISTS occurrences (
+            scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+            finding_id INTEGER NOT NULL REFERENCES findings(id),
+            instances INTEGER NOT NULL,
+            PRIMARY KEY (scan_id, finding_id)
+        ) WITHOUT ROWID;
+    """
+    STAGING = """
+        CREATE TEMP TABLE IF NOT EXISTS staging (
+            rule_id INTEGER NOT NULL,
+            risk INTEGER NOT NULL,
+            uri TEXT NOT NULL,
+            param TEXT NOT NULL,
+            instances INTEGER NOT NULL
+        );
+    """
+    RISK_LEVELS = {name: int(code) for code, name in RISK_CODES.items()}
+    
+    def __init__(self, db_path='zap-findings.sqlite'):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(self.SCHEMA + self.STAGING)
+        # Indexes created before scans were fingerprinted lack the column
+        if 'fingerprint' not in {row[1] for row in self.connection.execute("PRAGMA table_info(scans)")}:
+            self.connection.execute("ALTER TABLE scans ADD COLUMN fingerprint TEXT")
+        self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS scans_fingerprint ON scans (fingerprint)")
+        self.scan_id = None
+        self.rule_ids = {}
+    
+    def close(self):
+        self.connection.close()
+    
+    def begin(self, name=None, source=None, started=None, fingerprint=None):
+        """Start recording a scan; feed it with add() and end with commit() or rollback()"""
+        self.connection.execute("BEGIN")
+        self.connection.execute("DELETE FROM staging")
+        created = datetime.now().isoformat(timespec='seconds')
+        self.scan_id = self.connection.execute(
+            "INSERT INTO scans (name, created, started, source, fingerprint) VALUES (?, ?, ?, ?, ?)",
+            (name, created, started or created, source, fingerprint)).lastrowid
+        return self.scan_id
+    
+    def find(self, fingerprint):
+        """Id of the scan recorded from the report with this content hash, or None"""
+        row = self.connection.execute("SELECT id FROM scans WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return None if row is None else row[0]
     
-    # Find report files
+    def rule_id(self, plugin_id, name):
+        key = (plugin_id, name)
+        if key not in self.rule_ids:
+            self.connection.execute("INSERT OR IGNORE INTO rules (plugin_id, name) VALUES (?, ?)", key)
+            self.rule_ids[key] = self.connection.execute(
+                "SELECT id FROM rules WHERE plugin_id = ? AND name = ?", key).fetchone()[0]
+        return self.rule_ids[key]
+    
+    def add(self, alert, instances):
+        """Stage one alert's instances, a Counter of (uri, param)"""
+        risk = alert.get('riskcode')
+        risk = int(risk) if str(risk) in RISK_CODES else self.RISK_LEVELS.get(alert_risk(alert), -1)
+        plugin_id = str(alert.get('pluginid', alert.get('pluginId', '')))
+        name = alert.get('name') or alert.get('alert') or 'Unknown'
+        rule_id = self.rule_id(plugin_id, name)
+        self.connection.executemany(
+            "INSERT INTO staging VALUES (?, ?, ?, ?, ?)",
+            [(rule_id, risk, uri, param, count) for (uri, param), count in instances.items()])
+    
+    def commit(self):
+        """Move the staged findings into the index and commit the scan; returns its id"""
+        scan_id, self.scan_id = self.scan_id, None
+        execute = self.connection.execute
+        execute("""
+            INSERT OR IGNORE INTO findings (rule_id, risk, uri, param)
+            SELECT rule_id, risk, uri, param FROM staging ORDER BY rule_id, risk, uri, param
+        """)
+        # The same finding can come from two alerts of one rule, e.g. with different evidence
+        execute("""
+            INSERT INTO occurrences (scan_id, finding_id, instances)
+            SELECT ?, f.id, SUM(s.instances)
+            FROM staging s JOIN findings f ON f.rule_id = s.rule_id AND f.risk = s.risk AND f.uri = s.uri AND f.param = s.param
+            GROUP BY f.id ORDER BY f.id
+        """, (scan_id,))
+        execute("DELETE FROM staging")
+        
+        by_risk = dict(execute("""
+            SELECT f.risk, COUNT(*) FROM occurrences o JOIN findings f ON f.id = o.finding_id
+            WHERE o.scan_id = ? GROUP BY f.risk
+        """, (scan_id,)).fetchall())
+        execute("UPDATE scans SET findings = ?, high = ?, medium = ?, low = ?, informational = ? WHERE id = ?",
+                (sum(by_risk.values()), by_risk.get(3, 0), by_risk.get(2, 0), by_risk.get(1, 0), by_risk.get(0, 0), scan_id))
+        
+        # New / fixed against the previous scan, and for the next one if this scan was slotted in before it
+        self.update_changes(scan_id)
+        following = self.neighbour(scan_id, following=True)
+        if following is not None:
+            self.update_changes(following)
+        self.connection.commit()
+        return scan_id
+    
+    def rollback(self):
+        self.scan_id = None
+        self.connection.rollback()
+    
+    def neighbour(self, scan_id, following=False):
+        """Id of the scan started just before (or after) `scan_id`, or None"""
+        comparison, order = ('>', 'ASC') if following else ('<', 'DESC')
+        row = self.connection.execute(f"""
+            SELECT s.id FROM scans s, scans t
+            WHERE t.id = ? AND (s.started, s.id) {comparison} (t.started, t.id)
+            ORDER BY s.started {order}, s.id {order} LIMIT 1
+        """, (scan_id,)).fetchone()
+        return None if row is None else row[0]
+    
+    def count_missing(self, scan_id, other_id):
+        """Findings of `scan_id` that `other_id` does not have"""
+        return self.connection.execute("""
+            SELECT COUNT(*) FROM occurrences o
+            WHERE o.scan_id = ? AND NOT EXISTS (
+                SELECT 1 FROM occurrences p WHERE p.scan_id = ? AND p.finding_id = o.finding_id)
+        """, (scan_id, other_id)).fetchone()[0]
+    
+    def update_changes(self, scan_id):
+        previous = self.neighbour(scan_id)
+        if previous is None:
+            changes = (None, None)
+        else:
+            changes = (self.count_missing(scan_id, previous), self.count_missing(previous, scan_id))
+        self.connection.execute("UPDATE scans SET new = ?, fixed = ? WHERE id = ?", (*changes, scan_id))
+    
+    def scans(self, last=None):
+        """Scans in the order they ran (the `last` most recent ones if given), as dicts"""
+        query = "SELECT * FROM scans ORDER BY started DESC, id DESC"
+        if last:
+            query += f" LIMIT {int(last)}"
+        cursor = self.connection.execute(query)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in reversed(cursor.fetchall())]
+    
+    def resolve(self, scan):
+        """Scan id from an id or a name (the latest scan of that name)"""
+        row = self.connection.execute(
+            "SELECT id FROM scans WHERE id = ? OR name = ? ORDER BY (id = ?) DESC, started DESC, id DESC LIMIT 1",
+            (scan, scan, scan)).fetchone()
+        if row is None:
+            raise ValueError(f"Scan '{scan}' not found in {self.db_path}")
+        return row[0]
+    
+    def diff_summary(self, baseline, candidate):
+        """Finding counts of two scans as (status, risk, count) rows, in a single query.
+        
+        Status is 'new' (only in the candidate), 'fixed' (only in the
+        baseline) or 'recurring'.
+        """
+        return self.connection.execute("""
+            SELECT d.status, f.risk, COUNT(*)
+            FROM (
+                SELECT finding_id,
+                       CASE WHEN COUNT(*) = 2 OR :baseline = :candidate THEN 'recurring' WHEN MIN(scan_id) = :candidate THEN 'new' ELSE 'fixed' END AS status
+                FROM occurrences WHERE scan_id IN (:baseline, :candidate)
+                GROUP BY finding_id
+            ) d
+            JOIN findings f ON f.id = d.finding_id
+            GROUP BY d.status, f.risk
+        """, {'baseline': baseline, 'candidate': candidate}).fetchall()
+    
+    def diff(self, baseline, candidate, limit=None):
+        """Findings of `candidate` missing from `baseline`, highest risk first.
+        
+        Rows are (risk, plugin_id, rule, uri, param, instances); swap the
+        scans for the fixed findings.
+        """
+        query = """
+            SELECT f.risk, r.plugin_id, r.name, f.uri, f.param, o.instances
+            FROM occurrences o
+            JOIN findings f ON f.id = o.finding_id
+            JOIN rules r ON r.id = f.rule_id
+            WHERE o.scan_id = ? AND NOT EXISTS (
+                SELECT 1 FROM occurrences p WHERE p.scan_id = ? AND p.finding_id = o.finding_id)
+            ORDER BY f.risk DESC, r.name, f.uri, f.param
+        """
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return self.connection.execute(query, (candidate, baseline)).fetchall()
+
+# Next.js API routes: project/app/api/**/route.ts, next to this directory
+API_ROUTES_DIR = Path(__file__).resolve().parent.parent / 'project' / 'app' / 'api'
+ROUTE_FILES = ('route.ts', 'route.js')
+ROUTE_METHOD_PATTERN = re.compile(
+    r'export\s+(?:async\s+function|function|const|let)\s+(GET|HEAD|POST|PUT|PATCH|DELETE|OPTIONS)\b')
+URI_PATH_PATTERN = re.compile(r'(?:[A-Za-z][A-Za-z0-9+.-]*://[^/?#]*)?([^?#]*)')
+
+def discover_routes(api_dir=API_ROUTES_DIR):
+    """Map every API route under `api_dir` to the HTTP methods its route file exports.
+    
+    Routes are URL patterns like '/api/records/[id]/download'; route groups
+    '(name)' are dropped from the URL and private '_folders' skipped, as in
+    the Next.js app router.
+    """
+    api_dir = Path(api_dir)
+    routes = {}
+    for route_file in sorted(path for name in ROUTE_FILES for path in api_dir.rglob(name)):
+        folders = route_file.parent.relative_to(api_dir).parts
+        if any(folder.startswith(('_', '@')) for folder in folders):
+            continue
+        segments = [folder for folder in folders if not (folder.startswith('(') and folder.endswith(')'))]
+        route = '/'.join(['', api_dir.name, *segments])
+        methods = ROUTE_METHOD_PATTERN.findall(route_file.read_text(encoding='utf-8', errors='ignore'))
+        routes[route] = sorted(set(methods))
+    return dict(sorted(routes.items()))
+
+class RouteMatcher:
+    """Matches request URIs to route patterns with one compiled regex.
+    
+    The routes are put in a trie of path segments, which is emitted as a
+    single anchored regex that also skips the scheme, host and query: each
+    trie node becomes one alternation, so a shared prefix is only matched
+    once, and each route ends in an empty capture group whose `lastindex`
+    names it. Within a node the route ending there comes first, then
+    static, dynamic ([id]) and catch-all ([...slug], [[...slug]])
+    children, so the first match is the one the Next.js router picks,
+    including its fallback to a dynamic route when a more specific branch
+    dead-ends.
+    """
+    
+    ROUTE = None
+    DYNAMIC = '[]'
+    CATCH_ALL = '[...]'
+    OPTIONAL_CATCH_ALL = '[[...]]'
+    SEGMENT_PATTERNS = {
+        DYNAMIC: r'/+[^/?#]+',
+        CATCH_ALL: r'(?:/+[^/?#]+)+',
+        OPTIONAL_CATCH_ALL: r'(?:/+[^/?#]+)*',
+    }
+    END_PATTERN = r'/*(?:[?#]|$)'
+    
+    def __init__(self, routes=()):
+        self.routes = []
+        root = {}
+        for route in routes:
+            node = root
+            for segment in filter(None, route.split('/')):
+                if segment.startswith('[[...'):
+                    segment = self.OPTIONAL_CATCH_ALL
+                elif segment.startswith('[...'):
+                    segment = self.CATCH_ALL
+                elif segment.startswith('['):
+                    segment = self.DYNAMIC
+                node = node.setdefault(segment, {})
+            node[self.ROUTE] = route
+        self.pattern = re.compile(r'(?:[A-Za-z][A-Za-z0-9+.-]*://[^/?#]*)?' + self.node_pattern(root))
+    
+    def node_pattern(self, node):
+        """Regex of a trie node; appends the routes in capture-group order"""
+        alternatives = []
+        if self.ROUTE in node:
+            self.routes.append(node[self.ROUTE])
+            alternatives.append(self.END_PATTERN + '()')
+        for segment in sorted(key for key in node if key is not None and key not in self.SEGMENT_PATTERNS):
+            alternatives.append('/+' + re.escape(segment) + self.node_pattern(node[segment]))
+        for segment in (self.DYNAMIC, self.CATCH_ALL, self.OPTIONAL_CATCH_ALL):
+            if segment in node:
+                alternatives.append(self.SEGMENT_PATTERNS[segment] + self.node_pattern(node[segment]))
+        if not alternatives:
+            return '(?!)'
+        return alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    
+    def match(self, uri):
+        """Route pattern of a URI or path ('/api/records/42/download'), or None"""
+        match = self.pattern.match(uri)
+        return self.routes[match.lastindex - 1] if match else None
+
+class RouteCoverage:
+    """Per-route coverage and findings of a scan, fed with its instance batches and alerts.
+    
+    Every distinct instance URI is classified once with a RouteMatcher over
+    the discovered routes and cached; a batch is then counted per (route,
+    method) with one cache lookup per instance and a C-level Counter.
+    """
+    
+    CACHE_LIMIT = 1 << 20
+    UNMATCHED = ''  # Cached route of an API path that no route file handles
+    URI_METHOD = operator.itemgetter('uri', 'method')
+    
+    def __init__(self, routes):
+        self.routes = routes
+        self.matcher = RouteMatcher(routes)
+        self.cache = {}
+        self.stats = {route: {'instances': 0, 'methods': Counter(), 'alerts': Counter()} for route in routes}
+        self.unmatched = Counter()
+        self.unmatched_instances = 0
+        self.alert_routes = set()
+    
+    def classify(self, uris):
+        """Add the route of every URI not cached yet to the cache (UNMATCHED for unhandled API paths)"""
+        missing = set(uris).difference(self.cache)
+        if len(self.cache) + len(missing) > self.CACHE_LIMIT:
+            self.cache.clear()
+            missing = set(uris)
+        match = self.matcher.match
+        for uri in missing:
+            route = match(uri)
+            if route is None:
+                path = URI_PATH_PATTERN.match(uri).group(1)
+                if path.startswith('/api/'):
+                    route = self.UNMATCHED
+            self.cache[uri] = route
+    
+    def add(self, instances):
+        """Count a batch of instance dicts of the current alert"""
+        try:
+            pairs = list(map(self.URI_METHOD, instances))
+        except KeyError:
+            pairs = [(instance.get('uri', ''), instance.get('method', '')) for instance in instances]
+        self.classify([uri for uri, _ in pairs])
+        cache = self.cache
+        counts = Counter([(cache[uri], method) for uri, method in pairs])
+        if any(route == self.UNMATCHED for route, _ in counts):
+            # Counted per instance, not per cache miss, so clearing the cache cannot count a path twice
+            self.unmatched.update([URI_PATH_PATTERN.match(uri).group(1) for uri, _ in pairs if cache[uri] == self.UNMATCHED])
+        
+        for (route, method), count in counts.items():
+            if route is None:
+                continue
+            if route == self.UNMATCHED:
+                self.unmatched_instances += count
+                continue
+            stats = self.stats[route]
+            stats['instances'] += count
+            stats['methods'][method] += count
+            self.alert_routes.add(route)
+    
+    def end_alert(self, alert):
+        risk = alert_risk(alert)
+        for route in self.alert_routes:
+            self.stats[route]['alerts'][risk] += 1
+        self.alert_routes = set()
+    
+    def report(self):
+        """Results entry: per-route stats, untested routes and unmatched API paths"""
+        routes = {}
+        for route, methods in self.routes.items():
+            stats = self.stats[route]
+            routes[route] = {
+                'methods': methods,
+                'tested_methods': sorted(method for method in stats['methods'] if method),
+                'instances': stats['instances'],
+                'alerts': dict(stats['alerts']),
+            }
+        return {
+            'routes': routes,
+            'untested': [route for route, stats in routes.items() if not stats['instances']],
+            'unmatched_paths': len(self.unmatched),
+            'unmatched_instances': self.unmatched_instances,
+            'unmatched_examples': [path for path, _ in self.unmatched.most_common(5)],
+        }
+
+def find_reports(reports_dir):
+    """(HTML, detailed JSON, summary JSON) report of a reports directory, None where missing"""
     html_report = None
     json_report = None
     summary_json = None
     
-    for file in reports_dir.iterdir():
+    for file in Path(reports_dir).iterdir():
         if file.suffix == '.html' and 'security' in file.name:
             html_report = file
         elif file.suffix == '.json' and 'detailed' in file.name:
@@ -36,12 +685,23 @@ def analyze_security_reports():
         elif file.suffix == '.json' and 'summary' in file.name:
             summary_json = file
     
+    return html_report, json_report, summary_json
+
+def analyze_reports(reports, approximate_urls=False, index_db=None, scan_name=None, api_dir=API_ROUTES_DIR):
+    """Results of the reports found by find_reports"""
+    html_report, json_report, summary_json = reports
     results = {}
     
     # Analyze JSON reports if available
     if json_report and json_report.exists():
         print(f"📊 Analyzing: {json_report.name}")
-        results.update(analyze_json_report(json_report))
+        coverage = None
+        if api_dir and Path(api_dir).is_dir():
+            coverage = RouteCoverage(discover_routes(api_dir))
+        if index_db:
+            results.update(index_json_report(json_report, index_db, scan_name, coverage))
+        else:
+            results.update(analyze_json_report(json_report, coverage=coverage))
     
     if summary_json and summary_json.exists():
         print(f"📊 Analyzing: {summary_json.name}")
@@ -50,56 +710,159 @@ def analyze_security_reports():
     # Analyze HTML report
     if html_report and html_report.exists():
         print(f"📊 Analyzing: {html_report.name}")
-        results.update(analyze_html_report(html_report))
+        results.update(analyze_html_report(html_report, approximate_urls))
+    
+    return results
+
+def analyze_security_reports(reports_dir="reports", approximate_urls=False, index_db=None, scan_name=None,
+                             api_dir=API_ROUTES_DIR):
+    """Main analysis function"""
+    reports_dir = Path(reports_dir)
+    
+    print("\n" + "="*60)
+    print("   COMPREHENSIVE SECURITY ANALYSIS")
+    print("   Medical Application Assessment")
+    print("="*60)
+    
+    if not reports_dir.exists():
+        print("❌ Reports directory not found!")
+        return
+    
+    results = analyze_reports(find_reports(reports_dir), approximate_urls, index_db, scan_name, api_dir)
     
     # Generate comprehensive analysis
     generate_analysis_report(results)
 
-def analyze_json_report(json_file):
-    """Analyze detailed JSON report"""
+def analyze_json_report(json_file, on_alert=None, coverage=None):
+    """Analyze detailed JSON report.
+    
+    The report is streamed (see iter_zap_events), so only counters and the
+    deduplicated, interned instance URIs are kept, never the document.
+    `on_alert(alert, instances)` is called for every alert with a Counter of
+    its (uri, param) instances, e.g. FindingsIndex.add. With a RouteCoverage
+    the instances are also mapped onto the API routes ('route_coverage').
+    """
     results = {
         'vulnerabilities': [],
         'risk_levels': {'High': 0, 'Medium': 0, 'Low': 0, 'Informational': 0},
         'owasp_categories': {},
-        'api_endpoints': []
+        'api_endpoints': set()
     }
     
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Extract vulnerabilities from ZAP JSON structure
-        sites = data.get('site', [])
-        for site in sites:
-            alerts = site.get('alerts', [])
-            for alert in alerts:
-                vuln = {
-                    'name': alert.get('name', 'Unknown'),
-                    'risk': alert.get('risk', 'Unknown'),
-                    'confidence': alert.get('confidence', 'Unknown'),
-                    'description': alert.get('desc', ''),
-                    'instances': len(alert.get('instances', [])),
-                    'urls': [inst.get('uri', '') for inst in alert.get('instances', [])]
-                }
-                results['vulnerabilities'].append(vuln)
-                
-                # Count risk levels
-                risk = vuln['risk']
-                if risk in results['risk_levels']:
-                    results['risk_levels'][risk] += 1
-                
-                # Extract API endpoints
-                for url in vuln['urls']:
-                    if '/api/' in url:
-                        results['api_endpoints'].append(url)
+        urls = set()
+        instances = Counter()
+        for kind, item in iter_zap_events(json_file):
+            if kind == 'instances':
+                urls.update([sys.intern(instance.get('uri', '')) for instance in item])
+                if on_alert is not None:
+                    instances.update([(sys.intern(instance.get('uri', '')), instance.get('param', '')) for instance in item])
+                if coverage is not None:
+                    coverage.add(item)
+                continue
+            
+            if on_alert is not None:
+                on_alert(item, instances)
+                instances = Counter()
+            if coverage is not None:
+                coverage.end_alert(item)
+            
+            vuln = {
+                'name': item.get('name', 'Unknown'),
+                'risk': alert_risk(item),
+                'confidence': item.get('confidence', 'Unknown'),
+                'description': item.get('desc', ''),
+                'instances': item['instance_count'],
+                'urls': urls
+            }
+            results['vulnerabilities'].append(vuln)
+            urls = set()
+            
+            # Count risk levels
+            risk = vuln['risk']
+            if risk in results['risk_levels']:
+                results['risk_levels'][risk] += 1
+            
+            # Extract API endpoints
+            results['api_endpoints'].update(url for url in vuln['urls'] if '/api/' in url)
         
         print(f"  ✓ Found {len(results['vulnerabilities'])} security findings")
+        if coverage is not None:
+            results['route_coverage'] = coverage.report()
         
     except Exception as e:
         print(f"  ⚠️  Error analyzing JSON report: {str(e)}")
+        results['json_error'] = str(e)
     
     return results
 
+def report_content_hash(report_file):
+    """BLAKE2b hex digest of a report file's content"""
+    digest = hashlib.blake2b()
+    with open(report_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def report_generated(json_file):
+    """When ZAP generated a JSON report ('@generated') in ISO format, or None if unknown"""
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            parser = JsonPullParser(f)
+            # ZAP writes '@generated' ahead of 'site', so only the top of the file is parsed
+            for key in parser.object_keys():
+                if key != '@generated':
+                    parser.value()
+                    continue
+                generated = parser.value()
+                for time_format in ('%a, %d %b %Y %H:%M:%S', '%Y-%m-%dT%H:%M:%S'):
+                    try:
+                        return datetime.strptime(generated, time_format).isoformat(timespec='seconds')
+                    except (TypeError, ValueError):
+                        pass
+                return None
+    except (OSError, ValueError):
+        pass
+    return None
+
+def report_started(json_file):
+    """Scan time of a JSON report: its '@generated' field, else the file's mtime"""
+    return (report_generated(json_file)
+            or datetime.fromtimestamp(json_file.stat().st_mtime).isoformat(timespec='seconds'))
+
+def index_json_report(json_file, index_db, scan_name=None, coverage=None):
+    """Analyze the detailed JSON report and record its findings in the findings index.
+    
+    A report whose content is already indexed is analyzed but not recorded again.
+    """
+    start = time.perf_counter()
+    index = FindingsIndex(index_db)
+    try:
+        fingerprint = report_content_hash(json_file)
+        recorded = index.find(fingerprint)
+        if recorded is not None:
+            results = analyze_json_report(json_file, coverage=coverage)
+            if 'json_error' not in results:
+                results['scan_id'] = recorded
+                print(f"🗄️  Report already recorded as scan #{recorded} in {index_db} - not added again")
+            return results
+        scan_id = index.begin(name=scan_name, source=str(json_file.parent), started=report_started(json_file),
+                              fingerprint=fingerprint)
+        results = analyze_json_report(json_file, on_alert=index.add, coverage=coverage)
+        if 'json_error' in results:
+            index.rollback()
+            return results
+        index.commit()
+        scan = next(scan for scan in index.scans() if scan['id'] == scan_id)
+    finally:
+        index.close()
+    
+    results['scan_id'] = scan_id
+    changes = "first scan" if scan['new'] is None else f"{scan['new']} new, {scan['fixed']} fixed since the previous scan"
+    print(f"🗄️  Scan #{scan_id} recorded in {index_db} ({(time.perf_counter() - start) * 1000:.0f} ms): "
+          f"{scan['findings']} findings, {changes}")
+    return results
+
 def analyze_summary_json(summary_file):
     """Analyze summary JSON for high-level metrics"""
     results = {'scan_metrics': {}}
@@ -122,26 +885,47 @@ def analyze_summary_json(summary_file):
         
     except Exception as e:
         print(f"  ⚠️  Error analyzing summary: {str(e)}")
+        results['summary_error'] = str(e)
     
     return results
 
-def analyze_html_report(html_file):
-    """Analyze HTML report for additional metrics"""
+def analyze_html_report(html_file, approximate_urls=False):
+    """Analyze HTML report for additional metrics.
+    
+    The file is memory-mapped and read once: each window (see html_windows)
+    is searched for URLs and, until found, the scan duration while it is
+    still cached. Unique URLs are counted by their 64-bit hashes instead of
+    the URL strings, or estimated with HyperLogLog when `approximate_urls`
+    is set. The hashes are stable, so every worker and run gets the same
+    count for the same report.
+    """
     results = {'html_analysis': {}, 'time_analysis': {}}
     
     try:
-        with open(html_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        unique_urls = HyperLogLog() if approximate_urls else set()
+        duration = None
+        with open(html_file, 'rb') as f:
+            # mmap cannot map an empty file
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+            try:
+                for start, end in html_windows(data):
+                    unique_urls.update(stable_hashes(HTML_URL_PATTERN.findall(data, start, end)))
+                    if duration is None:
+                        duration_match = HTML_DURATION_PATTERN.search(data, start, end)
+                        if duration_match:
+                            duration = float(duration_match.group(1))
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
         
         # Extract scan duration and timing
-        duration_match = re.search(r'Scan Duration[:\s]*([0-9]+(?:\.[0-9]+)?)\s*minutes?', content, re.IGNORECASE)
-        if duration_match:
-            results['time_analysis']['scan_duration_minutes'] = float(duration_match.group(1))
+        if duration is not None:
+            results['time_analysis']['scan_duration_minutes'] = duration
         
         # Count URLs tested
-        url_matches = re.findall(r'http[s]?://[^\s<>"]+', content)
-        unique_urls = set(url_matches)
         results['html_analysis']['urls_tested'] = len(unique_urls)
+        if approximate_urls:
+            results['html_analysis']['urls_tested_approximate'] = True
         
         # Extract file size for report complexity
         file_size = html_file.stat().st_size / (1024 * 1024)  # MB
@@ -151,6 +935,7 @@ def analyze_html_report(html_file):
         
     except Exception as e:
         print(f"  ⚠️  Error analyzing HTML report: {str(e)}")
+        results['html_error'] = str(e)
     
     return results
 
@@ -192,7 +977,8 @@ def generate_analysis_report(results):
     html_analysis = results.get('html_analysis', {})
     if html_analysis:
         print(f"\n🎯 COVERAGE ANALYSIS:")
-        print(f"   URLs Tested: {html_analysis.get('urls_tested', 'N/A')}")
+        approximate = '~' if html_analysis.get('urls_tested_approximate') else ''
+        print(f"   URLs Tested: {approximate}{html_analysis.get('urls_tested', 'N/A')}")
         print(f"   Report Size: {html_analysis.get('report_size_mb', 'N/A')} MB")
     
     # API Security Analysis
@@ -201,10 +987,34 @@ def generate_analysis_report(results):
     if unique_apis:
         print(f"\n🔧 API SECURITY:")
         print(f"   API Endpoints Tested: {len(unique_apis)}")
-        for api in sorted(unique_apis)[:5]:  # Show first 5
-            print(f"     • {api}")
-        if len(unique_apis) > 5:
-            print(f"     ... and {len(unique_apis) - 5} more")
+        if 'route_coverage' not in results:
+            for api in sorted(unique_apis)[:5]:  # Show first 5
+                print(f"     • {api}")
+            if len(unique_apis) > 5:
+                print(f"     ... and {len(unique_apis) - 5} more")
+    
+    # API Route Coverage
+    route_coverage = results.get('route_coverage')
+    if route_coverage:
+        routes = route_coverage['routes']
+        tested = len(routes) - len(route_coverage['untested'])
+        print(f"\n🧭 API ROUTE COVERAGE:")
+        print(f"   Routes Tested: {tested}/{len(routes)} ({tested / len(routes) * 100 if routes else 0:.0f}%)")
+        header = f"   {'Route':<40} {'Methods':<18} {'Tested':<18} {'Instances':<10} {'High':<5} {'Med':<5} {'Low':<5} {'Info':<5}"
+        print(header)
+        print("   " + "-" * (len(header) - 3))
+        for route, stats in sorted(routes.items(), key=lambda item: -item[1]['instances']):
+            if stats['instances']:
+                alerts = stats['alerts']
+                print(f"   {route:<40} {','.join(stats['methods']):<18} {','.join(stats['tested_methods']):<18} {stats['instances']:<10}"
+                      + f" {alerts.get('High', 0):<5} {alerts.get('Medium', 0):<5} {alerts.get('Low', 0):<5} {alerts.get('Informational', 0):<5}")
+        if route_coverage['untested']:
+            print(f"   ❌ Untested routes ({len(route_coverage['untested'])}):")
+            for route in route_coverage['untested']:
+                print(f"     • {route} ({','.join(routes[route]['methods'])})")
+        if route_coverage['unmatched_paths']:
+            print(f"   ⚠️  {route_coverage['unmatched_paths']} API paths ({route_coverage['unmatched_instances']} instances) match no route file, "
+                  f"e.g. {', '.join(route_coverage['unmatched_examples'][:3])}")
     
     # Security Assessment
     print(f"\n🛡️  SECURITY ASSESSMENT:")
@@ -243,5 +1053,290 @@ def generate_analysis_report(results):
     print(f"   Analysis completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*60)
 
+def scan_label(scan):
+    return f"#{scan['id']} ({scan['name'] or scan['started']})"
+
+def print_scan_diff(index_db, baseline, candidate, limit=20):
+    """Print new, fixed and recurring findings between two indexed scans; True if a new one is Medium or High risk"""
+    index = FindingsIndex(index_db)
+    try:
+        baseline_id, candidate_id = index.resolve(baseline), index.resolve(candidate)
+        scans = {scan['id']: scan for scan in index.scans()}
+        summary = index.diff_summary(baseline_id, candidate_id)
+        new = index.diff(baseline_id, candidate_id, limit)
+        fixed = index.diff(candidate_id, baseline_id, limit)
+    finally:
+        index.close()
+    
+    print(f"\n🔀 SCAN DIFF - baseline {scan_label(scans[baseline_id])} vs candidate {scan_label(scans[candidate_id])}")
+    for status, icon in (('new', '🆕'), ('fixed', '✅'), ('recurring', '🔁')):
+        risks = {RISK_CODES.get(str(risk), 'Unknown'): count for row_status, risk, count in summary if row_status == status}
+        breakdown = ', '.join(f"{risks[level]} {level}" for level in ('High', 'Medium', 'Low', 'Informational') if level in risks)
+        print(f"   {icon} {status.capitalize() + ':':<11} {sum(risks.values()):>6}" + (f"  ({breakdown})" if breakdown else ""))
+    
+    for status, title, rows in (('new', 'NEW FINDINGS', new), ('fixed', 'FIXED FINDINGS', fixed)):
+        if rows:
+            total = sum(count for row_status, _, count in summary if row_status == status)
+            print(f"\n{title}:")
+            for risk, plugin_id, rule, uri, param, instances in rows:
+                parameter = f" [{param}]" if param else ""
+                print(f"   {RISK_CODES.get(str(risk), 'Unknown'):<13} {rule} ({plugin_id}) - {uri}{parameter}")
+            if total > len(rows):
+                print(f"   ... and {total - len(rows)} more")
+    
+    return any(row_status == 'new' and risk >= 2 for row_status, risk, _ in summary)
+
+def print_trend(index_db, last=10):
+    """Print the totals of the last `last` indexed scans (all if 0)"""
+    index = FindingsIndex(index_db)
+    try:
+        scans = index.scans(last)
+    finally:
+        index.close()
+    
+    print(f"\n📈 FINDINGS TREND ({len(scans)} scans):")
+    header = (f"{'Scan':<6} {'Name':<20} {'Started':<20} {'Findings':<9} {'High':<6} {'Medium':<7} {'Low':<6} {'Info':<6}"
+              + f" {'New':<6} {'Fixed':<6}")
+    print(header)
+    print("-" * len(header))
+    for scan in scans:
+        new = '-' if scan['new'] is None else scan['new']
+        fixed = '-' if scan['fixed'] is None else scan['fixed']
+        print(f"{scan['id']:<6} {(scan['name'] or '')[:20]:<20} {scan['started']:<20} {scan['findings']:<9} {scan['high']:<6}"
+              + f" {scan['medium']:<7} {scan['low']:<6} {scan['informational']:<6} {new:<6} {fixed:<6}")
+
+def expand_report_dirs(paths):
+    """Report directories among `paths`; a directory without reports stands for its subdirectories"""
+    report_dirs = []
+    for path in map(Path, paths):
+        if not path.is_dir():
+            print(f"⚠️  Skipping {path}: not a directory")
+        elif any(find_reports(path)):
+            report_dirs.append(path)
+        else:
+            report_dirs.extend(sorted(child for child in path.iterdir() if child.is_dir() and any(find_reports(child))))
+    return report_dirs
+
+def report_fingerprint(reports):
+    """Name, size and mtime of each report file; any change invalidates a cached scan"""
+    fingerprint = []
+    for report in reports:
+        if report:
+            stat = report.stat()
+            fingerprint.append([report.name, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+def analyze_scan_dir(reports_dir, approximate_urls=False, api_dir=API_ROUTES_DIR):
+    """Process pool worker: analyze one reports directory and return its scan summary.
+    
+    Only the summary travels back to the parent, not the per-alert URL sets
+    of the full results. The analysis output is captured so parallel scans
+    do not interleave on the console.
+    """
+    start = time.perf_counter()
+    reports = find_reports(reports_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = analyze_reports(reports, approximate_urls, api_dir=api_dir)
+    
+    risk_levels = results.get('risk_levels')
+    scan_metrics = results.get('scan_metrics')
+    if risk_levels is None and scan_metrics:
+        # No detailed JSON report, fall back to the summary's counts
+        risk_levels = {
+            'High': scan_metrics['high_risk'],
+            'Medium': scan_metrics['medium_risk'],
+            'Low': scan_metrics['low_risk'],
+            'Informational': scan_metrics['info_risk'],
+        }
+    risk_levels = risk_levels or {}
+    findings = sum(risk_levels.values())
+    duration = results.get('time_analysis', {}).get('scan_duration_minutes')
+    route_coverage = results.get('route_coverage')
+    _, json_report, _ = reports
+    if json_report:
+        started = report_started(json_report)
+    else:
+        started = datetime.fromtimestamp(max(report.stat().st_mtime for report in reports if report)).isoformat(timespec='seconds')
+    return {
+        'name': Path(reports_dir).name,
+        'source': str(reports_dir),
+        'fingerprint': report_fingerprint(reports),
+        'started': started,
+        'findings': findings,
+        'risk_levels': risk_levels,
+        'instances': sum(vuln['instances'] for vuln in results.get('vulnerabilities', [])),
+        'urls_tested': results.get('html_analysis', {}).get('urls_tested'),
+        'duration_minutes': duration,
+        'findings_per_minute': findings / duration if duration else None,
+        'routes_tested': len(route_coverage['routes']) - len(route_coverage['untested']) if route_coverage else None,
+        'errors': [results[key] for key in ('json_error', 'summary_error', 'html_error') if key in results],
+        'analysis_seconds': time.perf_counter() - start,
+    }
+
+class BatchCache:
+    """JSON file of the scan summaries of already analyzed report directories.
+    
+    Entries are keyed by the absolute directory path and reused while the
+    directory's report fingerprint is unchanged. The whole cache is dropped
+    when the analysis options it was built with differ.
+    """
+    
+    VERSION = 2
+    
+    def __init__(self, cache_file='zap-batch-cache.json', options=None):
+        self.cache_file = cache_file
+        self.options = {'version': self.VERSION, **(options or {})}
+        self.scans = {}
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('options') == self.options:
+            self.scans = data.get('scans', {})
+    
+    def get(self, reports_dir, reports):
+        scan = self.scans.get(str(Path(reports_dir).resolve()))
+        if scan and scan['fingerprint'] == report_fingerprint(reports):
+            return scan
+        return None
+    
+    def put(self, reports_dir, scan):
+        self.scans[str(Path(reports_dir).resolve())] = scan
+    
+    def save(self):
+        # Written to a temporary file first so an interrupted run keeps the old cache
+        temp_file = f"{self.cache_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'options': self.options, 'scans': self.scans}, f)
+        os.replace(temp_file, self.cache_file)
+
+def analyze_batch(paths, workers=None, cache_file='zap-batch-cache.json', approximate_urls=False, api_dir=API_ROUTES_DIR):
+    """Analyze many report directories in a process pool and print their trend.
+    
+    One task per directory not in the cache; scans that failed to parse are
+    reported but neither cached nor trended, so the next run retries them.
+    """
+    print("\n" + "="*60)
+    print("   BATCH SECURITY ANALYSIS")
+    print("   Medical Application Assessment")
+    print("="*60)
+    
+    report_dirs = expand_report_dirs(paths)
+    if not report_dirs:
+        print("❌ No report directories found!")
+        return []
+    
+    api_dir = str(Path(api_dir).resolve()) if api_dir and Path(api_dir).is_dir() else None
+    cache = BatchCache(cache_file, {'approximate_urls': approximate_urls, 'api_dir': api_dir}) if cache_file else None
+    scans = []
+    pending = []
+    for reports_dir in report_dirs:
+        scan = cache.get(reports_dir, find_reports(reports_dir)) if cache else None
+        if scan:
+            scans.append(scan)
+        else:
+            pending.append(reports_dir)
+    print(f"📂 {len(report_dirs)} report directories: {len(scans)} cached, {len(pending)} to analyze")
+    
+    def collect(scan):
+        if scan['errors']:
+            print(f"  ⚠️  {scan['name']}: {'; '.join(scan['errors'])} - left out of the trend")
+            return
+        scans.append(scan)
+        print(f"  ✓ {scan['name']}: {scan['findings']} findings ({scan['analysis_seconds']:.1f}s)")
+        if cache:
+            cache.put(scan['source'], scan)
+    
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(pending) or 1)
+    try:
+        if workers == 1:
+            for reports_dir in pending:
+                collect(analyze_scan_dir(reports_dir, approximate_urls, api_dir))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(analyze_scan_dir, reports_dir, approximate_urls, api_dir) for reports_dir in pending]
+                for future in as_completed(futures):
+                    collect(future.result())
+    finally:
+        # Keep what was analyzed even if a later directory failed
+        if cache and pending:
+            cache.save()
+    if pending:
+        print(f"⏱️  Analyzed {len(pending)} directories in {time.perf_counter() - start:.1f}s with {workers} worker(s)")
+    
+    scans.sort(key=lambda scan: (scan['started'], scan['name']))
+    print_batch_trend(scans)
+    return scans
+
+def print_batch_trend(scans):
+    """Print risk counts and findings per minute of the scans in time order, with their totals"""
+    print(f"\n📈 SECURITY TREND ({len(scans)} scans):")
+    header = (f"{'Scan':<24} {'Started':<20} {'Findings':<9} {'High':<6} {'Medium':<7} {'Low':<6} {'Info':<6}"
+              + f" {'Minutes':<8} {'Per min':<8}")
+    print(header)
+    print("-" * len(header))
+    for scan in scans:
+        risk_levels = scan['risk_levels']
+        minutes = '-' if scan['duration_minutes'] is None else f"{scan['duration_minutes']:.1f}"
+        per_minute = '-' if scan['findings_per_minute'] is None else f"{scan['findings_per_minute']:.1f}"
+        print(f"{scan['name'][:24]:<24} {scan['started']:<20} {scan['findings']:<9} {risk_levels.get('High', 0):<6}"
+              + f" {risk_levels.get('Medium', 0):<7} {risk_levels.get('Low', 0):<6} {risk_levels.get('Informational', 0):<6}"
+              + f" {minutes:<8} {per_minute:<8}")
+    
+    timed = [scan for scan in scans if scan['duration_minutes']]
+    if timed:
+        minutes = sum(scan['duration_minutes'] for scan in timed)
+        print(f"\n⏱️  Findings Rate: {sum(scan['findings'] for scan in timed) / minutes:.1f} findings/minute "
+              f"over {minutes:.0f} scan minutes ({len(timed)} timed scans)")
+    if len(scans) > 1:
+        first, last = scans[0], scans[-1]
+        changes = ', '.join(f"{risk} {last['risk_levels'].get(risk, 0) - first['risk_levels'].get(risk, 0):+d}"
+                            for risk in ('High', 'Medium', 'Low', 'Informational'))
+        print(f"📊 {first['name']} -> {last['name']}: {changes}")
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Security metrics from OWASP ZAP reports")
+    parser.add_argument('reports_dir', nargs='?', default='reports', help="Directory with the ZAP reports (default: reports)")
+    parser.add_argument('--approximate-urls', action='store_true',
+                        help="Estimate the unique URLs of the HTML report with HyperLogLog (16 KiB, ~1%% error)")
+    parser.add_argument('--api-dir', default=str(API_ROUTES_DIR),
+                        help="Next.js app/api directory whose route files the findings are mapped onto (default: project/app/api)")
+    parser.add_argument('--index', default='zap-findings.sqlite', metavar='DB',
+                        help="SQLite findings index every analyzed JSON report is recorded in (default: zap-findings.sqlite)")
+    parser.add_argument('--no-index', action='store_true', help="Do not record this scan in the findings index")
+    parser.add_argument('--scan-name', help="Name of the recorded scan, e.g. a release or nightly date")
+    parser.add_argument('--diff', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Show new, fixed and recurring findings of two recorded scans (id or name); "
+                             "exits with 4 on a new Medium or High risk finding")
+    parser.add_argument('--trend', nargs='?', type=int, const=10, metavar='N',
+                        help="Show the totals and new / fixed counts of the last N recorded scans (default: 10, 0 = all)")
+    parser.add_argument('--batch', nargs='+', metavar='DIR',
+                        help="Analyze many report directories (or directories of them, e.g. nightly scans) in a process pool "
+                             "and print their trend; nothing is recorded in the findings index")
+    parser.add_argument('--workers', type=int, help="Processes for --batch (default: one per CPU)")
+    parser.add_argument('--batch-cache', default='zap-batch-cache.json', metavar='FILE',
+                        help="Scan summaries reused by --batch for unchanged directories (default: zap-batch-cache.json, '' = none)")
+    args = parser.parse_args()
+    
+    if args.batch:
+        analyze_batch(args.batch, args.workers, args.batch_cache, args.approximate_urls, args.api_dir)
+        return
+    
+    if args.diff or args.trend is not None:
+        if not os.path.exists(args.index):
+            print(f"❌ Findings index '{args.index}' not found!")
+            sys.exit(1)
+        if args.trend is not None:
+            print_trend(args.index, args.trend)
+        if args.diff:
+            sys.exit(4 if print_scan_diff(args.index, *args.diff) else 0)
+        return
+    
+    analyze_security_reports(args.reports_dir, args.approximate_urls,
+                             index_db=None if args.no_index else args.index, scan_name=args.scan_name, api_dir=args.api_dir)
+
 if __name__ == "__main__":
-    analyze_security_reports()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'load-tests'))
+
+from _scripts import load_script
+
+@pytest.fixture(scope='session')
+def benchmark_analysis():
+    return load_script('benchmark_analysis', 'benchmark-analysis.py')
+
+@pytest.fixture(scope='session')
+def generate_test():
+    return load_script('generate_test', 'generate-test.py')
+
+@pytest.fixture(scope='session')
+def fixture_jtl(tmp_path_factory, benchmark_analysis):
+    """Small synthetic open-model step-load JTL (7 steps, about 6 seconds each)"""
+    path = tmp_path_factory.mktemp('jtl') / 'results.jtl'
+    benchmark_analysis.SyntheticJtl(20_000, seed=1).write(path)
+    return str(path)
+
+def rewrite_jtl(source, path, drop_columns):
+    pd.read_csv(source).drop(columns=drop_columns).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture(scope='session')
+def closed_model_jtl(tmp_path_factory, fixture_jtl, generate_test):
+    """The fixture JTL as JMeter's thread groups would write it (no open-model marker)"""
+    return rewrite_jtl(fixture_jtl, tmp_path_factory.mktemp('jtl') / 'closed.jtl', [generate_test.ARRIVAL_MODEL_COLUMN])
+
+@pytest.fixture(scope='session')
+def closed_model_jtl_without_threads(tmp_path_factory, fixture_jtl, generate_test):
+    """Closed-model JTL without grpThreads / allThreads, as written by JMeter setups that omit them"""
+    return rewrite_jtl(fixture_jtl, tmp_path_factory.mktemp('jtl') / 'no-threads.jtl',
+                       [generate_test.ARRIVAL_MODEL_COLUMN, 'grpThreads', 'allThreads'])
+
+@pytest.fixture(scope='session')
+def zap_analysis():
+    return load_script('comprehensive_zap_analysis', os.path.join(ROOT, 'security-tests', 'comprehensive-zap-analysis.py'))
+
+@pytest.fixture(scope='session')
+def resource_sampler():
+    return load_script('resource_sampler', 'resource-sampler.py')
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+
+async def read_request(reader):
+    """Request line of the next request on a connection (headers consumed), b'' at EOF"""
+    request_line = await reader.readline()
+    while request_line:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+    return request_line
+
+async def start_server(handle):
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    return server, f"http://{host}:{port}"
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+def test_idle_connection_closed_by_server_is_not_reused(generate_test):
+    """A server with a short keep-alive timeout closes the pooled connection during a pause"""
+    connections = []
+    
+    async def handle(reader, writer):
+        connections.append(writer)
+        try:
+            while await asyncio.wait_for(read_request(reader), 0.2):
+                writer.write(RESPONSE)
+                await writer.drain()
+        except asyncio.TimeoutError:
+            pass
+        writer.close()
+    
+    async def scenario():
+        server, url = await start_server(handle)
+        client = generate_test.HttpClient(url)
+        try:
+            first = await client.request('GET', '/')
+            await asyncio.sleep(0.5)
+            second = await client.request('GET', '/')
+        finally:
+            await client.close()
+            server.close()
+        return first.status, second.status, len(connections)
+    
+    assert run(scenario()) == (200, 200, 2)
+
+def test_connection_closed_before_response_is_retried_once(generate_test):
+    """The server closes a reused connection as the request arrives (keep-alive race)"""
+    connections = []
+    
+    async def handle(reader, writer):
+        connections.append(writer)
+        await read_request(reader)
+        writer.write(RESPONSE)
+        await writer.drain()
+        # Drop the next request on this connection without answering it
+        await read_request(reader)
+        writer.close()
+    
+    async def scenario():
+        server, url = await start_server(handle)
+        client = generate_test.HttpClient(url, idle_timeout=60)
+        try:
+            statuses = [(await client.request('GET', '/')).status for _ in range(3)]
+        finally:
+            await client.close()
+            server.close()
+        return statuses, len(connections)
+    
+    assert run(scenario()) == ([200, 200, 200], 3)
+
+def test_new_connection_closed_before_response_fails(generate_test):
+    """Only reused connections are retried, a server that never answers is an error"""
+    connections = []
+    
+    async def handle(reader, writer):
+        connections.append(writer)
+        await read_request(reader)
+        writer.close()
+    
+    async def scenario():
+        server, url = await start_server(handle)
+        client = generate_test.HttpClient(url)
+        try:
+            with pytest.raises(ConnectionError):
+                await client.request('GET', '/')
+        finally:
+            await client.close()
+            server.close()
+        return len(connections)
+    
+    assert run(scenario()) == 1
@@ -0,0 +1,328 @@
+import os
+import random
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from _aggregation import StepAggregator
+from _analyzer import OverloadAnalyzer, ResourceTimeline
+from _history import RunHistory
+from _jtl import DROPPED_RESPONSE_CODE, JtlCache, SummariserTail, SummaryRing
+from _stats import CapacityModel, SloObjective
+
+CO_COLUMNS = ['p50_co_ms', 'p95_co_ms', 'p99_co_ms']
+
+@pytest.mark.parametrize('jtl', ['closed_model_jtl', 'closed_model_jtl_without_threads'])
+@pytest.mark.parametrize('chunksize', [997, 5000])
+def test_co_percentiles_do_not_depend_on_chunk_size(request, jtl, chunksize):
+    results_file = request.getfixturevalue(jtl)
+    analyzer = OverloadAnalyzer()
+    in_memory = analyzer.aggregate_results(results_file).step_metrics()
+    streamed = analyzer.aggregate_results(results_file, streaming=True, chunksize=chunksize).step_metrics()
+    assert in_memory[CO_COLUMNS].notna().all().all()
+    pd.testing.assert_frame_equal(in_memory[CO_COLUMNS], streamed[CO_COLUMNS])
+
+def test_open_model_jtl_is_not_backfilled(fixture_jtl, closed_model_jtl):
+    open_model = OverloadAnalyzer()
+    metrics = open_model.aggregate_results(fixture_jtl).step_metrics()
+    assert not open_model.co_correction
+    assert metrics['p95_co_ms'].isna().all()
+    
+    closed_model = OverloadAnalyzer()
+    closed = closed_model.aggregate_results(closed_model_jtl).step_metrics()
+    assert closed_model.co_correction
+    pd.testing.assert_series_equal(metrics['p95_ms'], closed['p95_ms'])
+    assert (closed['p95_co_ms'] >= closed['p95_ms']).all()
+
+def test_injector_threads_add_up_for_co_correction(closed_model_jtl, tmp_path):
+    samples = pd.read_csv(closed_model_jtl)
+    samples['grpThreads'] = samples['grpThreads'] // 2 * 2
+    single = tmp_path / 'single.jtl'
+    samples.to_csv(single, index=False)
+    # The same load from two injectors, each running half the threads and writing its own JTL
+    injectors = []
+    for number in range(2):
+        injector = samples.iloc[number::2].copy()
+        injector['grpThreads'] //= 2
+        injectors.append(str(tmp_path / f'injector-{number}.jtl'))
+        injector.to_csv(injectors[-1], index=False)
+    
+    analyzer = OverloadAnalyzer()
+    expected = analyzer.aggregate_results(str(single))
+    merged = analyzer.aggregate_files(injectors, workers=1)
+    for step_num, slice_start in expected.slices:
+        assert merged.intended_interval_ms(step_num, slice_start) == expected.intended_interval_ms(step_num, slice_start)
+    pd.testing.assert_frame_equal(analyzer.step_metrics(expected)[CO_COLUMNS], analyzer.step_metrics(merged)[CO_COLUMNS])
+
+def test_dropped_arrivals_count_as_errors_only(fixture_jtl, tmp_path):
+    samples = pd.read_csv(fixture_jtl)
+    # Every fourth arrival of the test also dropped at the in-flight limit, at the same scheduled time
+    dropped = samples.iloc[::4].copy()
+    dropped['label'] = dropped['label'].str.replace(r' - .*', ' - dropped', regex=True)
+    dropped['responseCode'] = DROPPED_RESPONSE_CODE
+    dropped['success'] = False
+    dropped[['elapsed', 'Latency', 'Connect', 'bytes']] = 0
+    with_drops = tmp_path / 'with-drops.jtl'
+    pd.concat([samples, dropped]).sort_values('timeStamp', kind='stable').to_csv(with_drops, index=False)
+    
+    metrics = []
+    for results_file in (fixture_jtl, str(with_drops)):
+        analyzer = OverloadAnalyzer()
+        analyzer.exclude_warmup = False
+        metrics.append(analyzer.step_metrics(analyzer.aggregate_results(results_file)))
+    clean, dropping = metrics
+    measured_columns = ['Achieved_RPS', 'mean_ms', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms']
+    pd.testing.assert_frame_equal(clean[measured_columns], dropping[measured_columns])
+    added = dropping['Samples'] - clean['Samples']
+    errors = (dropping['Error_%'] * dropping['Samples'] - clean['Error_%'] * clean['Samples']) / 100
+    assert (added > 0).all()
+    pd.testing.assert_series_equal(errors.round().astype(int), added.astype(int), check_names=False)
+
+def test_reanalysed_results_are_recorded_once(closed_model_jtl, tmp_path):
+    history_db = str(tmp_path / 'runs.sqlite')
+    for _ in range(2):
+        analyzer = OverloadAnalyzer()
+        analyzer.history_db = history_db
+        analyzer.run_files = [closed_model_jtl]
+        aggregator = analyzer.aggregate_results(closed_model_jtl)
+        results_df, _, _ = analyzer.evaluate_sla(analyzer.step_metrics(aggregator))
+        run_id = analyzer.record_run(aggregator, results_df, None, 'summary')
+    
+    history = RunHistory(history_db)
+    try:
+        assert list(history.runs().index) == [run_id]
+        assert history.runs().loc[run_id, 'latency'] == 'p95_co_ms'
+        comparison = history.compare(run_id, run_id)
+    finally:
+        history.close()
+    assert (comparison['Latency'] == 'p95_co_ms').all()
+    pd.testing.assert_series_equal(comparison['p95_a'], results_df['p95_co_ms'].reset_index(drop=True), check_names=False)
+
+def test_runs_differing_only_mid_file_are_told_apart(tmp_path):
+    # Same size, same first and last MiB: the JTL cache sample cannot see the difference
+    edge = b'x' * (1 << 20)
+    first, second = tmp_path / 'run-a.jtl', tmp_path / 'run-b.jtl'
+    first.write_bytes(edge + b'elapsed=120' + edge)
+    second.write_bytes(edge + b'elapsed=950' + edge)
+    cache = JtlCache(str(tmp_path / 'cache'))
+    assert cache.fingerprint(first)['content_hash'] == cache.fingerprint(second)['content_hash']
+    
+    fingerprint = RunHistory.source_fingerprint
+    assert fingerprint([first]) != fingerprint([second])
+    assert fingerprint([first, second]) == fingerprint([second, first])
+
+def aggregate_in_every_mode(results_file, cache_dir, histogram_file):
+    """Step metrics of one JTL aggregated in memory, streamed, in a process pool, cached and reloaded"""
+    analyzer = OverloadAnalyzer()
+    in_memory = analyzer.aggregate_results(results_file)
+    in_memory.save(histogram_file)
+    modes = {
+        'in-memory': in_memory,
+        'streaming': analyzer.aggregate_results(results_file, streaming=True, chunksize=1500),
+        'parallel': analyzer.aggregate_files([results_file], workers=3),
+        'saved': StepAggregator.load(histogram_file),
+    }
+    analyzer.cache_dir = cache_dir
+    modes['cache-build'] = analyzer.aggregate_results(results_file)
+    modes['cache-hit'] = analyzer.aggregate_results(results_file)
+    return {mode: analyzer.step_metrics(aggregator) for mode, aggregator in modes.items()}
+
+@pytest.mark.parametrize('jtl', ['fixture_jtl', 'closed_model_jtl'])
+def test_aggregation_modes_agree(request, tmp_path, jtl):
+    metrics = aggregate_in_every_mode(request.getfixturevalue(jtl), str(tmp_path / 'cache'),
+                                      str(tmp_path / 'histograms.json'))
+    expected = metrics.pop('in-memory')
+    assert len(expected) == 7
+    for mode, result in metrics.items():
+        pd.testing.assert_frame_equal(expected, result, obj=mode)
+
+def usl_points(lam=20.0, sigma=0.05, kappa=0.0005):
+    """Exact (throughput, mean latency ms) points of a USL system at increasing concurrency"""
+    concurrency = np.array([1, 2, 4, 8, 16, 32, 48])
+    throughput = lam * concurrency / (1 + sigma * (concurrency - 1) + kappa * concurrency * (concurrency - 1))
+    return throughput, concurrency / throughput * 1000
+
+def test_capacity_model_recovers_usl_parameters():
+    throughput, mean_ms = usl_points()
+    model = CapacityModel.fit(throughput, mean_ms, mean_ms * 1.5)
+    assert (model.lam, model.sigma, model.kappa) == pytest.approx((20.0, 0.05, 0.0005))
+    # Peak at N* = sqrt((1 - sigma) / kappa)
+    peak = np.sqrt(0.95 / 0.0005)
+    assert model.max_rps == pytest.approx(20.0 * peak / (1 + 0.05 * (peak - 1) + 0.0005 * peak * (peak - 1)))
+    assert model.max_rps_ci == pytest.approx((model.max_rps, model.max_rps))
+
+def test_capacity_bounds_without_usable_resamples_are_nan():
+    throughput, mean_ms = usl_points()
+    model = CapacityModel.fit(throughput, mean_ms, mean_ms * 1.5)
+    unusable = np.full(50, np.nan)
+    model.bootstrap = CapacityModel(unusable, unusable, unusable, model.p95_ratio)
+    assert model.sla_crossing(500) == pytest.approx(model.rps_at_p95(500))
+    assert np.isnan(model.crossing_ci).all()
+    assert np.isnan(CapacityModel._interval(unusable, 0.95)).all()
+
+def test_sla_verdict_follows_the_confidence_intervals():
+    analyzer = OverloadAnalyzer()
+    # (p95 interval, error % interval) per step against p95 < 2000 ms and errors < 1%
+    intervals = [((1500, 1800), (0, 0.5)), ((1800, 2200), (0, 0.5)), ((1900, 1990), (0.5, 1.5)),
+                 ((1600, 2000), (0, 0.5)), ((2000, 2500), (0.2, 0.4)), ((1000, 1200), (2, 3))]
+    metrics = pd.DataFrame({
+        'Samples': 1000,
+        'Achieved_RPS': [analyzer.step_rps_mapping[step_num] for step_num in range(1, 7)],
+        'p95_ms_low': [p95[0] for p95, _ in intervals],
+        'p95_ms_high': [p95[1] for p95, _ in intervals],
+        'p95_co_ms': np.nan,
+        'Error_%_low': [errors[0] for _, errors in intervals],
+        'Error_%_high': [errors[1] for _, errors in intervals],
+    }, index=pd.Index(range(1, 7), name='step'))
+    results_df, threshold, reason = analyzer.evaluate_sla(metrics)
+    assert list(results_df['SLA_Pass']) == ['PASS', 'INCONCLUSIVE', 'INCONCLUSIVE', 'INCONCLUSIVE', 'FAIL', 'FAIL']
+    assert threshold == 150
+    assert reason == "latency at 150 RPS, inconclusive from 25 RPS"
+
+def test_error_breach_of_an_under_delivered_step_is_flagged():
+    analyzer = OverloadAnalyzer()
+    metrics = pd.DataFrame({
+        'Samples': 1000,
+        'Achieved_RPS': [10.0, 18.0],
+        'p95_ms_low': 100, 'p95_ms_high': 200, 'p95_co_ms': np.nan,
+        'Error_%_low': [0.0, 5.0], 'Error_%_high': [0.1, 7.0],
+    }, index=pd.Index([1, 2], name='step'))
+    results_df, threshold, reason = analyzer.evaluate_sla(metrics)
+    assert list(results_df['SLA_Pass']) == ['PASS', 'FAIL']
+    assert threshold == 25
+    assert reason == "errors at 25 RPS, injector under-delivered: 18.0 RPS achieved"
+
+SLO_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'load-tests', 'slo-objectives.json')
+
+def test_slo_burn_rates_match_the_raw_samples(fixture_jtl):
+    analyzer = OverloadAnalyzer()
+    analyzer.load_slo_objectives(SLO_FILE)
+    aggregator = analyzer.aggregate_results(fixture_jtl, streaming=True, chunksize=1500)
+    samples = pd.read_csv(fixture_jtl)
+    samples['second'] = samples['timeStamp'] // 1000
+    seconds = range(samples['second'].min(), samples['second'].max() + 1)
+    for objective in analyzer.slo_objectives:
+        matching = samples[samples['label'].str.contains(objective.label)] if objective.label else samples
+        if objective.type == 'latency':
+            matching = matching[matching['responseCode'] != DROPPED_RESPONSE_CODE]
+            bad = matching['elapsed'] >= objective.threshold_ms
+        else:
+            bad = ~matching['success']
+        expected = pd.DataFrame({'requests': matching.groupby('second').size(), 'bad': bad.groupby(matching['second']).sum()})
+        expected = expected.reindex(seconds, fill_value=0)
+        burn = aggregator.slo_burn(objective)
+        assert (burn[['requests', 'bad']].to_numpy() == expected.loc[burn.index].to_numpy()).all(), objective.name
+        assert expected.drop(burn.index).sum().sum() == 0, objective.name
+        for window, window_s in (('short', objective.short_window_s), ('long', objective.long_window_s)):
+            rolling = expected.loc[burn.index].rolling(window_s, min_periods=1).sum()
+            ratio = rolling['bad'] / rolling['requests'].where(rolling['requests'] >= objective.min_events)
+            pd.testing.assert_series_equal(burn[f'burn_{window}'], ratio / (1 - objective.target), check_names=False)
+
+def test_sustained_slo_violation_needs_both_windows():
+    objective = SloObjective('errors < 1%', 'errors', target=0.99, short_window_s=2, long_window_s=4)
+    # 100 requests per second, an error burst in seconds 3 and 4 only
+    per_second = pd.DataFrame({'requests': 100, 'bad': [0, 0, 0, 4, 4, 0, 0, 0]})
+    burn = objective.evaluate(per_second)
+    assert list(burn['burn_short']) == pytest.approx([0, 0, 0, 2, 4, 2, 0, 0])
+    assert list(burn['burn_long']) == pytest.approx([0, 0, 0, 1, 2, 2, 2, 1])
+    assert list(burn.index[burn['violated']]) == [3, 4, 5]
+    assert list(burn.index[burn['sustained']]) == [4, 5]
+
+def test_sampler_csv_loads_on_the_jtl_clock(resource_sampler, tmp_path):
+    assert resource_sampler.pool_max_from_config() == 20    # project/lib/db.ts
+    (tmp_path / 'db.ts').write_text("const pool = new Pool({ connectionString });\n")
+    assert resource_sampler.pool_max_from_config(str(tmp_path / 'db.ts')) is None
+    
+    resource_file = str(tmp_path / 'resources.csv')
+    sampler = resource_sampler.ResourceSampler(resource_file, interval=0.1, process_pattern='python', dsn=None, pool_max=20)
+    assert sampler.run(duration=0.5) >= 3
+    raw = pd.read_csv(resource_file)
+    assert list(raw.columns) == resource_sampler.SAMPLE_COLUMNS
+    timeline = ResourceTimeline.load(resource_file, clock_offset_s=-5)
+    assert list(timeline.samples.index) == sorted(set(raw['timestamp_ms'] // 1000 - 5))
+    utilization = timeline.utilization()
+    # No PostgreSQL poll, so only the host and process resources have samples
+    assert 'host CPU' in utilization and 'pg pool connections' not in utilization
+    assert utilization['host CPU'].between(0, 1).all()
+
+def test_first_sustained_saturation_is_named(fixture_jtl, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    analyzer = OverloadAnalyzer()
+    aggregator = analyzer.aggregate_results(fixture_jtl)
+    results_df, threshold, _ = analyzer.evaluate_sla(analyzer.step_metrics(aggregator))
+    seconds = aggregator.seconds.index.get_level_values('second')
+    start = seconds.min()
+    elapsed = np.arange(seconds.max() - start + 1)
+    # A 3-second CPU spike (shorter than the 5 seconds of sustain), then the pool fills before the CPU does
+    samples = pd.DataFrame({
+        'timestamp_ms': (start + elapsed - 7) * 1000 + 250,     # the sampler's clock is 7 seconds behind
+        'cpu_pct': np.where((elapsed >= 20) & (elapsed < 23) | (elapsed >= 120), 95.0, 50.0),
+        'pg_connections': np.where(elapsed >= 90, 19, 8),
+        'pool_max': 20,
+    })
+    samples.to_csv('resources.csv', index=False)
+    analyzer.resource_file = 'resources.csv'
+    analyzer.resource_clock_offset_s = 7
+    report = analyzer.generate_resource_report(aggregator, results_df, threshold)
+    saturated_from = {row['resource']: row['saturated_from_s'] for row in report['resources']}
+    assert saturated_from == {'host CPU': 120, 'pg pool connections': 90}
+    assert report['first_saturated'] == 'pg pool connections'
+    assert report['threshold_step'] == results_df.loc[results_df['RPS'] == threshold, 'Step'].iloc[0]
+    aligned = pd.read_csv('overload-resources.csv', index_col=0)
+    assert aligned.loc[start + 20:start + 22, 'cpu_pct'].eq(95).all() and aligned.loc[start + 19, 'cpu_pct'] == 50
+
+JMETER_LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'load-tests', 'jmeter.log')
+
+def test_summariser_intervals_add_up_to_the_totals():
+    tail = SummariserTail(JMETER_LOG)
+    rows = tail.read()
+    with open(JMETER_LOG, 'r', encoding='utf-8') as f:
+        assert len(rows) == sum(' summary + ' in line for line in f)
+    samples = [row[2] for row in rows]
+    assert sum(samples) == tail.totals[2] == 53165
+    assert tail.read() == []
+
+def test_summariser_lines_split_across_reads(tmp_path):
+    with open(JMETER_LOG, 'rb') as f:
+        log = f.read()
+    expected = SummariserTail(JMETER_LOG).read()
+    growing = tmp_path / 'jmeter.log'
+    growing.write_bytes(b'')
+    tail = SummariserTail(str(growing))
+    rng = random.Random(0)
+    rows, written = [], 0
+    with open(growing, 'ab') as f:
+        while written < len(log):
+            # JMeter flushes at arbitrary points, often in the middle of a line
+            piece = log[written:written + rng.randint(1, 4096)]
+            f.write(piece)
+            f.flush()
+            written += len(piece)
+            rows += tail.read()
+    assert rows == expected
+
+def test_summariser_parses_empty_intervals_and_decimal_commas(tmp_path):
+    log = tmp_path / 'jmeter.log'
+    log.write_text(
+        "2025-09-14 03:13:01,034 INFO o.a.j.r.Summariser: summary +      0 in 00:00:30 =    0,0/s Avg:     0"
+        " Min: 9223372036854775807 Max: -9223372036854775808 Err:     0 (0,00%) Active: 2 Started: 2 Finished: 0\n"
+        "2025-09-14 03:13:31,500 INFO o.a.j.r.Summariser: summary +    45 in 00:00:30 =    1,5/s Avg:   120"
+        " Min:    80 Max:   300 Err:     3 (6,67%) Active: 2 Started: 2 Finished: 0\n"
+        "2025-09-14 03:13:32,000 INFO o.a.j.r.Summariser: summary +    99 in 00:00:30")
+    end_ms = int(datetime(2025, 9, 14, 3, 13, 31).timestamp() * 1000) + 500
+    assert SummariserTail(str(log)).read() == [
+        (end_ms - 30466, 30, 0, 0.0, 0, 0, 0, 0, 2),
+        (end_ms, 30, 45, 1.5, 120, 80, 300, 3, 2),
+    ]
+
+def test_summary_ring_keeps_the_latest_intervals():
+    ring = SummaryRing(capacity=4)
+    for number in range(6):
+        ring.append((number * 30_000, 30, 100 + number, 3.3, 50, 10, 90, number, 5))
+    assert len(ring) == 4
+    assert list(ring.last()['samples']) == [102, 103, 104, 105]
+    assert list(ring.last(2)['errors']) == [4, 5]
+    assert list(ring.series()['Error_%'].round(2)) == [1.96, 2.91, 3.85, 4.76]
+
@@ -0,0 +1,232 @@
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+class RandomReads(io.StringIO):
+    """Text file whose reads return 1-64 characters at random, so tokens straddle chunk boundaries"""
+    
+    def __init__(self, text, seed):
+        super().__init__(text)
+        self.random = random.Random(seed)
+    
+    def read(self, size=-1):
+        return super().read(self.random.randint(1, 64))
+
+def random_value(rng, depth=0):
+    kind = rng.choice(['object', 'array', 'batch'] if depth < 3 else ['number', 'string', 'literal'])
+    if kind == 'object':
+        return {f"key {i} é\"": random_value(rng, depth + 1) for i in range(rng.randint(0, 5))}
+    if kind == 'array':
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 5))]
+    if kind == 'batch':
+        return [random_value(rng, 3) for _ in range(rng.randint(20, 60))]
+    if kind == 'number':
+        return rng.choice([rng.randint(-10 ** 12, 10 ** 12), rng.uniform(-1e6, 1e6), rng.random() * 1e-30, 3.5e+300])
+    if kind == 'string':
+        return ''.join(rng.choice('ab \\"/\n\t☃\U0001f600') for _ in range(rng.randint(0, 30)))
+    return rng.choice([True, False, None])
+
+def pull(parser):
+    """Rebuild the next value through object_keys(), array_items() and value()"""
+    char = parser.peek()
+    if char == '{':
+        return {key: pull(parser) for key in parser.object_keys()}
+    if char == '[':
+        items = []
+        for _ in parser.array_items():
+            items.append(pull(parser))
+        return items
+    return parser.value()
+
+@pytest.mark.parametrize('seed', range(20))
+def test_pull_parser_matches_json_load(zap_analysis, seed):
+    rng = random.Random(seed)
+    document = {'@generated': 'Tue, 12 Dec 2023 10:44:19', 'site': [random_value(rng) for _ in range(5)]}
+    text = json.dumps(document, indent=rng.choice([None, 1]), ensure_ascii=rng.random() < 0.5)
+    parser = zap_analysis.JsonPullParser(RandomReads(text, seed))
+    assert pull(parser) == json.loads(text)
+    assert parser.peek() == ''
+
+@pytest.mark.parametrize('seed', range(5))
+def test_pull_parser_batches_match_json_load(zap_analysis, seed):
+    rng = random.Random(seed)
+    values = [random_value(rng, 2) for _ in range(500)]
+    text = json.dumps({'values': values, 'after': 1})
+    parser = zap_analysis.JsonPullParser(RandomReads(text, seed))
+    keys = parser.object_keys()
+    assert next(keys) == 'values'
+    assert [value for batch in parser.array_batches(size=7) for value in batch] == values
+    assert next(keys) == 'after' and parser.value() == 1
+
+ROUTES = [
+    '/api/records',
+    '/api/records/[id]',
+    '/api/records/[id]/download',
+    '/api/records/export',
+    '/api/users/[id]/settings',
+    '/api/users/me/profile',
+    '/api/files/[...path]',
+    '/api/docs/[[...slug]]',
+]
+
+@pytest.mark.parametrize('uri, route', [
+    ('http://localhost:3000/api/records?page=2', '/api/records'),
+    ('/api/records/', '/api/records'),
+    ('/api/records/export', '/api/records/export'),             # static before dynamic
+    ('/api/records/42', '/api/records/[id]'),
+    ('/api/records/42/download#top', '/api/records/[id]/download'),
+    ('/api/records/export/download', '/api/records/[id]/download'),  # static branch dead-ends
+    ('/api/users/me/profile', '/api/users/me/profile'),
+    ('/api/users/me/settings', '/api/users/[id]/settings'),
+    ('/api/files/a/b/c.pdf', '/api/files/[...path]'),
+    ('/api/files', None),                                       # a catch-all needs one segment
+    ('/api/docs', '/api/docs/[[...slug]]'),
+    ('/api/docs/guides/setup', '/api/docs/[[...slug]]'),
+    ('/api/recordsX', None),
+    ('/api/unknown/1', None),
+])
+def test_route_matcher_precedence(zap_analysis, uri, route):
+    assert zap_analysis.RouteMatcher(ROUTES).match(uri) == route
+
+def test_route_matcher_ignores_declaration_order(zap_analysis):
+    forward, backward = zap_analysis.RouteMatcher(ROUTES), zap_analysis.RouteMatcher(ROUTES[::-1])
+    for uri in ('/api/records/export', '/api/records/7', '/api/users/me/settings', '/api/docs'):
+        assert forward.match(uri) == backward.match(uri)
+
+def test_unmatched_paths_are_counted_per_instance(zap_analysis):
+    coverage = zap_analysis.RouteCoverage({route: ['GET'] for route in ROUTES})
+    coverage.CACHE_LIMIT = 3    # Cleared on almost every batch
+    batch = [{'uri': f'http://localhost:3000/api/{path}', 'method': 'GET'}
+             for path in ('legacy/1', 'legacy/1', 'records/7', 'unknown', 'legacy/2')]
+    for _ in range(4):
+        coverage.add(batch)
+        coverage.end_alert({'risk': 'Low'})
+    report = coverage.report()
+    assert report['unmatched_paths'] == 3
+    assert report['unmatched_instances'] == 16
+    assert coverage.unmatched == {'/api/legacy/1': 8, '/api/unknown': 4, '/api/legacy/2': 4}
+    assert report['unmatched_examples'][0] == '/api/legacy/1'
+
+def test_html_url_count_is_the_same_in_every_process(zap_analysis, tmp_path):
+    html_report = tmp_path / 'zap-security-report.html'
+    html_report.write_text(''.join(f"<td>http://localhost:3000/api/records/{i % 5000}?page={i % 3}</td>\n" for i in range(20000)))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (f"import sys; sys.path.insert(0, {os.path.join(root, 'load-tests')!r}); from pathlib import Path; "
+              "from _scripts import load_script; "
+              f"zap = load_script('zap', {os.path.join(root, 'security-tests', 'comprehensive-zap-analysis.py')!r}); "
+              f"print(zap.analyze_html_report(Path({str(html_report)!r}), approximate_urls=True)['html_analysis']['urls_tested'])")
+    counts = {subprocess.run([sys.executable, '-c', script], env={**os.environ, 'PYTHONHASHSEED': str(seed)},
+                             capture_output=True, text=True, check=True).stdout.split()[-1]
+              for seed in (1, 2, 3)}
+    assert len(counts) == 1
+    assert abs(int(counts.pop()) - 15000) < 15000 * 0.03
+
+def record_scan(index, started, findings, name=None):
+    """Record a scan of (plugin id, rule, risk code, uri, param, instances) findings"""
+    index.begin(name=name, started=started)
+    for plugin_id, rule, risk, uri, param, instances in findings:
+        index.add({'pluginid': plugin_id, 'name': rule, 'riskcode': risk}, Counter({(uri, param): instances}))
+    return index.commit()
+
+XSS = ('40012', 'Cross Site Scripting', '3', '/api/records', 'q', 2)
+CSP = ('10038', 'CSP Header Not Set', '2', '/dashboard', '', 5)
+COOKIE = ('10010', 'Cookie No HttpOnly Flag', '1', '/api/auth/login', 'token', 1)
+BANNER = ('10036', 'Server Leaks Version', '0', '/', '', 9)
+
+def test_findings_index_diffs_scans(zap_analysis, tmp_path):
+    index = zap_analysis.FindingsIndex(str(tmp_path / 'findings.sqlite'))
+    try:
+        first = record_scan(index, '2025-09-01T10:00:00', [XSS, CSP, BANNER], name='release-1')
+        # The same finding reported by two alerts of one rule (e.g. different evidence) is stored once
+        second = record_scan(index, '2025-09-08T10:00:00', [CSP, COOKIE, BANNER, BANNER], name='release-2')
+        assert sorted(index.diff_summary(first, second)) == [
+            ('fixed', 3, 1), ('new', 1, 1), ('recurring', 0, 1), ('recurring', 2, 1)]
+        assert index.diff(first, second) == [(1, '10010', 'Cookie No HttpOnly Flag', '/api/auth/login', 'token', 1)]
+        assert index.diff(second, first) == [(3, '40012', 'Cross Site Scripting', '/api/records', 'q', 2)]
+        assert index.connection.execute(
+            "SELECT instances FROM occurrences o JOIN findings f ON f.id = o.finding_id WHERE o.scan_id = ? AND f.risk = 0",
+            (second,)).fetchone() == (18,)
+        assert index.resolve('release-2') == second
+        
+        # A scan that ran in between is slotted in, and the later scan's new / fixed counts follow it
+        between = record_scan(index, '2025-09-04T10:00:00', [CSP, BANNER])
+        scans = {scan['id']: scan for scan in index.scans()}
+        assert [scan['id'] for scan in index.scans()] == [first, between, second]
+        assert (scans[first]['new'], scans[first]['fixed']) == (None, None)
+        assert (scans[between]['new'], scans[between]['fixed']) == (0, 1)
+        assert (scans[second]['new'], scans[second]['fixed']) == (1, 0)
+        assert (scans[second]['findings'], scans[second]['medium'], scans[second]['low']) == (3, 1, 1)
+    finally:
+        index.close()
+
+def zap_report(path, generated, alerts):
+    """Minimal ZAP detailed JSON report of (plugin id, rule, risk code, uri, param, instances) findings"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'@generated': generated, 'site': [{'@name': 'http://localhost:3000', 'alerts': [
+        {'pluginid': plugin_id, 'name': rule, 'riskcode': risk,
+         'instances': [{'uri': f'http://localhost:3000{uri}', 'method': 'GET', 'param': param}] * instances}
+        for plugin_id, rule, risk, uri, param, instances in alerts]}]}))
+    return path
+
+def test_reindexed_report_is_recorded_once(zap_analysis, tmp_path):
+    index_db = str(tmp_path / 'findings.sqlite')
+    first = zap_report(tmp_path / 'monday' / 'zap-detailed-report.json', 'Mon, 1 Sep 2025 10:00:00', [XSS, CSP])
+    second = zap_report(tmp_path / 'tuesday' / 'zap-detailed-report.json', 'Tue, 2 Sep 2025 10:00:00', [CSP, COOKIE])
+    scan_ids = [zap_analysis.index_json_report(report, index_db)['scan_id'] for report in (first, second, first)]
+    assert scan_ids[2] == scan_ids[0] != scan_ids[1]
+    index = zap_analysis.FindingsIndex(index_db)
+    try:
+        scans = index.scans()
+        assert [(scan['started'], scan['new'], scan['fixed']) for scan in scans] == [
+            ('2025-09-01T10:00:00', None, None), ('2025-09-02T10:00:00', 1, 1)]
+        assert [row[2] for row in index.diff(*scan_ids[:2])] == ['Cookie No HttpOnly Flag']
+    finally:
+        index.close()
+
+def test_batch_cache_reanalyzes_only_changed_scans(zap_analysis, tmp_path, monkeypatch):
+    nightly = tmp_path / 'nightly'
+    for day, alerts in ((3, [XSS, CSP]), (1, [XSS]), (2, [XSS, CSP, COOKIE])):
+        zap_report(nightly / f'2025-09-0{day}' / 'zap-detailed-report.json', f'Mon, {day} Sep 2025 02:00:00', alerts)
+    (nightly / 'broken').mkdir()
+    (nightly / 'broken' / 'zap-detailed-report.json').write_text('{"site": [')
+    cache_file = str(tmp_path / 'batch-cache.json')
+    
+    analyzed = []
+    analyze_scan_dir = zap_analysis.analyze_scan_dir
+    def counting(reports_dir, *args):
+        analyzed.append(Path(reports_dir).name)
+        return analyze_scan_dir(reports_dir, *args)
+    monkeypatch.setattr(zap_analysis, 'analyze_scan_dir', counting)
+    
+    def batch(**options):
+        analyzed.clear()
+        scans = zap_analysis.analyze_batch([nightly], workers=1, cache_file=cache_file, api_dir=None, **options)
+        return [(scan['name'], scan['findings']) for scan in scans], sorted(analyzed)
+    
+    trend = [('2025-09-01', 1), ('2025-09-02', 3), ('2025-09-03', 2)]
+    # The broken report is left out of the trend and retried on every run
+    assert batch() == (trend, ['2025-09-01', '2025-09-02', '2025-09-03', 'broken'])
+    assert batch() == (trend, ['broken'])
+    zap_report(nightly / '2025-09-03' / 'zap-detailed-report.json', 'Mon, 3 Sep 2025 02:00:00', [CSP])
+    assert batch() == ([*trend[:2], ('2025-09-03', 1)], ['2025-09-03', 'broken'])
+    # Other analysis options drop the whole cache
+    assert batch(approximate_urls=True)[1] == ['2025-09-01', '2025-09-02', '2025-09-03', 'broken']
+
+def test_parallel_batch_matches_the_serial_one(zap_analysis, tmp_path):
+    for day in range(1, 5):
+        zap_report(tmp_path / f'2025-09-0{day}' / 'zap-detailed-report.json', f'Mon, {day} Sep 2025 02:00:00',
+                   [XSS, CSP, COOKIE, BANNER][:day])
+    serial, parallel = (
+        [{key: value for key, value in scan.items() if key != 'analysis_seconds'}
+         for scan in zap_analysis.analyze_batch([tmp_path], workers=workers, cache_file=None, api_dir=None)]
+        for workers in (1, 3))
+    assert serial == parallel
+    assert [scan['findings'] for scan in serial] == [1, 2, 3, 4]
+